@@ -98,7 +98,7 @@ def parse_wire_types_data(uclass):
         subclasses = [ParseWireTypesSubclass(class_name=subclass.name,
                                              value=subclass.member_by_name(discriminator.name).value,
                                              virtual=subclass.virtual)
-                      for subclass in ofclass.protocol.classes if subclass.superclass and subclass.superclass.name == ofclass.name]
+                      for subclass in ofclass.subclasses]
 
         subclasses.sort(key=lambda x: x.value)
         versioned[version] = ParseWireTypesVersion(discriminator=discriminator,
@@ -110,29 +110,46 @@ def parse_wire_types_data(uclass):
 # Output multiple LOCI classes into each C file. This reduces the overhead of
 # parsing header files, which takes longer than compiling the actual code
 # for many classes. It also reduces the compiled code size.
-def generate_classes(install_dir):
-    for i, chunk in enumerate(chunks(loxi_globals.unified.classes, CLASS_CHUNK_SIZE)):
-        with template_utils.open_output(install_dir, "loci/src/class%02d.c" % i) as out:
-            for uclass in chunk:
-                util.render_template(out, "class.c",
-                    push_wire_types_data=push_wire_types_data(uclass),
-                    parse_wire_types_data=parse_wire_types_data(uclass))
-                # Append legacy generated code
-                c_code_gen.gen_new_function_definitions(out, uclass.name)
-                c_code_gen.gen_accessor_definitions(out, uclass.name)
-
-def generate_classes_header(install_dir):
+#
+# If class_chunks is set the classes are instead split evenly into that many
+# files, for example to match the parallelism of the build.
+class_chunks = None
+
+def class_outputs():
+    """
+    Return (name, fn, args) outputs for the class files
+    """
+    classes = loxi_globals.unified.classes
+    if class_chunks:
+        chunk_size = max(1, -(-len(classes) // class_chunks))
+    else:
+        chunk_size = CLASS_CHUNK_SIZE
+    return [("loci/src/class%02d.c" % i, render_classes, (chunk,))
+            for i, chunk in enumerate(chunks(classes, chunk_size))]
+
+def render_classes(out, uclasses):
+    for uclass in uclasses:
+        util.render_template(out, "class.c",
+            push_wire_types_data=push_wire_types_data(uclass),
+            parse_wire_types_data=parse_wire_types_data(uclass))
+        # Append legacy generated code
+        c_code_gen.gen_new_function_definitions(out, uclass.name)
+        c_code_gen.gen_accessor_definitions(out, uclass.name)
+
+def render_classes_header(out):
     # Collect legacy code
     tmp = StringIO()
     c_code_gen.gen_struct_typedefs(tmp)
     c_code_gen.gen_new_function_declarations(tmp)
     c_code_gen.gen_accessor_declarations(tmp)
 
-    with template_utils.open_output(install_dir, "loci/inc/loci/loci_classes.h") as out:
-        util.render_template(out, "loci_classes.h",
-            legacy_code=tmp.getvalue())
+    util.render_template(out, "loci_classes.h",
+        legacy_code=tmp.getvalue())
 
-def generate_lists(install_dir):
+def list_outputs():
+    """
+    Return (name, fn, args) outputs for the list files
+    """
     # Collect all the lists in use
     list_oftypes = set()
     for uclass in loxi_globals.unified.classes:
@@ -142,17 +159,20 @@ def generate_lists(install_dir):
                         loxi_utils.oftype_is_list(m.oftype):
                     list_oftypes.add(m.oftype)
 
+    outputs = []
     for oftype in sorted(list(list_oftypes)):
         cls, e_cls = loxi_utils_legacy.list_name_extract(oftype)
-        e_cls = e_cls[:-2]
-        e_uclass = loxi_globals.unified.class_by_name(e_cls)
-        with template_utils.open_output(install_dir, "loci/src/%s.c" % cls) as out:
-            util.render_template(out, "list.c", cls=cls, e_cls=e_cls, e_uclass=e_uclass,
-                                 wire_length_get=class_metadata_dict[e_cls].wire_length_get)
-            # Append legacy generated code
-            c_code_gen.gen_new_function_definitions(out, cls)
-
-def generate_strings(install_dir):
+        outputs.append(("loci/src/%s.c" % cls, render_list, (cls, e_cls[:-2])))
+    return outputs
+
+def render_list(out, cls, e_cls):
+    e_uclass = loxi_globals.unified.class_by_name(e_cls)
+    util.render_template(out, "list.c", cls=cls, e_cls=e_cls, e_uclass=e_uclass,
+                         wire_length_get=class_metadata_dict[e_cls].wire_length_get)
+    # Append legacy generated code
+    c_code_gen.gen_new_function_definitions(out, cls)
+
+def render_strings(out):
     object_id_strs = []
     object_id_strs.append("of_object")
     object_id_strs.extend(of_g.ordered_messages)
@@ -161,20 +181,17 @@ def generate_strings(install_dir):
     object_id_strs.extend(of_g.ordered_pseudo_objects)
     object_id_strs.append("of_unknown_object")
 
-    with template_utils.open_output(install_dir, "loci/src/loci_strings.c") as out:
-        util.render_template(out, "loci_strings.c", object_id_strs=object_id_strs)
+    util.render_template(out, "loci_strings.c", object_id_strs=object_id_strs)
 
-def generate_init_map(install_dir):
-    with template_utils.open_output(install_dir, "loci/src/loci_init_map.c") as out:
-        util.render_template(out, "loci_init_map.c", classes=of_g.standard_class_order)
+def render_init_map(out):
+    util.render_template(out, "loci_init_map.c", classes=of_g.standard_class_order)
 
-def generate_type_maps(install_dir):
+def render_type_maps(out):
     # Collect legacy code
     tmp = StringIO()
     c_type_maps.gen_length_array(tmp)
 
-    with template_utils.open_output(install_dir, "loci/src/of_type_maps.c") as out:
-        util.render_template(out, "of_type_maps.c", legacy_code=tmp.getvalue())
+    util.render_template(out, "of_type_maps.c", legacy_code=tmp.getvalue())
 
 ClassMetadata = namedtuple('ClassMetadata',
     ['name', 'wire_length_get', 'wire_length_set', 'wire_type_get', 'wire_type_set'])
@@ -229,9 +246,25 @@ def build_class_metadata():
     for metadata in class_metadata:
         class_metadata_dict[metadata.name] = metadata
 
-def generate_class_metadata(install_dir):
-    with template_utils.open_output(install_dir, "loci/inc/loci/loci_class_metadata.h") as out:
-        util.render_template(out, "loci_class_metadata.h")
-
-    with template_utils.open_output(install_dir, "loci/src/loci_class_metadata.c") as out:
-        util.render_template(out, "loci_class_metadata.c", class_metadata=class_metadata)
+def render_class_metadata_h(out):
+    util.render_template(out, "loci_class_metadata.h")
+
+def render_class_metadata_c(out):
+    util.render_template(out, "loci_class_metadata.c", class_metadata=class_metadata)
+
+def outputs():
+    """
+    Return (name, fn, args) outputs for all files generated by this module
+
+    Each file is rendered by calling fn(out, *args). build_class_metadata must
+    have been called first.
+    """
+    r = class_outputs()
+    r.append(("loci/inc/loci/loci_classes.h", render_classes_header, ()))
+    r.extend(list_outputs())
+    r.append(("loci/src/loci_strings.c", render_strings, ()))
+    r.append(("loci/src/loci_init_map.c", render_init_map, ()))
+    r.append(("loci/src/of_type_maps.c", render_type_maps, ()))
+    r.append(("loci/inc/loci/loci_class_metadata.h", render_class_metadata_h, ()))
+    r.append(("loci/src/loci_class_metadata.c", render_class_metadata_c, ()))
+    return r
@@ -35,13 +35,15 @@ options_default = {
     "lang"               : "c",
     "version-list"       : "1.0 1.1 1.2 1.3 1.4 1.5",
     "install-dir"        : "loxi_output",
+    "cache-dir"          : ".loxi_cache",
+    "parser"             : "pyparsing",
 }
 
 def lang_normalize(lang):
     """
-    Normalize the representation of the language
+    Normalize the representation of the language list and return as an array
     """
-    return lang.lower()
+    return [x for x in lang.lower().split(',') if x]
 
 def version_list_normalize(vlist):
     """
@@ -76,7 +78,7 @@ def process_commandline(default_vals=options_default):
                       help="List output files generated")
     parser.add_option("-l", "--lang", "--language",
                       default=default_vals["lang"],
-                      help="Select the target language: c, python")
+                      help="Select the target languages, separated by commas: c, python, java, wireshark")
     parser.add_option("-i", "--install-dir",
                       default=default_vals["install-dir"],
                       help="Directory to install generated files to (default %s)" % default_vals["install-dir"])
@@ -88,9 +90,39 @@ def process_commandline(default_vals=options_default):
                       default=default_vals["version-list"],
                       help="Specify the versions to target as 1.0 1.1 etc")
 
+    parser.add_option("-j", "--jobs", type="int",
+                      default=1,
+                      help="Number of worker processes to use (default 1)")
+    parser.add_option("--c-class-chunks", type="int", metavar="N",
+                      help="Split the C class implementations into N files")
+    parser.add_option("--parser", type="choice",
+                      choices=["pyparsing", "fast"],
+                      default=default_vals["parser"],
+                      help="Input file parser to use: pyparsing or fast (default %s)" % default_vals["parser"])
+    parser.add_option("--profile",
+                      action="store_true", default=False,
+                      help="Report the time and memory used by each phase of generation")
+    parser.add_option("--profile-json", metavar="FILE",
+                      help="Also write the profile to FILE as JSON (implies --profile)")
+    parser.add_option("--dump-ir", metavar="FILE",
+                      help="Write the IR to FILE")
+    parser.add_option("--load-ir", metavar="FILE",
+                      help="Read the IR from FILE instead of processing the input files")
+    parser.add_option("--cache-dir",
+                      default=default_vals["cache-dir"],
+                      help="Directory for cached parse results and compiled templates (default %s)" % default_vals["cache-dir"])
+    parser.add_option("--no-cache",
+                      action="store_false", dest="cache", default=True,
+                      help="Do not read or write cached parse results and compiled templates")
+    parser.add_option("--clear-cache",
+                      action="store_true", default=False,
+                      help="Remove cached parse results and compiled templates before generating")
+
     (options, args) = parser.parse_args()
 
     options.lang = lang_normalize(options.lang)
+    if options.profile_json:
+        options.profile = True
     target_version_list = version_list_normalize(options.version_list)
     target_version_list.sort()
     return (options, args, target_version_list)
@@ -30,9 +30,10 @@
 """
 
 import logging
+import multiprocessing
 import pdb
 import os
-import shutil
+from StringIO import StringIO
 
 import loxi_globals
 from loxi_ir import *
@@ -41,6 +42,7 @@ import test_data
 from collections import namedtuple
 from import_cleaner import ImportCleaner
 
+import loxi_profile
 import template_utils
 import loxi_utils.loxi_utils as loxi_utils
 
@@ -48,30 +50,41 @@ import java_gen.java_model as java_model
 
 logger = logging.getLogger(__name__)
 
-def gen_all_java(install_dir):
+def gen_all_java(install_dir, jobs=1):
     basedir= '%s/openflowj' % install_dir
     logger.info("Outputting to %s" % basedir)
-    if os.path.exists(basedir):
-        shutil.rmtree(basedir)
-    os.makedirs(basedir)
+    template_utils.clean_unmanaged(basedir)
     copy_prewrite_tree(basedir)
-    gen = JavaGenerator(basedir, JavaGeneratorOptions(instrument=True))
+    gen = JavaGenerator(basedir, JavaGeneratorOptions(instrument=True), jobs=jobs)
     gen.create_of_interfaces()
     gen.create_of_classes()
     gen.create_of_const_enums()
     gen.create_of_factories()
+    gen.render_all()
 
 JavaGeneratorOptions = namedtuple("JavaGeneratorOptions", ("instrument",))
 
+RenderJob = namedtuple("RenderJob", ("filename", "template", "context"))
+
+# JavaGenerator used by render worker processes, set before the pool is forked
+_worker_generator = None
+
+def _render_job(i):
+    gen = _worker_generator
+    return gen.render(gen.render_jobs[i])
+
 class JavaGenerator(object):
     templates_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'templates')
 
-    def __init__(self, basedir, gen_opts):
+    def __init__(self, basedir, gen_opts, jobs=1):
         self.basedir = basedir
         self.java_model = java_model.model
         self.gen_opts = gen_opts
+        self.jobs = jobs
+        self.render_jobs = []
 
     def render_class(self, clazz, template, src_dir=None, **context):
+        """ Queue a class to be rendered by render_all """
         if not src_dir:
             src_dir = "gen-src/main/java/"
 
@@ -81,20 +94,59 @@ class JavaGenerator(object):
         context['genopts']= self.gen_opts
 
         filename = os.path.join(self.basedir, src_dir, "%s/%s.java" % (clazz.package.replace(".", "/"), clazz.name))
-        dirname = os.path.dirname(filename)
-        if not os.path.exists(dirname):
-            os.makedirs(dirname)
+        self.render_jobs.append(RenderJob(filename, template, context))
+
+    def render(self, job):
+        """ Render a queued class and return (filename, data) """
         prefix = '//::(?=[ \t]|$)'
-        logger.debug("rendering filename: %s" % filename)
-        with open(filename, "w") as f:
-            template_utils.render_template(f, template, [self.templates_dir], context, prefix=prefix)
-
-        try:
-            cleaner = ImportCleaner(filename)
-            cleaner.find_used_imports()
-            cleaner.rewrite_file(filename)
-        except:
-            logger.info('Cannot clean imports from file %s' % filename)
+        logger.debug("rendering filename: %s" % job.filename)
+        with loxi_profile.phase("render", job.filename):
+            out = StringIO()
+            template_utils.render_template(out, job.template, [self.templates_dir], job.context, prefix=prefix)
+
+            data = out.getvalue()
+            try:
+                cleaner = ImportCleaner(StringIO(data))
+                cleaner.find_used_imports()
+                cleaned = StringIO()
+                cleaner.write(cleaned)
+                data = cleaned.getvalue()
+            except:
+                logger.info('Cannot clean imports from file %s' % job.filename)
+
+        return job.filename, data
+
+    def render_results(self):
+        """
+        Render all queued classes and yield (filename, data) in queue order
+
+        With more than one job the rendering is sharded across forked worker
+        processes, which share the model built by the parent.
+        """
+        if self.jobs > 1:
+            global _worker_generator
+            _worker_generator = self
+            pool = multiprocessing.Pool(self.jobs)
+            try:
+                for result in pool.imap(_render_job, xrange(len(self.render_jobs)), chunksize=16):
+                    yield result
+            finally:
+                pool.close()
+                pool.join()
+                _worker_generator = None
+        else:
+            for job in self.render_jobs:
+                yield self.render(job)
+
+    def render_all(self):
+        """
+        Render all queued classes and write them out
+
+        Files are written by the parent in queue order.
+        """
+        for filename, data in self.render_results():
+            template_utils.write_output(filename, data)
+        self.render_jobs = []
 
     def create_of_const_enums(self):
         for enum in self.java_model.enums:
@@ -52,8 +52,8 @@ class ImportLine:
 
 
 class ImportCleaner:
-    def __init__(self, path):
-        f = open(path)
+    def __init__(self, f):
+        """ f: a file-like object or iterable of lines to clean """
         self.imp_lines = []
         self.code_lines = []
         self.imports_first_line = -1
@@ -66,7 +66,6 @@ class ImportCleaner:
             else:
                 self.code_lines.append(line.rstrip())
             i = i + 1
-        f.close()
 
     def find_used_imports(self):
         self.used_imports = []
@@ -79,8 +78,7 @@ class ImportCleaner:
                 self.imp_lines.remove(x)
                 self.used_imports.append(x)
 
-    def rewrite_file(self, path):
-        f = open(path, 'w')
+    def write(self, f):
         imports_written = False
         for i in range(len(self.code_lines)):
             if not imports_written and self.imports_first_line == i:
@@ -90,7 +88,6 @@ class ImportCleaner:
                 imports_written = True
             # Put next code line
             f.write(self.code_lines[i] + '\n')
-        f.close()
 
 def main(argv):
     if len(argv) != 2:
@@ -99,9 +96,11 @@ def main(argv):
 
     filename = argv[1]
     print 'Cleaning imports from file %s' % (filename)
-    cleaner = ImportCleaner(filename)
+    with open(filename) as f:
+        cleaner = ImportCleaner(f)
     cleaner.find_used_imports()
-    cleaner.rewrite_file(filename)
+    with open(filename, 'w') as f:
+        cleaner.write(f)
 
 if __name__ == '__main__':
     main(sys.argv)
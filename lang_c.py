@@ -43,6 +43,7 @@ import c_gen.util
 import c_gen.codegen
 import c_gen.match
 import loxi_utils.loxi_utils as loxi_utils
+import loxi_profile
 import template_utils
 
 def static(out, name):
@@ -112,22 +113,20 @@ targets = {
     'locitest/Makefile': static,
 }
 
-def generate(install_dir):
-    c_gen.match.build()
-    build_of_g.initialize_versions()
-    build_of_g.build_ordered_classes()
-    build_of_g.populate_type_maps()
-    build_of_g.analyze_input()
-    build_of_g.unify_input()
-    build_of_g.order_and_assign_object_ids()
-    for (name, fn) in targets.items():
-        with template_utils.open_output(install_dir, name) as outfile:
-            fn(outfile, os.path.basename(name))
-    c_gen.codegen.build_class_metadata()
-    c_gen.codegen.generate_classes(install_dir)
-    c_gen.codegen.generate_classes_header(install_dir)
-    c_gen.codegen.generate_lists(install_dir)
-    c_gen.codegen.generate_strings(install_dir)
-    c_gen.codegen.generate_init_map(install_dir)
-    c_gen.codegen.generate_type_maps(install_dir)
-    c_gen.codegen.generate_class_metadata(install_dir)
+def generate(install_dir, jobs=1):
+    steps = [
+        c_gen.match.build,
+        build_of_g.initialize_versions,
+        build_of_g.build_ordered_classes,
+        build_of_g.populate_type_maps,
+        build_of_g.analyze_input,
+        build_of_g.unify_input,
+        build_of_g.order_and_assign_object_ids,
+        c_gen.codegen.build_class_metadata,
+    ]
+    for step in steps:
+        with loxi_profile.phase("c_setup", "%s.%s" % (step.__module__, step.__name__)):
+            step()
+    outputs = [(name, fn, (os.path.basename(name),)) for (name, fn) in targets.items()]
+    outputs.extend(c_gen.codegen.outputs())
+    template_utils.render_outputs(install_dir, outputs, jobs)
@@ -31,5 +31,5 @@
 
 import java_gen.codegen as java_codegen
 
-def generate(install_dir):
-    java_codegen.gen_all_java(install_dir)
+def generate(install_dir, jobs=1):
+    java_codegen.gen_all_java(install_dir, jobs)
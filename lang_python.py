@@ -62,5 +62,5 @@ import py_gen.codegen
 
 PREFIX = 'pyloxi/loxi'
 
-def generate(install_dir):
+def generate(install_dir, jobs=1):
     py_gen.codegen.codegen(os.path.join(install_dir, PREFIX))
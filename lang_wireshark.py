@@ -38,5 +38,5 @@ loaded automatically by Wireshark.
 
 import wireshark_gen
 
-def generate(install_dir):
+def generate(install_dir, jobs=1):
     wireshark_gen.generate(install_dir)
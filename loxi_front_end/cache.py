@@ -0,0 +1,144 @@
+# Copyright 2013, Big Switch Networks, Inc.
+#
+# LoxiGen is licensed under the Eclipse Public License, version 1.0 (EPL), with
+# the following special exception:
+#
+# LOXI Exception
+#
+# As a special exception to the terms of the EPL, you may distribute libraries
+# generated by LoxiGen (LoxiGen Libraries) under the terms of your choice, provided
+# that copyright and licensing notices generated by LoxiGen are not altered or removed
+# from the LoxiGen Libraries and the notice provided below is (i) included in
+# the LoxiGen Libraries, if distributed in source code form and (ii) included in any
+# documentation for the LoxiGen Libraries, if distributed in binary form.
+#
+# Notice: "Copyright 2013, Big Switch Networks, Inc. This library was generated by the LoxiGen Compiler."
+#
+# You may not use this file except in compliance with the EPL or LOXI Exception. You may obtain
+# a copy of the EPL at:
+#
+# http://www.eclipse.org/legal/epl-v10.html
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# EPL for the specific language governing permissions and limitations
+# under the EPL.
+
+"""
+Persistent cache of parsed input files
+
+Parsing the openflow_input files with pyparsing is the dominant cost of
+reading the input. This module keeps the AST and the OFInput created from
+it on disk, keyed by the content of the input file and a fingerprint of the
+front end code, so unchanged files don't need to be parsed again.
+"""
+
+import cPickle as pickle
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+# Any change to these modules may change the AST or OFInput for a given input
+fingerprint_modules = [
+    'loxi_front_end/parser.py',
+    'loxi_front_end/fast_parser.py',
+    'loxi_front_end/frontend.py',
+    'loxi_front_end/frontend_ir.py',
+    'loxi_globals.py',
+    'pyparsing.py',
+]
+
+root_dir = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+def fingerprint():
+    """
+    Return a hash of the front end code
+
+    Cache entries created by a different version of the front end are never
+    returned.
+    """
+    h = hashlib.sha1()
+    h.update(str(pickle.HIGHEST_PROTOCOL))
+    for name in fingerprint_modules:
+        with open(os.path.join(root_dir, name), 'rb') as f:
+            h.update(name)
+            h.update(f.read())
+    return h.hexdigest()
+
+class InputCache(object):
+    """
+    On-disk cache of (AST, OFInput) pairs
+
+    Entries are keyed by the input file's basename, its content and the
+    front end fingerprint. Each entry is stored in its own file, which is
+    written atomically so that concurrent generator runs can share a cache.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.fingerprint = fingerprint()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, filename, src):
+        h = hashlib.sha1()
+        h.update(self.fingerprint)
+        h.update(os.path.basename(filename))
+        h.update('\0')
+        h.update(src)
+        return h.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key + '.pickle')
+
+    def get(self, filename, src):
+        """
+        Look up a cached entry
+
+        @returns A pair (ast, ofinput), or None if not cached
+        """
+        path = self.path(self.key(filename, src))
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+        except IOError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            # Truncated or otherwise unreadable entry, treat as a miss
+            logger.warn("Ignoring bad input cache entry %s: %s", path, e)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def put(self, filename, src, ast, ofinput):
+        """
+        Store the AST and OFInput for an input file
+        """
+        if not os.path.exists(self.cache_dir):
+            try:
+                os.makedirs(self.cache_dir)
+            except OSError:
+                # Created by a concurrent run
+                pass
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump((ast, ofinput), f, pickle.HIGHEST_PROTOCOL)
+            os.rename(tmp_path, self.path(self.key(filename, src)))
+        except:
+            os.unlink(tmp_path)
+            raise
+
+    def clear(self):
+        """
+        Remove all cache entries
+        """
+        if os.path.exists(self.cache_dir):
+            shutil.rmtree(self.cache_dir)
@@ -0,0 +1,275 @@
+# Copyright 2013, Big Switch Networks, Inc.
+#
+# LoxiGen is licensed under the Eclipse Public License, version 1.0 (EPL), with
+# the following special exception:
+#
+# LOXI Exception
+#
+# As a special exception to the terms of the EPL, you may distribute libraries
+# generated by LoxiGen (LoxiGen Libraries) under the terms of your choice, provided
+# that copyright and licensing notices generated by LoxiGen are not altered or removed
+# from the LoxiGen Libraries and the notice provided below is (i) included in
+# the LoxiGen Libraries, if distributed in source code form and (ii) included in any
+# documentation for the LoxiGen Libraries, if distributed in binary form.
+#
+# Notice: "Copyright 2013, Big Switch Networks, Inc. This library was generated by the LoxiGen Compiler."
+#
+# You may not use this file except in compliance with the EPL or LOXI Exception. You may obtain
+# a copy of the EPL at:
+#
+# http://www.eclipse.org/legal/epl-v10.html
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# EPL for the specific language governing permissions and limitations
+# under the EPL.
+
+"""
+Hand-written parser for the LOXI input language
+
+This is a drop-in replacement for loxi_front_end.parser. It returns exactly
+the same AST for valid input and raises the same pyparsing exceptions for
+syntax errors, but avoids the overhead of pyparsing. The input is split into
+tokens with a single regular expression and parsed by recursive descent.
+"""
+
+from collections import namedtuple
+import re
+import pyparsing
+
+Token = namedtuple("Token", ["kind", "text", "start", "end"])
+
+token_re = re.compile(r"""
+      (?P<space>\s+)
+    | (?P<comment>/\*(?:[^*]*\*+)+?/ | //(?:\\\n|[^\n])*)
+    | (?P<word>\w+)
+    | (?P<punct>==|[(){}\[\]:;,=\#?])
+    | (?P<other>.)
+""", re.X | re.S)
+
+integer_re = re.compile(r"(?:0x[0-9a-fA-F]+|[0-9]+)\Z")
+
+# Parameter names accepted by each kind of parameter list
+struct_param_names = ("align", "length_includes_align")
+enum_param_names = ("wire_type", "bitmask", "complete", "stable")
+enum_member_param_names = ("virtual",)
+
+# Descriptions of unnamed pyparsing expressions used in error messages
+WORD = "W:(abcd...)"
+HEX_WORD = "W:(0123...)"
+
+def tokenize(src):
+    """
+    Split an input string into tokens
+
+    Whitespace and comments are dropped. The returned list always ends with
+    an "eof" token.
+    """
+    tokens = [Token(m.lastgroup, m.group(), m.start(), m.end())
+              for m in token_re.finditer(src)
+              if m.lastgroup != "space" and m.lastgroup != "comment"]
+    tokens.append(Token("eof", "", len(src), len(src)))
+    return tokens
+
+class Parser(object):
+    def __init__(self, src):
+        self.src = src
+        self.tokens = tokenize(src)
+        self.pos = 0
+
+    def peek(self, offset=0):
+        return self.tokens[self.pos + offset]
+
+    def next(self):
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def error(self, expected, loc=None, fatal=True):
+        if loc is None:
+            loc = self.peek().start
+        e = pyparsing.ParseException(self.src, loc, "Expected " + expected)
+        if fatal:
+            return pyparsing.ParseSyntaxException(e)
+        return e
+
+    def at_keyword(self, *names):
+        token = self.peek()
+        return token.kind == "word" and token.text in names
+
+    def at(self, text):
+        token = self.peek()
+        return token.kind == "punct" and token.text == text
+
+    def accept(self, text):
+        if self.at(text):
+            self.pos += 1
+            return True
+        return False
+
+    def expect(self, text):
+        if not self.accept(text):
+            raise self.error('"%s"' % text)
+
+    def expect_adjacent(self, text, prev):
+        """
+        Expect text immediately after the token prev, without whitespace
+        """
+        token = self.peek()
+        if token.start != prev.end or token.kind != "punct" or token.text != text:
+            raise self.error('"%s"' % text, prev.end)
+        return self.next()
+
+    def expect_word(self, name=WORD):
+        if self.peek().kind != "word":
+            raise self.error(name)
+        return self.next().text
+
+    def expect_integer(self):
+        token = self.peek()
+        if token.kind != "word" or not integer_re.match(token.text):
+            if token.text.startswith("0x"):
+                raise self.error(HEX_WORD, token.start + 2)
+            raise self.error('"0x"')
+        self.pos += 1
+        return int(token.text, 0)
+
+    def parse(self):
+        ast = []
+        while True:
+            if self.at_keyword("struct"):
+                ast.append(self.parse_struct())
+            elif self.at_keyword("enum"):
+                ast.append(self.parse_enum())
+            elif self.at("#"):
+                ast.append(self.parse_metadata())
+            else:
+                break
+        if self.peek().kind != "eof":
+            raise self.error("end of text", fatal=False)
+        return ast
+
+    def parse_params(self, names):
+        """
+        Parse a parenthesized parameter list, if present
+
+        Parameter lists allow a trailing comma.
+        """
+        params = []
+        if self.accept("("):
+            while True:
+                if not self.at_keyword(*names):
+                    raise self.error('"%s"' % names[0])
+                name = self.next().text
+                self.expect("=")
+                params.append([name, self.expect_word()])
+                if not self.accept(",") or not self.at_keyword(*names):
+                    break
+            self.expect(")")
+        return params
+
+    def parse_struct(self):
+        self.next()
+        name = self.expect_word("identifier")
+        params = self.parse_params(struct_param_names)
+        if self.accept(":"):
+            parent = self.expect_word("identifier")
+        else:
+            parent = None
+        self.expect("{")
+        members = []
+        while self.peek().kind == "word":
+            members.append(self.parse_member())
+            self.expect(";")
+        self.expect("}")
+        self.expect(";")
+        return ['struct', name, params, parent, members]
+
+    def parse_type(self):
+        token = self.peek()
+        if token.kind != "word":
+            raise self.error("type name")
+        self.pos += 1
+        if token.text == "enum":
+            return ["enum", self.expect_word()]
+        bracket = self.peek()
+        if bracket.start == token.end and bracket.kind == "punct" and bracket.text == "[":
+            self.pos += 1
+            size = self.peek()
+            if size.start != bracket.end or size.kind != "word":
+                raise self.error(WORD, bracket.end)
+            self.pos += 1
+            end = self.expect_adjacent("]", size)
+            return ["array", self.src[token.start:end.end]]
+        if token.text == "list":
+            paren = self.expect_adjacent("(", token)
+            elem = self.peek()
+            if elem.start != paren.end or elem.kind != "word":
+                raise self.error("identifier", paren.end)
+            self.pos += 1
+            end = self.expect_adjacent(")", elem)
+            return ["list", self.src[token.start:end.end]]
+        return ["scalar", token.text]
+
+    def parse_member(self):
+        if self.at_keyword("pad"):
+            self.next()
+            self.expect("(")
+            length = self.expect_integer()
+            self.expect(")")
+            return ['pad', length]
+
+        oftype = self.parse_type()
+        name = self.expect_word("identifier")
+        if self.at("=="):
+            # Type, discriminator and field length members. If none of them
+            # match this is a data member, which must be followed by ';'.
+            start = self.pos
+            self.next()
+            token = self.peek()
+            if self.accept("?"):
+                return ['discriminator', oftype, name]
+            elif token.kind == "word" and (integer_re.match(token.text) or
+                                           token.text.startswith("0x")):
+                return ['type', oftype, name, self.expect_integer()]
+            elif token.kind == "word" and token.text == "length":
+                self.next()
+                if self.accept("(") and self.peek().kind == "word":
+                    field_name = self.next().text
+                    if self.accept(")"):
+                        return ['field_length', oftype, name, field_name]
+            self.pos = start
+        return ['data', oftype, name]
+
+    def parse_enum(self):
+        self.next()
+        name = self.expect_word("identifier")
+        params = self.parse_params(enum_param_names)
+        self.expect("{")
+        entries = []
+        while self.peek().kind == "word":
+            entry_name = self.next().text
+            entry_params = self.parse_params(enum_member_param_names)
+            self.expect("=")
+            entries.append([entry_name, entry_params, self.expect_integer()])
+            if not self.accept(","):
+                break
+        self.expect("}")
+        self.expect(";")
+        return ['enum', name, params, entries]
+
+    def parse_metadata(self):
+        self.next()
+        if not self.at_keyword("version"):
+            raise self.error('"version"')
+        key = self.next().text
+        return ['metadata', key, self.expect_word()]
+
+def parse(src):
+    """
+    Given an input string, return the AST.
+
+    See loxi_front_end.parser.parse.
+    """
+    return Parser(src).parse()
@@ -25,7 +25,6 @@
 # EPL for the specific language governing permissions and limitations
 # under the EPL.
 
-from itertools import chain
 import logging
 import re
 import sys
@@ -88,6 +87,98 @@ class OFVersion(namedtuple("OFVersion", ("version", "wire_version"))):
     def __cmp__(self, other):
         return cmp(self.wire_version, other.wire_version)
 
+class _Node(object):
+    """
+    Base class for IR nodes
+
+    A node behaves like a namedtuple of its _fields: it supports keyword or
+    positional construction, iteration, indexing, comparison, hashing and
+    _asdict. Fields and any other attributes, such as back references, are
+    declared in __slots__ so nodes don't carry a __dict__.
+
+    Pickling saves the fields and the attributes listed in _pickled_attrs.
+    Back references are not pickled; the containing node assigns them when
+    it is constructed.
+    """
+    __slots__ = ()
+    _fields = ()
+    _pickled_attrs = ()
+
+    def __init__(self, *args, **kwargs):
+        fields = self._fields
+        if len(args) > len(fields):
+            raise TypeError("%s takes %d arguments (%d given)" %
+                            (type(self).__name__, len(fields), len(args)))
+        for name, value in zip(fields, args):
+            setattr(self, name, value)
+        for name in fields[len(args):]:
+            if name not in kwargs:
+                raise TypeError("%s missing argument %s" % (type(self).__name__, name))
+            setattr(self, name, kwargs.pop(name))
+        if kwargs:
+            raise TypeError("%s got unexpected arguments %s" %
+                            (type(self).__name__, ", ".join(sorted(kwargs))))
+
+    def __iter__(self):
+        for name in self._fields:
+            yield getattr(self, name)
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __getitem__(self, index):
+        return tuple(self)[index]
+
+    def _asdict(self):
+        return OrderedDict(zip(self._fields, self))
+
+    def __eq__(self, other):
+        if isinstance(other, (_Node, tuple)):
+            return tuple(self) == tuple(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        if isinstance(other, (_Node, tuple)):
+            return tuple(self) != tuple(other)
+        return NotImplemented
+
+    def __lt__(self, other):
+        return tuple(self) < tuple(other)
+
+    def __le__(self, other):
+        return tuple(self) <= tuple(other)
+
+    def __gt__(self, other):
+        return tuple(self) > tuple(other)
+
+    def __ge__(self, other):
+        return tuple(self) >= tuple(other)
+
+    def __hash__(self):
+        return hash(tuple(self))
+
+    def __repr__(self):
+        return "%s(%s)" % (type(self).__name__,
+            ", ".join("%s=%r" % (name, getattr(self, name)) for name in self._fields))
+
+    def _init_args(self):
+        """ Constructor arguments used when unpickling """
+        return tuple(self)
+
+    def __reduce__(self):
+        state = {}
+        for name in self._pickled_attrs:
+            value = getattr(self, name)
+            if value is not None:
+                state[name] = value
+        if state:
+            return (type(self), self._init_args(), state)
+        return (type(self), self._init_args())
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
 """
 One version of the OpenFlow protocol
 
@@ -96,17 +187,41 @@ Combination of multiple OFInput objects.
 @param wire_version
 @param classes List of OFClass objects
 @param enums List of Enum objects
+
+Name lookups and the subclass tree are indexed when the protocol is
+created, so the classes must be complete by then.
 """
-class OFProtocol(namedtuple('OFProtocol', ['version', 'classes', 'enums'])):
+class OFProtocol(_Node):
+    _fields = ('version', 'classes', 'enums')
+    __slots__ = _fields + ('_classes_by_name', '_enums_by_name', '_subclasses')
+
     def __init__(self, version, classes, enums):
-        super(OFProtocol, self).__init__(self, version, classes, enums)
+        super(OFProtocol, self).__init__(version, classes, enums)
         assert version is None or isinstance(version, OFVersion)
+        self._classes_by_name = {}
+        self._enums_by_name = {}
+        self._subclasses = {}
+        for ofclass in classes:
+            self._classes_by_name.setdefault(ofclass.name, ofclass)
+            if ofclass.superclass:
+                self._subclasses.setdefault(ofclass.superclass.name, []).append(ofclass)
+            ofclass.build_index()
+            ofclass.protocol = self
+        for enum in enums:
+            self._enums_by_name.setdefault(enum.name, enum)
+            enum.protocol = self
 
     def class_by_name(self, name):
-        return find(lambda ofclass: ofclass.name == name, self.classes)
+        return self._classes_by_name.get(name)
 
     def enum_by_name(self, name):
-        return find(lambda enum: enum.name == name, self.enums)
+        return self._enums_by_name.get(name)
+
+    def subclasses_of(self, name):
+        """
+        Return the direct subclasses of the named class, in protocol order
+        """
+        return self._subclasses.get(name, [])
 
 """
 An OpenFlow class
@@ -121,26 +236,77 @@ The members are in the same order as on the wire.
 @param members List of *Member objects
 @param params optional dictionary of parameters
 """
-class OFClass(namedtuple('OFClass', ['name', 'superclass', 'members', 'virtual', 'params', 'is_fixed_length', 'base_length'])):
+class OFClass(_Node):
+    _fields = ('name', 'superclass', 'members', 'virtual', 'params', 'is_fixed_length', 'base_length')
+    __slots__ = _fields + ('protocol', 'pyname', '_members_by_name', '_discriminator', '_ancestors')
+    _pickled_attrs = ('pyname',)
+    # Unified classes share their members with the versioned classes
+    _owns_members = True
+
     def __init__(self, *a, **kw):
-        super(OFClass, self).__init__(self, *a, **kw)
-        # Back reference will be added by assignment
+        super(OFClass, self).__init__(*a, **kw)
+        # Back reference will be added by OFProtocol
         self.protocol = None
+        # Python class name, assigned by the Python backend
+        self.pyname = None
+        if self._owns_members:
+            for m in self.members:
+                m.of_class = self
+        # Built by build_index
+        self._members_by_name = None
+        self._discriminator = None
+        self._ancestors = None
+
+    def build_index(self):
+        """
+        Index the members by name and collect the names of all ancestors
+
+        Called when the class is added to a protocol, or on the first
+        lookup. The members must not change afterwards.
+        """
+        members_by_name = {}
+        discriminator = None
+        for m in self.members:
+            if hasattr(m, "name"):
+                members_by_name.setdefault(m.name, m)
+            if discriminator is None and type(m) == OFDiscriminatorMember:
+                discriminator = m
+        self._members_by_name = members_by_name
+        self._discriminator = discriminator
+        if self.superclass is None:
+            self._ancestors = frozenset([self.name])
+        else:
+            self._ancestors = self.superclass.ancestors | frozenset([self.name])
 
     def member_by_name(self, name):
-        return find(lambda m: hasattr(m, "name") and m.name == name, self.members)
+        if self._members_by_name is None:
+            self.build_index()
+        return self._members_by_name.get(name)
 
     @property
     def discriminator(self):
-        return find(lambda m: type(m) == OFDiscriminatorMember, self.members)
+        if self._members_by_name is None:
+            self.build_index()
+        return self._discriminator
+
+    @property
+    def ancestors(self):
+        """
+        Names of this class and all of its superclasses
+        """
+        if self._ancestors is None:
+            self.build_index()
+        return self._ancestors
+
+    @property
+    def subclasses(self):
+        """
+        Direct subclasses of this class in its protocol
+        """
+        return self.protocol.subclasses_of(self.name)
 
     def is_instanceof(self, super_class_name):
-        if self.name == super_class_name:
-            return True
-        elif self.superclass is None:
-            return False
-        else:
-            return self.superclass.is_instanceof(super_class_name)
+        return super_class_name in self.ancestors
 
     def is_subclassof(self, super_class_name):
         return self.name != super_class_name and self.is_instanceof(super_class_name)
@@ -206,8 +372,8 @@ class OFClass(namedtuple('OFClass', ['name', 'superclass', 'members', 'virtual',
 
 """ one class unified across openflow versions. Keeps around a map version->versioned_class """
 class OFUnifiedClass(OFClass):
-    def __new__(cls, version_classes, *a, **kw):
-        return super(OFUnifiedClass, cls).__new__(cls, *a, **kw)
+    __slots__ = ('version_classes',)
+    _owns_members = False
 
     def __init__(self, version_classes, *a, **kw):
         super(OFUnifiedClass, self).__init__(*a, **kw)
@@ -216,11 +382,16 @@ class OFUnifiedClass(OFClass):
     def class_by_version(self, version):
         return self.version_classes[version]
 
+    def _init_args(self):
+        return (self.version_classes,) + tuple(self)
 
 
-""" A mixin for member classes. Keeps around the back reference of_class (for assignment by
+
+""" Base class for member classes. Keeps around the back reference of_class (for assignment by
     build_protocol, and additional methods shared across Members. """
-class MemberMixin(object):
+class MemberMixin(_Node):
+    __slots__ = ('of_class',)
+
     def __init__(self, *a, **kw):
         super(MemberMixin, self).__init__(*a, **kw)
         # Back reference will be added by assignment in build_protocol below
@@ -244,8 +415,9 @@ Normal field
 
 Example: packet_in.buffer_id
 """
-class OFDataMember(namedtuple('OFDataMember', ['name', 'oftype', 'is_fixed_length', 'base_length', 'offset']), MemberMixin):
-    pass
+class OFDataMember(MemberMixin):
+    _fields = ('name', 'oftype', 'is_fixed_length', 'base_length', 'offset')
+    __slots__ = _fields
 
 """
 Field that declares that this is an abstract super-class and
@@ -255,8 +427,9 @@ of_action.
 
 @param name
 """
-class OFDiscriminatorMember (namedtuple('OFDiscriminatorMember', ['name', 'oftype', 'is_fixed_length', 'base_length', 'offset']), MemberMixin):
-    pass
+class OFDiscriminatorMember(MemberMixin):
+    _fields = ('name', 'oftype', 'is_fixed_length', 'base_length', 'offset')
+    __slots__ = _fields
 
 """
 Field used to determine the type of an OpenFlow object
@@ -267,8 +440,9 @@ Field used to determine the type of an OpenFlow object
 
 Example: packet_in.type, flow_add._command
 """
-class OFTypeMember (namedtuple('OFTypeMember', ['name', 'oftype', 'value', 'is_fixed_length', 'base_length', 'offset']), MemberMixin):
-    pass
+class OFTypeMember(MemberMixin):
+    _fields = ('name', 'oftype', 'value', 'is_fixed_length', 'base_length', 'offset')
+    __slots__ = _fields
 
 """
 Field with the length of the containing object
@@ -278,8 +452,9 @@ Field with the length of the containing object
 
 Example: packet_in.length, action_output.len
 """
-class OFLengthMember (namedtuple('OFLengthMember', ['name', 'oftype', 'is_fixed_length', 'base_length', 'offset']), MemberMixin):
-    pass
+class OFLengthMember(MemberMixin):
+    _fields = ('name', 'oftype', 'is_fixed_length', 'base_length', 'offset')
+    __slots__ = _fields
 
 """
 Field with the length of another field in the containing object
@@ -290,8 +465,9 @@ Field with the length of another field in the containing object
 
 Example: packet_out.actions_len (only usage)
 """
-class OFFieldLengthMember (namedtuple('OFFieldLengthMember', ['name', 'oftype', 'field_name', 'is_fixed_length', 'base_length', 'offset']), MemberMixin):
-    pass
+class OFFieldLengthMember(MemberMixin):
+    _fields = ('name', 'oftype', 'field_name', 'is_fixed_length', 'base_length', 'offset')
+    __slots__ = _fields
 
 """
 Zero-filled padding
@@ -300,8 +476,9 @@ Zero-filled padding
 
 Example: packet_in.pad
 """
-class OFPadMember (namedtuple('OFPadMember', ['pad_length', 'is_fixed_length', 'base_length', 'offset']), MemberMixin):
-    pass
+class OFPadMember(MemberMixin):
+    _fields = ('pad_length', 'is_fixed_length', 'base_length', 'offset')
+    __slots__ = _fields
 
 """
 An OpenFlow enumeration
@@ -313,11 +490,16 @@ All values are Python ints.
 @params dict of optional params. Currently defined:
        - wire_type: the low_level type of the enum values (uint8,...)
 """
-class OFEnum(namedtuple('OFEnum', ['name', 'entries', 'params'])):
+class OFEnum(_Node):
+    _fields = ('name', 'entries', 'params')
+    __slots__ = _fields + ('protocol',)
+
     def __init__(self, *a, **kw):
         super(OFEnum, self).__init__(*a, **kw)
-        # Back reference will be added by assignment
+        # Back reference will be added by OFProtocol
         self.protocol = None
+        for e in self.entries:
+            e.enum = self
 
     @property
     def values(self):
@@ -331,10 +513,13 @@ class OFEnum(namedtuple('OFEnum', ['name', 'entries', 'params'])):
     def wire_type(self):
         return self.params['wire_type'] if 'wire_type' in self.params else self.name
 
-class OFEnumEntry(namedtuple('OFEnumEntry', ['name', 'value', 'params'])):
+class OFEnumEntry(_Node):
+    _fields = ('name', 'value', 'params')
+    __slots__ = _fields + ('enum',)
+
     def __init__(self, *a, **kw):
         super(OFEnumEntry, self).__init__(*a, **kw)
-        # Back reference will be added by assignment
+        # Back reference will be added by OFEnum
         self.enum = None
 
 class RedefinedException(Exception):
@@ -375,8 +560,6 @@ def build_protocol(version, ofinputs):
         enum = OFEnum(name=fe.name,
                       entries=entries,
                       params=fe.params)
-        for e in entries:
-            e.enum = enum
         name_enums[enum.name] = enum
 
     name_classes = OrderedDict()
@@ -491,7 +674,4 @@ def build_protocol(version, ofinputs):
                 if c.is_instanceof(root):
                     build_id_class(name, root)
 
-    protocol = OFProtocol(version=version, classes=tuple(name_classes.values()), enums=tuple(name_enums.values()))
-    for e in chain(protocol.classes, protocol.enums):
-        e.protocol = protocol
-    return protocol
+    return OFProtocol(version=version, classes=tuple(name_classes.values()), enums=tuple(name_enums.values()))
@@ -28,7 +28,6 @@
 
 import copy
 from collections import OrderedDict
-from itertools import chain
 import logging
 
 import ir
@@ -153,7 +152,4 @@ def build_unified_ir(name_protocol_map):
                 is_fixed_length=spec.is_fixed_length)
         unified_classes[name] = u
 
-    unified = ir.OFProtocol(version=None, classes = tuple(unified_classes.values()), enums=unified_enums)
-    for e in chain(unified.classes, unified.enums):
-        e.protocol = unified
-    return unified
+    return ir.OFProtocol(version=None, classes = tuple(unified_classes.values()), enums=unified_enums)
@@ -0,0 +1,146 @@
+# Copyright 2013, Big Switch Networks, Inc.
+#
+# LoxiGen is licensed under the Eclipse Public License, version 1.0 (EPL), with
+# the following special exception:
+#
+# LOXI Exception
+#
+# As a special exception to the terms of the EPL, you may distribute libraries
+# generated by LoxiGen (LoxiGen Libraries) under the terms of your choice, provided
+# that copyright and licensing notices generated by LoxiGen are not altered or removed
+# from the LoxiGen Libraries and the notice provided below is (i) included in
+# the LoxiGen Libraries, if distributed in source code form and (ii) included in any
+# documentation for the LoxiGen Libraries, if distributed in binary form.
+#
+# Notice: "Copyright 2013, Big Switch Networks, Inc. This library was generated by the LoxiGen Compiler."
+#
+# You may not use this file except in compliance with the EPL or LOXI Exception. You may obtain
+# a copy of the EPL at:
+#
+# http://www.eclipse.org/legal/epl-v10.html
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# EPL for the specific language governing permissions and limitations
+# under the EPL.
+
+"""
+Per-phase timing and memory profiler for the generator
+
+Phases are recorded with the phase context manager:
+
+    with loxi_profile.phase("parse", filename):
+        ...
+
+Nothing is recorded unless the profiler has been enabled (loxigen.py
+--profile). Memory is the peak resident set size of the process, so a
+phase's memory growth is how much it raised the peak.
+"""
+
+from collections import namedtuple, OrderedDict
+import json
+import resource
+import time
+
+# Set by loxigen.py --profile
+enabled = False
+
+Record = namedtuple("Record", ["category", "name", "seconds", "peak_rss", "rss_growth"])
+
+# Completed phases in the order they finished
+records = []
+
+def peak_rss():
+    """
+    Return the peak resident set size of this process in KiB
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+class Phase(object):
+    """
+    A profiled phase of generation
+
+    Can be used as a context manager or with explicit start and stop calls.
+    """
+    def __init__(self, category, name=None):
+        self.category = category
+        self.name = name
+        self.start_time = None
+
+    def start(self):
+        if enabled:
+            self.start_time = time.time()
+            self.start_rss = peak_rss()
+        return self
+
+    def stop(self):
+        if self.start_time is not None:
+            rss = peak_rss()
+            records.append(Record(self.category, self.name,
+                                  time.time() - self.start_time,
+                                  rss, rss - self.start_rss))
+            self.start_time = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+def phase(category, name=None):
+    """
+    Return a Phase to use in a with statement
+    """
+    return Phase(category, name)
+
+def reset():
+    del records[:]
+
+def summary():
+    """
+    Return per-category totals as an OrderedDict sorted by total time
+
+    Each value is a dict with the number of phases, the total and maximum
+    time, and the highest peak memory at the end of any phase.
+    """
+    categories = {}
+    for r in records:
+        s = categories.setdefault(r.category, OrderedDict([
+            ("count", 0), ("seconds", 0.0), ("max_seconds", 0.0), ("peak_rss", 0)]))
+        s["count"] += 1
+        s["seconds"] += r.seconds
+        s["max_seconds"] = max(s["max_seconds"], r.seconds)
+        s["peak_rss"] = max(s["peak_rss"], r.peak_rss)
+    return OrderedDict(sorted(categories.items(), key=lambda x: -x[1]["seconds"]))
+
+def report(out, limit=30):
+    """
+    Write a human readable report to out
+
+    Lists the totals for each category followed by the slowest phases.
+    """
+    out.write("%-20s %6s %10s %10s %12s\n" % ("Phase", "Count", "Total (s)", "Max (s)", "Peak (KiB)"))
+    for category, s in summary().items():
+        out.write("%-20s %6d %10.3f %10.3f %12d\n" % (
+            category, s["count"], s["seconds"], s["max_seconds"], s["peak_rss"]))
+
+    out.write("\nSlowest phases:\n")
+    out.write("%10s %12s %12s  %s\n" % ("Time (s)", "Peak (KiB)", "Growth (KiB)", "Phase"))
+    for r in sorted(records, key=lambda r: -r.seconds)[:limit]:
+        name = r.category
+        if r.name is not None:
+            name += " " + r.name
+        out.write("%10.3f %12d %12d  %s\n" % (r.seconds, r.peak_rss, r.rss_growth, name))
+
+def write_json(filename):
+    """
+    Write the summary and all recorded phases to a JSON file
+    """
+    data = OrderedDict([
+        ("summary", summary()),
+        ("phases", [r._asdict() for r in records]),
+    ])
+    with open(filename, "w") as f:
+        json.dump(data, f, indent=2, separators=(",", ": "))
+        f.write("\n")
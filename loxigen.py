@@ -71,10 +71,13 @@ structures.  They should probably be a class or classes as well.
 
 from collections import OrderedDict, defaultdict
 import copy
+import cPickle as pickle
 import glob
+import multiprocessing
 from optparse import OptionParser
 import os
 import re
+import shutil
 import string
 import sys
 
@@ -84,44 +87,121 @@ import loxi_globals
 import loxi_utils.loxi_utils as loxi_utils
 import pyparsing
 import loxi_front_end.parser as parser
+import loxi_front_end.fast_parser as fast_parser
 import loxi_front_end.frontend as frontend
+from loxi_front_end.cache import InputCache
 import loxi_ir
+import loxi_profile
+import template_utils
 from generic_utils import *
 
 root_dir = os.path.dirname(os.path.realpath(__file__))
 
-def process_input_file(filename):
+# Parsers selectable with --parser. Both return the same AST.
+parsers = {
+    "pyparsing": parser,
+    "fast": fast_parser,
+}
+
+# Parser used by process_input_file
+input_parser = parser
+
+def process_input_file(filename, cache=None):
     """
     Process an input file
 
     Does not modify global state.
 
     @param filename The input filename
+    @param cache Optional InputCache to look up and store the result
 
     @returns An OFInput object
     """
 
+    with open(filename, 'r') as f:
+        src = f.read()
+
+    if cache:
+        entry = cache.get(filename, src)
+        if entry:
+            ast, ofinput = entry
+            return ofinput
+
     # Parse the input file
     try:
-        with open(filename, 'r') as f:
-            ast = parser.parse(f.read())
+        with loxi_profile.phase("parse", os.path.basename(filename)):
+            ast = input_parser.parse(src)
     except pyparsing.ParseBaseException as e:
         print "Parse error in %s: %s" % (os.path.basename(filename), str(e))
         sys.exit(1)
 
     # Create the OFInput from the AST
     try:
-        ofinput = frontend.create_ofinput(os.path.basename(filename), ast)
+        with loxi_profile.phase("create_ofinput", os.path.basename(filename)):
+            ofinput = frontend.create_ofinput(os.path.basename(filename), ast)
     except frontend.InputError as e:
         print "Error in %s: %s" % (os.path.basename(filename), str(e))
         sys.exit(1)
 
+    if cache:
+        cache.put(filename, src, ast, ofinput)
+
     return ofinput
 
-def read_input():
+# Input cache used by parallel parse workers, set by _init_input_worker
+_worker_input_cache = None
+
+def _init_input_worker(cache):
+    global _worker_input_cache
+    _worker_input_cache = cache
+
+def _process_input_file_job(filename):
+    """
+    Parse an input file in a worker process
+
+    @returns A pair (ofinput, cache_hit). ofinput is None if the file could
+    not be processed; the error has already been reported.
+    """
+    cache = _worker_input_cache
+    hits = cache.hits if cache else 0
+    try:
+        ofinput = process_input_file(filename, cache)
+    except SystemExit:
+        return None, False
+    return ofinput, cache is not None and cache.hits > hits
+
+def process_input_files(filenames, cache=None, jobs=1):
+    """
+    Process input files in a pool of worker processes
+
+    @returns A list of OFInput objects in the same order as filenames
+    """
+    pool = multiprocessing.Pool(jobs, _init_input_worker, (cache,))
+    try:
+        results = pool.map(_process_input_file_job, filenames)
+    finally:
+        pool.close()
+        pool.join()
+
+    ofinputs = []
+    for ofinput, cache_hit in results:
+        if ofinput is None:
+            sys.exit(1)
+        if cache:
+            if cache_hit:
+                cache.hits += 1
+            else:
+                cache.misses += 1
+        ofinputs.append(ofinput)
+    return ofinputs
+
+def read_input(cache=None, jobs=1):
     """
     Read in from files given on command line and update global state
 
+    @param cache Optional InputCache for parse results
+    @param jobs Number of processes to parse the input files with
+
     @fixme Should select versions to support from command line
     """
 
@@ -132,25 +212,87 @@ def read_input():
     filenames = [x for x in filenames if not x.endswith('~')]
 
     # Read input files
-    for filename in filenames:
-        log("Processing struct file: " + filename)
-        ofinput = process_input_file(filename)
-
+    if jobs > 1:
+        for filename in filenames:
+            log("Processing struct file: " + filename)
+        ofinputs = process_input_files(filenames, cache, jobs)
+    else:
+        ofinputs = []
+        for filename in filenames:
+            log("Processing struct file: " + filename)
+            ofinputs.append(process_input_file(filename, cache))
+
+    for ofinput in ofinputs:
         for wire_version in ofinput.wire_versions:
             version = loxi_globals.OFVersions.from_wire(wire_version)
             if version in loxi_globals.OFVersions.target_versions:
                 ofinputs_by_version[wire_version].append(ofinput)
+
+    if cache:
+        log("Input cache: %d hits, %d misses" % (cache.hits, cache.misses))
     return ofinputs_by_version
 
-def build_ir(ofinputs_by_version):
-    classes = []
-    enums = []
-    for wire_version, ofinputs in ofinputs_by_version.items():
-        version = OFVersions.from_wire(wire_version)
-        ofprotocol = loxi_ir.build_protocol(version, ofinputs)
-        loxi_globals.ir[version] = ofprotocol
+def _build_protocol_job(args):
+    wire_version, ofinputs = args
+    version = OFVersions.from_wire(wire_version)
+    with loxi_profile.phase("build_protocol", version.version):
+        return loxi_ir.build_protocol(version, ofinputs)
 
-    loxi_globals.unified = loxi_ir.build_unified_ir(loxi_globals.ir)
+def build_ir(ofinputs_by_version, jobs=1):
+    """
+    Build the per-version and unified IR and update global state
+
+    @param ofinputs_by_version Dict of wire version -> list of OFInput
+    @param jobs Number of processes to build the per-version IR with
+    """
+    items = ofinputs_by_version.items()
+    if jobs > 1:
+        pool = multiprocessing.Pool(min(jobs, len(items)))
+        try:
+            protocols = pool.map(_build_protocol_job, items)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        protocols = [_build_protocol_job(item) for item in items]
+
+    for (wire_version, _), ofprotocol in zip(items, protocols):
+        loxi_globals.ir[OFVersions.from_wire(wire_version)] = ofprotocol
+
+    with loxi_profile.phase("build_unified_ir"):
+        loxi_globals.unified = loxi_ir.build_unified_ir(loxi_globals.ir)
+
+def dump_ir(filename):
+    """
+    Write the per-version and unified IR from global state to a file
+    """
+    with open(filename, 'wb') as f:
+        pickle.dump((loxi_globals.ir, loxi_globals.unified), f, pickle.HIGHEST_PROTOCOL)
+
+def load_ir(filename, target_versions):
+    """
+    Read IR written by dump_ir and update global state
+
+    The IR is restricted to the versions in target_versions. If that drops
+    any versions the unified IR is rebuilt from the remaining ones.
+    """
+    with open(filename, 'rb') as f:
+        ir, unified = pickle.load(f)
+
+    versions = [v for v in target_versions if v in ir]
+    if not versions:
+        print "No target versions in IR file %s" % filename
+        sys.exit(1)
+
+    loxi_globals.OFVersions.target_versions = versions
+    loxi_globals.ir.clear()
+    for version in versions:
+        loxi_globals.ir[version] = ir[version]
+
+    if len(versions) == len(ir):
+        loxi_globals.unified = unified
+    else:
+        loxi_globals.unified = loxi_ir.build_unified_ir(loxi_globals.ir)
 
 ################################################################
 #
@@ -164,13 +306,46 @@ if __name__ == '__main__':
 
     logging.basicConfig(level = logging.INFO if not options.verbose else logging.DEBUG)
 
-    # Import the language file
-    lang_file = "lang_%s" % options.lang
-    lang_module = __import__(lang_file)
+    # Import the language files
+    lang_modules = [__import__("lang_%s" % lang) for lang in options.lang]
+
+    if options.c_class_chunks:
+        import c_gen.codegen
+        c_gen.codegen.class_chunks = options.c_class_chunks
+
+    if options.clear_cache and os.path.exists(options.cache_dir):
+        shutil.rmtree(options.cache_dir)
+    if options.cache:
+        template_utils.set_cache_dir(os.path.join(options.cache_dir, "templates"))
 
-    log("\nGenerating files for target language %s\n" % options.lang)
+    input_parser = parsers[options.parser]
+    if options.profile:
+        loxi_profile.enabled = True
+        if options.jobs > 1:
+            # Phases run by worker processes would not be recorded
+            log("Profiling in a single process, ignoring --jobs")
+            options.jobs = 1
 
     loxi_globals.OFVersions.target_versions = target_versions
-    inputs = read_input()
-    build_ir(inputs)
-    lang_module.generate(options.install_dir)
+    if options.load_ir:
+        load_ir(options.load_ir, target_versions)
+    else:
+        input_cache = InputCache(os.path.join(options.cache_dir, "input"))
+
+        inputs = read_input(input_cache if options.cache else None, options.jobs)
+        build_ir(inputs, options.jobs)
+
+    if options.dump_ir:
+        dump_ir(options.dump_ir)
+
+    for lang, lang_module in zip(options.lang, lang_modules):
+        log("\nGenerating files for target language %s\n" % lang)
+        with template_utils.OutputManifest(options.install_dir, lang):
+            with loxi_profile.phase("generate", lang):
+                lang_module.generate(options.install_dir, options.jobs)
+
+    if options.profile:
+        print
+        loxi_profile.report(sys.stdout)
+        if options.profile_json:
+            loxi_profile.write_json(options.profile_json)
@@ -25,13 +25,15 @@
 # EPL for the specific language governing permissions and limitations
 # under the EPL.
 
-from collections import defaultdict
+from collections import defaultdict, namedtuple
 import os
+import re
 import loxi_globals
 import template_utils
 import loxi_utils.loxi_utils as utils
 import util
 from loxi_ir import *
+from loxi_ir.ir_offset import of_mixed_types
 
 # Map from inheritance root to module name
 roots = {
@@ -70,6 +72,263 @@ def generate_pyname(ofclass):
                 return module_name, ofclass.name[len(root)+1:]
     return 'common', ofclass.name[3:]
 
+# Return the names of the members stored on instances of the generated class
+def instance_member_names(ofclass):
+    return [m.name for m in ofclass.members
+            if type(m) == OFDataMember or type(m) == OFDiscriminatorMember]
+
+# Return the __slots__ of the generated Python class
+#
+# Members already stored in a slot of a superclass are left out.
+def slot_names(ofclass):
+    inherited = set()
+    superclass = ofclass.superclass
+    while superclass:
+        inherited.update(instance_member_names(superclass))
+        superclass = superclass.superclass
+    return [name for name in instance_member_names(ofclass) if name not in inherited]
+
+discriminator_codes = { 1: "B", 2: "H", 4: "L" }
+
+# Return the flattened dispatch table of an inheritance root
+#
+# The table maps tuples of discriminator values to the class to unpack. The
+# empty tuple and the key of each virtual class whose subclasses need another
+# discriminator map to (struct format, offset, default class) instead: the
+# struct is peeked at offset and its values are appended to the key. The
+# default class is None for the root itself.
+#
+# A level reads the discriminators of several inheritance levels with one
+# struct when the virtual classes below it have no concrete subclasses of
+# their own, share the offset and length of their discriminator and that
+# discriminator lies in the fixed part of the class the level starts at.
+# The keys of those intermediate virtual classes map to the class itself,
+# so lookups fall back to them for unknown subtypes.
+def dispatch_table(root, ofclasses):
+    subclasses = defaultdict(list)
+    for ofclass in ofclasses:
+        if ofclass.superclass:
+            subclasses[ofclass.superclass.name].append(ofclass)
+
+    def type_value(ofclass):
+        return ofclass.member_by_name(ofclass.superclass.discriminator.name).value
+
+    table = []
+
+    def add_level(start, key):
+        discriminators = [start.discriminator]
+        frontier = [(start, ())]
+        intermediate = []
+        while True:
+            children = [c for node, _ in frontier for c in subclasses[node.name]]
+            if not children or not all(c.virtual for c in children):
+                break
+            if len(set((c.discriminator.offset, c.discriminator.length) for c in children)) != 1:
+                break
+            d = children[0].discriminator
+            last = discriminators[-1]
+            if d.offset < last.offset + last.length or d.offset + d.length > start.base_length:
+                break
+            next_frontier = []
+            for node, values in frontier:
+                for c in subclasses[node.name]:
+                    intermediate.append((key + values + (type_value(c),), c))
+                    next_frontier.append((c, values + (type_value(c),)))
+            discriminators.append(d)
+            frontier = next_frontier
+
+        fmt = '!'
+        pos = discriminators[0].offset
+        for d in discriminators:
+            fmt += 'x' * (d.offset - pos) + discriminator_codes[d.length]
+            pos = d.offset + d.length
+        table.append((key, (fmt, discriminators[0].offset, start if start != root else None)))
+        table.extend(intermediate)
+
+        for node, values in frontier:
+            for c in subclasses[node.name]:
+                if c.virtual and subclasses[c.name]:
+                    add_level(c, key + values + (type_value(c),))
+                else:
+                    table.append((key + values + (type_value(c),), c))
+
+    add_level(root, ())
+    return table
+
+# Return the name of the view class of an IR class
+def view_name(ofclass):
+    if ofclass.name.startswith('of_'):
+        return ofclass.name[3:]
+    return ofclass.name
+
+# Return the IR class of an embedded struct or list element type, or None
+def embedded_class(oftype, version):
+    import py_gen.oftype
+    if py_gen.oftype.oftype_is_list(oftype):
+        wiretype = py_gen.oftype.oftype_list_elem(oftype) + '_t'
+    else:
+        wiretype = utils.lookup_ir_wiretype(oftype, version)
+    if wiretype in of_mixed_types:
+        wiretype = of_mixed_types[wiretype].get(version.wire_version, wiretype)
+    if not wiretype.endswith('_t'):
+        return None
+    return loxi_globals.ir[version].class_by_name(wiretype[:-2])
+
+# Name of the module level struct.Struct used by views to read a format
+def view_struct_name(fmt):
+    return '_struct_' + fmt.lstrip('!')
+
+# Return an expression adding a constant offset to the expression base
+def offset_expr(base, offset):
+    if offset == 0:
+        return base
+    return '%s + %d' % (base, offset)
+
+# Roots of classes whose 32 bit type_len discriminator holds the length of
+# the payload after it in its low byte
+type_len_roots = ('of_oxm', 'of_oxs')
+
+# Return an expression for the length of an object of ofclass in a view
+#
+# 'start' is an expression for the offset of the object in 'buf'. The length
+# includes the padding after objects with external alignment unless 'align'
+# is False. Returns None if the length is not known without parsing the
+# object.
+def view_length_expr(ofclass, start, align=True):
+    import py_gen.oftype
+    m = ofclass.length_member
+    if m and m.offset is not None:
+        fmt = '!' + py_gen.oftype.lookup_struct_format(m.oftype, ofclass.protocol.version).fmt
+        expr = '%s.unpack_from(buf, %s)[0]' % (view_struct_name(fmt), offset_expr(start, m.offset))
+        if align and ofclass.has_external_alignment:
+            expr = '(%s + 7) // 8 * 8' % expr
+        return expr
+    elif ofclass.is_fixed_length:
+        return str(ofclass.base_length)
+    elif root_class(ofclass).name in type_len_roots:
+        return '(_struct_L.unpack_from(buf, %s)[0] & 0xff) + 4' % start
+    elif not ofclass.virtual:
+        return members_length_expr(ofclass, start)
+    return None
+
+# Return an expression for the length of the members of ofclass, or None
+#
+# This works for classes without a length member whose members are all of
+# fixed length except for embedded objects that have a length member.
+def members_length_expr(ofclass, start):
+    version = ofclass.protocol.version
+    base, pos = None, 0
+    for m in ofclass.members:
+        if m.offset is not None:
+            base, pos = None, m.offset
+        if type(m) == OFPadMember:
+            pos += m.length
+        elif m.is_fixed_length:
+            pos += m.base_length
+        else:
+            import py_gen.oftype
+            embedded = embedded_class(m.oftype, version)
+            if not embedded or py_gen.oftype.oftype_is_list(m.oftype):
+                return None
+            if base is None:
+                member_start = offset_expr(start, pos)
+            else:
+                member_start = '%s + %s' % (start, offset_expr(base, pos))
+            expr = view_length_expr(embedded, member_start)
+            if expr is None:
+                return None
+            if base is None:
+                before = str(pos)
+            else:
+                before = offset_expr(base, pos)
+            base, pos = '%s + %s' % (before, expr), 0
+    if base is None:
+        return str(pos)
+    return offset_expr(base, pos)
+
+# A member of a view class
+#
+# 'kind' is 'struct' for members read with a struct, 'list' for lists of
+# objects, 'object' for embedded objects and 'other' for members decoded
+# with a reader. 'start' and 'end' are expressions for the offsets of the
+# member in 'buf', given the offset 'off' of the object. 'ofclass' is the IR
+# class of an embedded object or list element and 'fmt' the struct format.
+ViewMember = namedtuple('ViewMember', ['member', 'kind', 'start', 'end', 'ofclass', 'fmt'])
+
+# Return the members of the view class of ofclass
+#
+# Members after one of variable length have no fixed offset. Their start is
+# computed from the length of the preceding members, which is known for
+# members with a field length member and for embedded objects with a length
+# member. Other variable length members extend to the end of the object.
+def view_members(ofclass, version):
+    import py_gen.oftype
+    field_lengths = dict((m.field_name, m) for m in ofclass.members
+                         if type(m) == OFFieldLengthMember)
+    length_expr = view_length_expr(ofclass, 'off', align=False)
+    object_end = length_expr and 'off + ' + length_expr or 'len(buf)'
+    base, pos = 'off', 0
+    result = []
+    for m in ofclass.members:
+        if m.offset is not None:
+            base, pos = 'off', m.offset
+        start = offset_expr(base, pos)
+        embedded = None
+        if type(m) != OFPadMember:
+            embedded = embedded_class(m.oftype, version)
+
+        if type(m) != OFPadMember and m.name in field_lengths:
+            fl = field_lengths[m.name]
+            assert fl.offset is not None
+            fmt = '!' + py_gen.oftype.lookup_struct_format(fl.oftype, version).fmt
+            base, pos = '%s + %s.unpack_from(buf, off + %d)[0]' % (start, view_struct_name(fmt), fl.offset), 0
+        elif type(m) == OFPadMember:
+            pos += m.length
+        elif m.is_fixed_length:
+            pos += m.base_length
+        elif embedded and not py_gen.oftype.oftype_is_list(m.oftype) and \
+                view_length_expr(embedded, start):
+            base, pos = '%s + %s' % (start, view_length_expr(embedded, start)), 0
+        else:
+            base, pos = object_end, 0
+        end = offset_expr(base, pos)
+
+        if type(m) != OFDataMember and type(m) != OFDiscriminatorMember:
+            continue
+        struct_format = None
+        if m.name not in field_lengths:
+            struct_format = py_gen.oftype.lookup_struct_format(m.oftype, version)
+        if struct_format:
+            kind = 'struct'
+        elif embedded and py_gen.oftype.oftype_is_list(m.oftype):
+            kind = 'list'
+        elif embedded:
+            kind = 'object'
+        else:
+            kind = 'other'
+        fmt = struct_format and '!' + struct_format.fmt
+        result.append(ViewMember(m, kind, start, end, embedded, fmt))
+    return result
+
+# Return the struct formats read by the view classes of ofclasses
+def view_struct_formats(ofclasses, version):
+    fmts = set()
+    for ofclass in ofclasses:
+        exprs = [view_length_expr(ofclass, 'off') or '']
+        for vm in view_members(ofclass, version):
+            exprs += [vm.start, vm.end]
+            if vm.fmt:
+                fmts.add(vm.fmt)
+        for expr in exprs:
+            fmts.update('!' + x for x in re.findall(r'_struct_(\w+)', expr))
+    return sorted(fmts)
+
+# Return the inheritance root of ofclass
+def root_class(ofclass):
+    while ofclass.superclass:
+        ofclass = ofclass.superclass
+    return ofclass
+
 # Create intermediate representation, extended from the LOXI IR
 def build_ofclasses(version):
     modules = defaultdict(list)
@@ -88,7 +347,12 @@ def codegen(install_dir):
     render('__init__.py', template_name='toplevel_init.py')
     render('pp.py')
     render('generic_util.py')
+    render('framer.py')
     render('connection.py')
+    render('aio.py')
+    render('manager.py')
+    render('tools/__init__.py', template_name='tools_init.py')
+    render('tools/pcapdecode.py', template_name='pcapdecode.py')
 
     for version in loxi_globals.OFVersions.all_supported:
         subdir = 'of' + version.version.replace('.', '')
@@ -99,6 +363,9 @@ def codegen(install_dir):
 
         render(os.path.join(subdir, 'util.py'), version=version)
 
+        render(os.path.join(subdir, 'view.py'), version=version,
+               ofclasses=loxi_globals.ir[version].classes, subdir=subdir)
+
         render(os.path.join(subdir, 'const.py'), version=version,
                enums=loxi_globals.ir[version].enums)
 
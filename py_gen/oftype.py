@@ -30,10 +30,16 @@ from collections import namedtuple
 import loxi_utils.loxi_utils as loxi_utils
 import py_gen.codegen
 import loxi_globals
+from loxi_globals import OFVersions
+from loxi_ir import *
 
-OFTypeData = namedtuple("OFTypeData", ["init", "pack", "unpack"])
+OFTypeData = namedtuple("OFTypeData", ["init", "pack", "unpack", "pack_into"])
+OFTypeData.__new__.__defaults__ = (None,)
 
 # Map from LOXI type name to an object with templates for init, pack, and unpack
+# 'pack_into' is an optional template with 'value', 'buf' and 'offset' keys that
+# writes the value directly into a buffer and evaluates to the number of bytes
+# written.
 # Most types are defined using the convenience code below. This dict should
 # only be used directly for special cases such as primitive types.
 type_data_map = {
@@ -99,8 +105,9 @@ type_data_map = {
 
     'of_octets_t': OFTypeData(
         init="''",
-        pack='%s',
-        unpack='str(%s.read_all())'),
+        pack='loxi.generic_util.octets_str(%s)',
+        unpack='%s.read_octets()',
+        pack_into='loxi.generic_util.write_into(%(buf)s, %(offset)s, %(value)s)'),
 
     'of_bitmap_128_t': OFTypeData(
         init='set()',
@@ -110,7 +117,8 @@ type_data_map = {
     'of_oxm_t': OFTypeData(
         init='None',
         pack='%s.pack()',
-        unpack='ofp.oxm.oxm.unpack(%s)'),
+        unpack='ofp.oxm.oxm.unpack(%s)',
+        pack_into='%(value)s.pack_into(%(buf)s, %(offset)s)'),
 
     'of_checksum_128_t': OFTypeData(
         init='0',
@@ -160,7 +168,46 @@ for (cls, pyclass) in embedded_structs.items():
     type_data_map[cls] = OFTypeData(
         init='%s()' % pyclass,
         pack='%s.pack()',
-        unpack='%s.unpack(%%s)' % pyclass)
+        unpack='%s.unpack(%%s)' % pyclass,
+        pack_into='%(value)s.pack_into(%(buf)s, %(offset)s)')
+
+## Struct formats
+
+# Wire format of a fixed size type, used to pack and unpack runs of
+# consecutive fixed size members with a single precompiled struct. 'fmt' is
+# the struct format without byte order and produces exactly one value. 'pack'
+# and 'unpack' are optional templates to convert that value.
+StructFormat = namedtuple("StructFormat", ["fmt", "pack", "unpack"])
+
+struct_format_map = {
+    'char': StructFormat('B', None, None),
+    'uint8_t': StructFormat('B', None, None),
+    'uint16_t': StructFormat('H', None, None),
+    'uint32_t': StructFormat('L', None, None),
+    'uint64_t': StructFormat('Q', None, None),
+    'of_ipv4_t': StructFormat('L', None, None),
+    'of_ipv6_t': StructFormat('16s', None, None),
+    'of_mac_addr_t': StructFormat('6s', 'str(bytearray(%s))', 'list(bytearray(%s))'),
+}
+
+for (cls, length) in fixed_length_strings.items():
+    struct_format_map[cls] = StructFormat('%ds' % length, None, '%s.rstrip("\\x00")')
+
+# Types whose size depends on the version, see util.py
+def version_struct_format(oftype, version):
+    if oftype in ('of_port_no_t', 'of_fm_cmd_t'):
+        if version == OFVersions.VERSION_1_0:
+            return StructFormat('H', None, None)
+        elif oftype == 'of_port_no_t':
+            return StructFormat('L', None, None)
+        else:
+            return StructFormat('B', None, None)
+    elif oftype in ('of_wc_bmap_t', 'of_match_bmap_t'):
+        if version <= OFVersions.VERSION_1_1:
+            return StructFormat('L', None, None)
+        else:
+            return StructFormat('Q', None, None)
+    return None
 
 ## Public interface
 
@@ -190,6 +237,22 @@ def gen_pack_expr(oftype, value_expr, version):
     else:
         return "loxi.unimplemented('pack %s')" % oftype
 
+# Return an expression that packs the given oftype into a buffer
+#
+# 'buf_expr' and 'offset_expr' are strings of Python code which will evaluate
+# to the writable buffer and the offset to write at. The expression evaluates
+# to the number of bytes written.
+def gen_pack_into_expr(oftype, value_expr, buf_expr, offset_expr, version):
+    type_data = lookup_type_data(oftype, version)
+    if type_data and type_data.pack_into:
+        return type_data.pack_into % dict(value=value_expr, buf=buf_expr, offset=offset_expr)
+    elif oftype_is_list(oftype):
+        return "loxi.generic_util.pack_list_into(%s, %s, %s)" % \
+            (value_expr, buf_expr, offset_expr)
+    else:
+        return "loxi.generic_util.write_into(%s, %s, %s)" % \
+            (buf_expr, offset_expr, gen_pack_expr(oftype, value_expr, version))
+
 # Return an unpack expression for the given oftype
 #
 # 'reader_expr' is a string of Python code which will evaluate to
@@ -208,6 +271,79 @@ def gen_unpack_expr(oftype, reader_expr, version):
     else:
         return "loxi.unimplemented('unpack %s')" % oftype
 
+# Return the StructFormat for the given oftype, or None if it is not a fixed
+# size type that can be unpacked with a struct
+def lookup_struct_format(oftype, version):
+    wiretype = loxi_utils.lookup_ir_wiretype(oftype, version)
+    return struct_format_map.get(wiretype) or version_struct_format(wiretype, version)
+
+# Group the members of a class for packing and unpacking
+#
+# Returns a list of runs of consecutive members. A run of fixed size members
+# has a struct format string, including byte order, covering all of them.
+# Other members are returned in runs of their own with a format of None.
+def struct_runs(ofclass, version):
+    sliced = set(m.field_name for m in ofclass.members if type(m) == OFFieldLengthMember)
+    runs = []
+    for m in ofclass.members:
+        if type(m) == OFPadMember:
+            fmt = '%dx' % m.length
+        elif m.name in sliced or not lookup_struct_format(m.oftype, version):
+            fmt = None
+        else:
+            fmt = lookup_struct_format(m.oftype, version).fmt
+
+        if fmt is None:
+            runs.append(([m], None))
+        elif runs and runs[-1][1] is not None:
+            members, run_fmt = runs.pop()
+            runs.append((members + [m], run_fmt + fmt))
+        else:
+            runs.append(([m], '!' + fmt))
+    return runs
+
+# Return the members of a class that can be decoded on their own
+#
+# These are the members at a fixed offset, as computed by ir_offset, that
+# unpack with a struct. Returns a list of (member, struct format, offset).
+def lazy_members(ofclass, version):
+    sliced = set(m.field_name for m in ofclass.members if type(m) == OFFieldLengthMember)
+    result = []
+    for m in ofclass.members:
+        if type(m) != OFDataMember and type(m) != OFDiscriminatorMember:
+            continue
+        if m.offset is None or m.name in sliced:
+            continue
+        struct_format = lookup_struct_format(m.oftype, version)
+        if struct_format:
+            result.append((m, '!' + struct_format.fmt, m.offset))
+    return result
+
+# Return True if a run of members contains any values, rather than just padding
+def run_has_values(members):
+    return any(type(m) != OFPadMember for m in members)
+
+# Return the arguments to pack a run of fixed size members with its struct
+#
+# The value of the length member is taken from the local 'length' and the
+# value of a field length member from a local named after the member.
+def gen_struct_pack_args(members, version):
+    args = []
+    for m in members:
+        if type(m) == OFPadMember:
+            continue
+        elif type(m) == OFLengthMember:
+            args.append('length')
+        elif type(m) == OFFieldLengthMember:
+            args.append('_' + m.name)
+        else:
+            convert = lookup_struct_format(m.oftype, version).pack
+            if convert:
+                args.append(convert % ('self.' + m.name))
+            else:
+                args.append('self.' + m.name)
+    return args
+
 def oftype_is_list(oftype):
     return (oftype.find("list(") == 0)
 
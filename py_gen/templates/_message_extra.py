@@ -30,10 +30,35 @@ def parse_header(buf):
         raise loxi.ProtocolError("too short to be an OpenFlow message")
     return struct.unpack_from("!BBHL", buf)
 
-def parse_message(buf):
+def parse_message(buf, zero_copy=False, lazy=False):
+    """
+    Unpack a message from buf, which must contain exactly one message.
+
+    With zero_copy, octets fields such as packet_in data are memoryviews of
+    buf rather than copies.
+
+    With lazy, only the message type is decoded up front. The returned
+    object keeps buf and decodes a fixed offset member such as xid or
+    table_id on its first access. Accessing any other member, or using the
+    object in a way that needs all of them such as pack(), decodes the
+    whole message. A message shorter than the fixed part of its class is
+    rejected up front, other errors in the message body are raised at that
+    point.
+    """
     msg_ver, msg_type, msg_len, msg_xid = parse_header(buf)
     if msg_ver != ofp.OFP_VERSION and msg_type != ofp.OFPT_HELLO:
         raise loxi.ProtocolError("wrong OpenFlow version (expected %d, got %d)" % (ofp.OFP_VERSION, msg_ver))
     if len(buf) != msg_len:
         raise loxi.ProtocolError("incorrect message size")
-    return message.unpack(loxi.generic_util.OFReader(buf))
+    reader = loxi.generic_util.OFReader(buf, zero_copy=zero_copy)
+    if lazy:
+        subclass = loxi.generic_util.dispatch(reader, message.dispatch_table)
+        # Unknown subtypes resolve to a virtual class, which is unpacked
+        # eagerly
+        if subclass and 'lazy_members' in subclass.__dict__:
+            if msg_len < subclass.base_length:
+                raise loxi.ProtocolError("Buffer too short")
+            obj = subclass.__new__(subclass)
+            obj._lazy = reader
+            return obj
+    return message.unpack(reader)
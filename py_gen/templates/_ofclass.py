@@ -1,5 +1,6 @@
 :: superclass_pyname = ofclass.superclass.pyname if ofclass.superclass else "loxi.OFObject"
 :: from loxi_ir import *
+:: import py_gen.codegen
 :: import py_gen.oftype
 :: import py_gen.util as util
 :: type_members = [m for m in ofclass.members if type(m) == OFTypeMember]
@@ -8,8 +9,17 @@
 :: if ofclass.virtual:
 :: discriminator_fmts = { 1: "B", 2: "!H", 4: "!L" }
 :: discriminator_fmt = discriminator_fmts[ofclass.discriminator.length]
+:: #endif
+:: struct_runs = py_gen.oftype.struct_runs(ofclass, version)
+:: structs = [(i, fmt) for i, (members, fmt) in enumerate(struct_runs) if fmt is not None]
+:: for i, fmt in structs:
+_struct_${ofclass.pyname}_${i} = struct.Struct(${repr(fmt)})
+:: #endfor
+:: if structs:
+
 :: #endif
 class ${ofclass.pyname}(${superclass_pyname}):
+    __slots__ = ${repr(tuple(py_gen.codegen.slot_names(ofclass)))}
 :: if ofclass.virtual:
     subtypes = {}
 
@@ -17,6 +27,19 @@ class ${ofclass.pyname}(${superclass_pyname}):
 :: for m in type_members:
     ${m.name} = ${m.value}
 :: #endfor
+:: if not ofclass.virtual and ofclass.is_instanceof('of_header'):
+
+    lazy_members = {
+:: for m, fmt, offset in py_gen.oftype.lazy_members(ofclass, version):
+::     convert = py_gen.oftype.lookup_struct_format(m.oftype, version).unpack
+::     convert = convert and 'lambda x: ' + convert % 'x'
+        ${repr(m.name)}: (${repr(fmt)}, ${offset}, ${convert}),
+:: #endfor
+    }
+
+    # Length of the fixed part, checked before unpacking lazily
+    base_length = ${ofclass.base_length}
+:: #endif
 
     def __init__(${', '.join(['self'] + ["%s=None" % m.name for m in normal_members])}):
 :: for m in normal_members:
@@ -33,13 +56,19 @@ class ${ofclass.pyname}(${superclass_pyname}):
         return
 
     def pack(self):
-        packed = []
-:: include("_pack.py", ofclass=ofclass)
-        return ''.join(packed)
+:: include("_pack.py", ofclass=ofclass, struct_runs=struct_runs)
+
+    def pack_into(self, buf, offset):
+:: include("_pack_into.py", ofclass=ofclass, struct_runs=struct_runs)
 
     @staticmethod
     def unpack(reader):
-:: if ofclass.virtual:
+:: if ofclass.virtual and not ofclass.superclass:
+        subclass = loxi.generic_util.dispatch(reader, ${ofclass.pyname}.dispatch_table)
+        if subclass:
+            return subclass.unpack(reader)
+
+:: elif ofclass.virtual:
         subtype, = reader.peek(${repr(discriminator_fmt)}, ${ofclass.discriminator.offset})
         subclass = ${ofclass.pyname}.subtypes.get(subtype)
         if subclass:
@@ -47,7 +76,7 @@ class ${ofclass.pyname}(${superclass_pyname}):
 
 :: #endif
         obj = ${ofclass.pyname}()
-:: include("_unpack.py", ofclass=ofclass)
+:: include("_unpack.py", ofclass=ofclass, struct_runs=struct_runs)
         return obj
 
     def __eq__(self, other):
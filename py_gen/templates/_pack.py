@@ -25,43 +25,63 @@
 :: # EPL for the specific language governing permissions and limitations
 :: # under the EPL.
 ::
-:: # TODO coalesce format strings
 :: from loxi_ir import *
-:: from py_gen.oftype import gen_pack_expr
+:: import struct
+:: from py_gen.oftype import gen_pack_expr, gen_struct_pack_args
 :: length_member = None
-:: length_member_index = None
 :: field_length_members = {}
-:: field_length_indexes = {}
-:: index = 0
-:: for m in ofclass.members:
-::     if type(m) == OFLengthMember:
-::         length_member = m
-::         length_member_index = index
-        packed.append(${gen_pack_expr(m.oftype, '0', version=version)}) # placeholder for ${m.name} at index ${index}
-::     elif type(m) == OFFieldLengthMember:
-::         field_length_members[m.field_name] = m
-::         field_length_indexes[m.field_name] = index
-        packed.append(${gen_pack_expr(m.oftype, '0', version=version)}) # placeholder for ${m.name} at index ${index}
-::     elif type(m) == OFPadMember:
-        packed.append('\x00' * ${m.length})
-::     else:
-        packed.append(${gen_pack_expr(m.oftype, 'self.' + m.name, version=version)})
-::         if m.name in field_length_members:
-::             field_length_member = field_length_members[m.name]
-::             field_length_index = field_length_indexes[m.name]
-        packed[${field_length_index}] = ${gen_pack_expr(field_length_member.oftype, 'len(packed[-1])', version=version)}
+:: fixed_length = 0
+:: variable_members = []
+:: for members, fmt in struct_runs:
+::     for m in members:
+::         if type(m) == OFLengthMember:
+::             length_member = m
+::         elif type(m) == OFFieldLengthMember:
+::             field_length_members[m.field_name] = m
 ::         #endif
+::     #endfor
+::     if fmt is None:
+::         variable_members.append(members[0])
+::     else:
+::         fixed_length += struct.calcsize(fmt)
 ::     #endif
-::     index += 1
 :: #endfor
-:: if length_member_index != None:
-        length = sum([len(x) for x in packed])
+:: aligned = ofclass.has_internal_alignment or ofclass.has_external_alignment
+:: # Pack the variable length members first so their lengths are known
+:: for m in variable_members:
+        packed_${m.name} = ${gen_pack_expr(m.oftype, 'self.' + m.name, version=version)}
+::     if m.name in field_length_members:
+        _${field_length_members[m.name].name} = len(packed_${m.name})
+::     #endif
+:: #endfor
+:: if length_member or aligned:
+        length = ${' + '.join([str(fixed_length)] + ['len(packed_%s)' % m.name for m in variable_members])}
+:: #endif
+:: if aligned:
+        pad = loxi.generic_util.pad_to(8, length)
+:: #endif
 :: if ofclass.has_internal_alignment:
-        packed.append(loxi.generic_util.pad_to(8, length))
-        length += len(packed[-1])
+        length += len(pad)
 :: #endif
-        packed[${length_member_index}] = ${gen_pack_expr(length_member.oftype, 'length', version=version)}
+:: # Each run of fixed size members is packed with a single struct
+:: parts = []
+:: for i, (members, fmt) in enumerate(struct_runs):
+::     if fmt is None:
+::         parts.append('packed_' + members[0].name)
+::     else:
+::         args = gen_struct_pack_args(members, version=version)
+::         parts.append('_struct_%s_%d.pack(%s)' % (ofclass.pyname, i, ', '.join(args)))
+::     #endif
+:: #endfor
+:: if aligned:
+::     parts.append('pad')
 :: #endif
-:: if ofclass.has_external_alignment:
-        packed.append(loxi.generic_util.pad_to(8, length))
+:: if len(parts) == 1:
+        return ${parts[0]}
+:: else:
+        return ''.join([
+::     for part in parts:
+            ${part},
+::     #endfor
+        ])
 :: #endif
@@ -0,0 +1,76 @@
+:: # Copyright 2013, Big Switch Networks, Inc.
+:: #
+:: # LoxiGen is licensed under the Eclipse Public License, version 1.0 (EPL), with
+:: # the following special exception:
+:: #
+:: # LOXI Exception
+:: #
+:: # As a special exception to the terms of the EPL, you may distribute libraries
+:: # generated by LoxiGen (LoxiGen Libraries) under the terms of your choice, provided
+:: # that copyright and licensing notices generated by LoxiGen are not altered or removed
+:: # from the LoxiGen Libraries and the notice provided below is (i) included in
+:: # the LoxiGen Libraries, if distributed in source code form and (ii) included in any
+:: # documentation for the LoxiGen Libraries, if distributed in binary form.
+:: #
+:: # Notice: "Copyright 2013, Big Switch Networks, Inc. This library was generated by the LoxiGen Compiler."
+:: #
+:: # You may not use this file except in compliance with the EPL or LOXI Exception. You may obtain
+:: # a copy of the EPL at:
+:: #
+:: # http://www.eclipse.org/legal/epl-v10.html
+:: #
+:: # Unless required by applicable law or agreed to in writing, software
+:: # distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+:: # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+:: # EPL for the specific language governing permissions and limitations
+:: # under the EPL.
+::
+:: from loxi_ir import *
+:: import struct
+:: from py_gen.oftype import gen_pack_into_expr, gen_struct_pack_args
+:: length_member = None
+:: field_length_members = {}
+:: for members, fmt in struct_runs:
+::     for m in members:
+::         if type(m) == OFLengthMember:
+::             length_member = m
+::         elif type(m) == OFFieldLengthMember:
+::             field_length_members[m.field_name] = m
+::         #endif
+::     #endfor
+:: #endfor
+:: # Runs containing a length are written once the length is known
+:: deferred = []
+        pos = offset
+:: for i, (members, fmt) in enumerate(struct_runs):
+::     if fmt is None:
+::         m = members[0]
+::         pack_into_expr = gen_pack_into_expr(m.oftype, 'self.' + m.name, 'buf', 'pos', version=version)
+::         if m.name in field_length_members:
+        _${field_length_members[m.name].name} = ${pack_into_expr}
+        pos += _${field_length_members[m.name].name}
+::         else:
+        pos += ${pack_into_expr}
+::         #endif
+::     elif [x for x in members if type(x) in (OFLengthMember, OFFieldLengthMember)]:
+::         deferred.append(i)
+        offset_${i} = pos
+        pos += ${struct.calcsize(fmt)}
+::     else:
+        _struct_${ofclass.pyname}_${i}.pack_into(buf, pos${''.join([', ' + x for x in gen_struct_pack_args(members, version=version)])})
+        pos += ${struct.calcsize(fmt)}
+::     #endif
+:: #endfor
+:: if ofclass.has_internal_alignment:
+        pos += loxi.generic_util.write_into(buf, pos, loxi.generic_util.pad_to(8, pos - offset))
+:: #endif
+:: if length_member or ofclass.has_external_alignment:
+        length = pos - offset
+:: #endif
+:: for i in deferred:
+        _struct_${ofclass.pyname}_${i}.pack_into(buf, offset_${i}${''.join([', ' + x for x in gen_struct_pack_args(struct_runs[i][0], version=version)])})
+:: #endfor
+:: if ofclass.has_external_alignment:
+        pos += loxi.generic_util.write_into(buf, pos, loxi.generic_util.pad_to(8, length))
+:: #endif
+        return pos - offset
@@ -25,30 +25,63 @@
 :: # EPL for the specific language governing permissions and limitations
 :: # under the EPL.
 ::
-:: # TODO coalesce format strings
 :: from loxi_ir import *
-:: from py_gen.oftype import gen_unpack_expr
+:: import struct
+:: from py_gen.oftype import gen_unpack_expr, lookup_struct_format, run_has_values
 :: field_length_members = {}
-:: for m in ofclass.members:
-::     if type(m) == OFPadMember:
-        reader.skip(${m.length})
-::     elif type(m) == OFLengthMember:
+:: for i, (members, fmt) in enumerate(struct_runs):
+::     if fmt is None:
+::         m = members[0]
+::         if type(m) == OFLengthMember:
         _${m.name} = ${gen_unpack_expr(m.oftype, 'reader', version=version)}
         orig_reader = reader
         reader = orig_reader.slice(_${m.name}, ${m.offset + m.length})
-::     elif type(m) == OFFieldLengthMember:
-::         field_length_members[m.field_name] = m
+::         elif type(m) == OFFieldLengthMember:
+::             field_length_members[m.field_name] = m
         _${m.name} = ${gen_unpack_expr(m.oftype, 'reader', version=version)}
-::     elif type(m) == OFTypeMember:
+::         elif type(m) == OFTypeMember:
         _${m.name} = ${gen_unpack_expr(m.oftype, 'reader', version=version)}
         assert(_${m.name} == ${m.value})
-::     elif type(m) == OFDataMember or type(m) == OFDiscriminatorMember:
-::         if m.name in field_length_members:
-::             reader_expr = 'reader.slice(_%s)' % field_length_members[m.name].name
-::         else:
-::             reader_expr = 'reader'
-::         #endif
+::         elif type(m) == OFDataMember or type(m) == OFDiscriminatorMember:
+::             if m.name in field_length_members:
+::                 reader_expr = 'reader.slice(_%s)' % field_length_members[m.name].name
+::             else:
+::                 reader_expr = 'reader'
+::             #endif
         obj.${m.name} = ${gen_unpack_expr(m.oftype, reader_expr, version=version)}
+::         #endif
+::     elif not run_has_values(members):
+        reader.skip(${struct.calcsize(fmt)})
+::     else:
+::         # Unpack a run of fixed size members with one struct
+::         targets = []
+::         post = []
+::         for m in members:
+::             if type(m) == OFPadMember:
+::                 continue
+::             #endif
+::             convert = lookup_struct_format(m.oftype, version).unpack
+::             if type(m) == OFLengthMember:
+::                 targets.append('_' + m.name)
+::                 post.append('orig_reader = reader')
+::                 post.append('reader = orig_reader.slice(_%s, %d)' % (m.name, members[0].offset + struct.calcsize(fmt)))
+::             elif type(m) == OFFieldLengthMember:
+::                 field_length_members[m.field_name] = m
+::                 targets.append('_' + m.name)
+::             elif type(m) == OFTypeMember:
+::                 targets.append('_' + m.name)
+::                 post.append('assert(_%s == %s)' % (m.name, m.value))
+::             elif convert:
+::                 targets.append('_' + m.name)
+::                 post.append('obj.%s = %s' % (m.name, convert % ('_' + m.name)))
+::             else:
+::                 targets.append('obj.' + m.name)
+::             #endif
+::         #endfor
+        ${', '.join(targets)}${',' if len(targets) == 1 else ''} = reader.read_struct(_struct_${ofclass.pyname}_${i})
+::         for line in post:
+        ${line}
+::         #endfor
 ::     #endif
 :: #endfor
 :: if ofclass.has_external_alignment:
@@ -0,0 +1,875 @@
+:: # Copyright 2013, Big Switch Networks, Inc.
+:: #
+:: # LoxiGen is licensed under the Eclipse Public License, version 1.0 (EPL), with
+:: # the following special exception:
+:: #
+:: # LOXI Exception
+:: #
+:: # As a special exception to the terms of the EPL, you may distribute libraries
+:: # generated by LoxiGen (LoxiGen Libraries) under the terms of your choice, provided
+:: # that copyright and licensing notices generated by LoxiGen are not altered or removed
+:: # from the LoxiGen Libraries and the notice provided below is (i) included in
+:: # the LoxiGen Libraries, if distributed in source code form and (ii) included in any
+:: # documentation for the LoxiGen Libraries, if distributed in binary form.
+:: #
+:: # Notice: "Copyright 2013, Big Switch Networks, Inc. This library was generated by the LoxiGen Compiler."
+:: #
+:: # You may not use this file except in compliance with the EPL or LOXI Exception. You may obtain
+:: # a copy of the EPL at:
+:: #
+:: # http://www.eclipse.org/legal/epl-v10.html
+:: #
+:: # Unless required by applicable law or agreed to in writing, software
+:: # distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+:: # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+:: # EPL for the specific language governing permissions and limitations
+:: # under the EPL.
+::
+:: include('_copyright.py')
+"""
+Asynchronous OpenFlow connections
+
+Many connections can be driven from a single thread by an EventLoop. The
+loop and the Transport for each socket implement the parts of the asyncio
+interfaces that a Connection needs, and Connection implements the asyncio
+BufferedProtocol interface. The loop supports epoll and falls back to
+select.
+
+PyLoxi runs on Python 2, which has no asyncio or await. Coroutines are
+generators decorated with @coroutine that yield Futures and return a value
+by raising Return, like in Tornado or Trollius:
+
+    @loxi.aio.coroutine
+    def port_stats(loop, host):
+        cxn = yield loxi.aio.connect(loop, host)
+        replies = cxn.transact_multipart_replies(ofp.message.port_stats_request())
+        while True:
+            entries = yield replies.next()
+            if entries is None:
+                break
+            ...
+        raise loxi.aio.Return(...)
+
+    loop = loxi.aio.EventLoop()
+    loop.run_until_complete(port_stats(loop, "10.0.0.1"))
+"""
+
+:: include('_autogen.py')
+
+import errno
+import fcntl
+import functools
+import heapq
+import logging
+import os
+import select
+import socket
+import time
+import types
+from collections import deque
+
+import loxi
+import loxi.framer
+import loxi.of14
+from loxi.connection import DEFAULT_TIMEOUT, TransactionError
+
+logger = logging.getLogger("aio")
+
+def parse_message(buf):
+    """
+    Parse a message of any version, logging a warning and returning None if
+    that fails
+    """
+    try:
+        return loxi.protocol(ord(buf[0])).message.parse_message(buf)
+    except Exception as e:
+        logger.warn("Could not parse message: %s", e)
+        return None
+
+class Return(Exception):
+    """
+    Raised by a coroutine to return a value
+    """
+    def __init__(self, value=None):
+        Exception.__init__(self, value)
+        self.value = value
+
+class Future(object):
+    """
+    Result of an asynchronous operation
+
+    Callbacks added with add_done_callback are called with the future as
+    soon as it is done.
+    """
+    def __init__(self):
+        self._done = False
+        self._result = None
+        self._exception = None
+        self._callbacks = []
+
+    def done(self):
+        return self._done
+
+    def result(self):
+        if not self._done:
+            raise RuntimeError("result is not ready")
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+    def exception(self):
+        if not self._done:
+            raise RuntimeError("result is not ready")
+        return self._exception
+
+    def add_done_callback(self, fn):
+        if self._done:
+            fn(self)
+        else:
+            self._callbacks.append(fn)
+
+    def set_result(self, result):
+        assert not self._done
+        self._result = result
+        self._finish()
+
+    def set_exception(self, exception):
+        assert not self._done
+        self._exception = exception
+        self._finish()
+
+    def _finish(self):
+        self._done = True
+        callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            fn(self)
+
+class Task(Future):
+    """
+    Future for the result of a generator based coroutine
+    """
+    def __init__(self, gen):
+        Future.__init__(self)
+        self.gen = gen
+        self._step(None, None)
+
+    def _step(self, value, exception):
+        # Futures that are already done are resumed in this loop rather than
+        # recursively from their callbacks
+        while True:
+            try:
+                if exception is not None:
+                    future = self.gen.throw(exception)
+                else:
+                    future = self.gen.send(value)
+            except StopIteration:
+                self.set_result(None)
+                return
+            except Return as e:
+                self.set_result(e.value)
+                return
+            except Exception as e:
+                self.set_exception(e)
+                return
+            if not future.done():
+                future.add_done_callback(self._wakeup)
+                return
+            value, exception = future._result, future._exception
+
+    def _wakeup(self, future):
+        self._step(future._result, future._exception)
+
+def coroutine(fn):
+    """
+    Decorator that runs a generator function as a Task
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        gen = fn(*args, **kwargs)
+        if isinstance(gen, types.GeneratorType):
+            return Task(gen)
+        future = Future()
+        future.set_result(gen)
+        return future
+    return wrapper
+
+class Timer(object):
+    """
+    Handle for a callback scheduled with EventLoop.call_later
+    """
+    def __init__(self, when, callback, args):
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def __lt__(self, other):
+        return self.when < other.when
+
+class EventLoop(object):
+    """
+    Single threaded event loop for sockets and timers
+    """
+    def __init__(self):
+        self.readers = {}
+        self.writers = {}
+        self.timers = []
+        self.ready = deque()
+        self.stopping = False
+        if hasattr(select, 'epoll'):
+            self.epoll = select.epoll()
+        else:
+            self.epoll = None
+        # Pipe used by other threads to wake up the loop
+        self.wakeup_rd, self.wakeup_wr = os.pipe()
+        for fd in (self.wakeup_rd, self.wakeup_wr):
+            fcntl.fcntl(fd, fcntl.F_SETFL, fcntl.fcntl(fd, fcntl.F_GETFL) | os.O_NONBLOCK)
+        self.add_reader(self.wakeup_rd, self._read_wakeup)
+
+    def time(self):
+        return time.time()
+
+    def call_soon(self, callback, *args):
+        self.ready.append((callback, args))
+
+    def call_soon_threadsafe(self, callback, *args):
+        """
+        Schedule a callback from another thread
+        """
+        self.ready.append((callback, args))
+        try:
+            os.write(self.wakeup_wr, "x")
+        except OSError as e:
+            # A full pipe already wakes up the loop
+            if e.errno != errno.EAGAIN:
+                raise
+
+    def _read_wakeup(self):
+        try:
+            os.read(self.wakeup_rd, 4096)
+        except OSError as e:
+            if e.errno != errno.EAGAIN:
+                raise
+
+    def call_later(self, delay, callback, *args):
+        timer = Timer(self.time() + delay, callback, args)
+        heapq.heappush(self.timers, timer)
+        return timer
+
+    def add_reader(self, fd, callback):
+        self._update(fd, lambda: self.readers.__setitem__(fd, callback))
+
+    def remove_reader(self, fd):
+        self._update(fd, lambda: self.readers.pop(fd, None))
+
+    def add_writer(self, fd, callback):
+        self._update(fd, lambda: self.writers.__setitem__(fd, callback))
+
+    def remove_writer(self, fd):
+        self._update(fd, lambda: self.writers.pop(fd, None))
+
+    def _update(self, fd, change):
+        registered = fd in self.readers or fd in self.writers
+        change()
+        if self.epoll is None:
+            return
+        events = 0
+        if fd in self.readers:
+            events |= select.EPOLLIN
+        if fd in self.writers:
+            events |= select.EPOLLOUT
+        if events and registered:
+            self.epoll.modify(fd, events)
+        elif events:
+            self.epoll.register(fd, events)
+        elif registered:
+            self.epoll.unregister(fd)
+
+    def _poll(self, timeout):
+        """
+        Return lists of the readable and writable file descriptors
+        """
+        if self.epoll is not None:
+            if timeout is None:
+                timeout = -1
+            try:
+                events = self.epoll.poll(timeout)
+            except IOError as e:
+                if e.errno == errno.EINTR:
+                    return [], []
+                raise
+            readable = [fd for fd, mask in events if mask & (select.EPOLLIN | select.EPOLLERR | select.EPOLLHUP)]
+            writable = [fd for fd, mask in events if mask & (select.EPOLLOUT | select.EPOLLERR | select.EPOLLHUP)]
+            return readable, writable
+        elif not self.readers and not self.writers:
+            time.sleep(timeout or 0)
+            return [], []
+        else:
+            try:
+                readable, writable, _ = select.select(self.readers.keys(), self.writers.keys(), [], timeout)
+            except select.error as e:
+                if e.args[0] == errno.EINTR:
+                    return [], []
+                raise
+            return readable, writable
+
+    def run_once(self):
+        """
+        Wait for events and run the callbacks that are ready
+        """
+        if self.ready:
+            timeout = 0
+        elif self.timers:
+            timeout = max(0, self.timers[0].when - self.time())
+        else:
+            timeout = None
+
+        readable, writable = self._poll(timeout)
+        for fd in readable:
+            callback = self.readers.get(fd)
+            if callback:
+                self.ready.append((callback, ()))
+        for fd in writable:
+            callback = self.writers.get(fd)
+            if callback:
+                self.ready.append((callback, ()))
+
+        now = self.time()
+        while self.timers and self.timers[0].when <= now:
+            timer = heapq.heappop(self.timers)
+            if not timer.cancelled:
+                self.ready.append((timer.callback, timer.args))
+
+        for i in xrange(len(self.ready)):
+            callback, args = self.ready.popleft()
+            try:
+                callback(*args)
+            except Exception:
+                logger.exception("Exception in callback %r", callback)
+
+    def run_until_complete(self, future):
+        """
+        Run the loop until a future or generator is done and return its result
+        """
+        if isinstance(future, types.GeneratorType):
+            future = Task(future)
+        while not future.done():
+            self.run_once()
+        return future.result()
+
+    def run_forever(self):
+        self.stopping = False
+        while not self.stopping:
+            self.run_once()
+
+    def stop(self):
+        self.stopping = True
+
+    def close(self):
+        self.remove_reader(self.wakeup_rd)
+        os.close(self.wakeup_rd)
+        os.close(self.wakeup_wr)
+        if self.epoll is not None:
+            self.epoll.close()
+
+    def create_connection(self, protocol_factory, host=None, port=None, sock=None):
+        """
+        Connect to host and port, or use the connected socket sock
+
+        Returns a Future for a (transport, protocol) tuple.
+        """
+        future = Future()
+        if sock is None:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setblocking(False)
+            err = sock.connect_ex((host, port))
+            if err not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+                sock.close()
+                future.set_exception(socket.error(err, errno.errorcode.get(err, str(err))))
+                return future
+            def connected():
+                self.remove_writer(sock.fileno())
+                err = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                if err:
+                    sock.close()
+                    future.set_exception(socket.error(err, errno.errorcode.get(err, str(err))))
+                else:
+                    protocol = protocol_factory()
+                    future.set_result((Transport(self, sock, protocol), protocol))
+            self.add_writer(sock.fileno(), connected)
+        else:
+            protocol = protocol_factory()
+            future.set_result((Transport(self, sock, protocol), protocol))
+        return future
+
+class Transport(object):
+    """
+    Non-blocking socket transport with the asyncio Transport interface
+
+    Calls pause_writing on the protocol when more than high_water bytes are
+    waiting to be sent, and resume_writing once they fall to low_water.
+    """
+    high_water = 64 * 1024
+    low_water = 16 * 1024
+
+    def __init__(self, loop, sock, protocol):
+        self.loop = loop
+        self.sock = sock
+        self.fd = sock.fileno()
+        self.protocol = protocol
+        self.write_buffer = deque()
+        self.write_buffer_size = 0
+        self.writing_paused = False
+        self.closing = False
+        self.closed = False
+        sock.setblocking(False)
+        if sock.family in (socket.AF_INET, socket.AF_INET6):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, True)
+        protocol.connection_made(self)
+        loop.add_reader(self.fd, self._read_ready)
+
+    def get_extra_info(self, name, default=None):
+        if name == 'socket':
+            return self.sock
+        elif name == 'peername':
+            return self.sock.getpeername()
+        return default
+
+    def get_write_buffer_size(self):
+        return self.write_buffer_size
+
+    def is_closing(self):
+        return self.closing
+
+    def write(self, data):
+        if self.closing:
+            return
+        if not self.write_buffer:
+            try:
+                count = self.sock.send(data)
+            except socket.error as e:
+                if e.errno not in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                    self._close(e)
+                    return
+                count = 0
+            if count == len(data):
+                return
+            data = data[count:]
+            self.loop.add_writer(self.fd, self._write_ready)
+        self.write_buffer.append(data)
+        self.write_buffer_size += len(data)
+        if not self.writing_paused and self.write_buffer_size > self.high_water:
+            self.writing_paused = True
+            self.protocol.pause_writing()
+
+    def close(self):
+        if self.closing:
+            return
+        self.closing = True
+        self.loop.remove_reader(self.fd)
+        if not self.write_buffer:
+            self.loop.call_soon(self._close, None)
+
+    def abort(self):
+        """
+        Close the transport immediately, discarding unsent data
+        """
+        self._close(None)
+
+    def _read_ready(self):
+        try:
+            count = self.sock.recv_into(self.protocol.get_buffer(4096))
+        except socket.error as e:
+            if e.errno not in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                self._close(e)
+            return
+        if count:
+            self.protocol.buffer_updated(count)
+        else:
+            self.protocol.eof_received()
+            self._close(None)
+
+    def _write_ready(self):
+        data = self.write_buffer.popleft()
+        try:
+            count = self.sock.send(data)
+        except socket.error as e:
+            self.write_buffer.appendleft(data)
+            if e.errno not in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                self._close(e)
+            return
+        self.write_buffer_size -= count
+        if count < len(data):
+            self.write_buffer.appendleft(data[count:])
+        if self.writing_paused and self.write_buffer_size <= self.low_water:
+            self.writing_paused = False
+            self.protocol.resume_writing()
+        if not self.write_buffer:
+            self.loop.remove_writer(self.fd)
+            if self.closing:
+                self._close(None)
+
+    def _close(self, exc):
+        if self.closed:
+            return
+        self.closed = True
+        self.closing = True
+        self.loop.remove_reader(self.fd)
+        self.loop.remove_writer(self.fd)
+        self.sock.close()
+        self.protocol.connection_lost(exc)
+
+class Waiter(object):
+    """
+    Replies received for an outstanding transaction
+    """
+    def __init__(self):
+        self.msgs = deque()
+        self.future = None
+
+    def put(self, msg):
+        if self.future:
+            future, self.future = self.future, None
+            future.set_result(msg)
+        else:
+            self.msgs.append(msg)
+
+    def get(self):
+        future = Future()
+        if self.msgs:
+            future.set_result(self.msgs.popleft())
+        else:
+            self.future = future
+        return future
+
+class MultipartReplies(object):
+    """
+    Asynchronous iterator over the replies to a multipart request
+
+    next() returns a Future for the entries of the next reply, which is
+    None after the last reply.
+    """
+    def __init__(self, cxn, msg, timeout):
+        self.cxn = cxn
+        self.msg = msg
+        self.timeout = timeout
+        self.finished = False
+        self.waiter = cxn._add_waiter(msg)
+        self.sent = cxn.send(msg)
+
+    @coroutine
+    def next(self):
+        if self.finished:
+            raise Return(None)
+        try:
+            yield self.sent
+            reply = yield self.cxn._wait(self.waiter, self.timeout)
+            if reply is None:
+                raise TransactionError("no reply for %s" % type(self.msg).__name__, None)
+            elif not isinstance(reply, loxi.protocol(reply.version).message.stats_reply):
+                raise TransactionError("received %s in response to %s" % (type(reply).__name__, type(self.msg).__name__), reply)
+            if reply.flags & loxi.protocol(reply.version).OFPSF_REPLY_MORE == 0:
+                self.close()
+        except:
+            self.close()
+            raise
+        raise Return(reply.entries)
+
+    def close(self):
+        """
+        Stop waiting for replies
+        """
+        if not self.finished:
+            self.finished = True
+            self.cxn._remove_waiter(self.msg.xid)
+
+class Connection(object):
+    """
+    OpenFlow connection driven by an EventLoop
+
+    Implements the asyncio BufferedProtocol interface. The methods that
+    wait for the switch return Futures. Replies to transactions are routed
+    by xid, other messages are queued for recv or passed to the handler
+    given to the constructor, if any.
+    """
+    def __init__(self, loop, handler=None):
+        self.loop = loop
+        self.handler = handler
+        self.logger = logger
+        self.transport = None
+        # Start small, the framer grows as needed
+        self.framer = loxi.framer.Framer(size=4096)
+        self.rx = deque()
+        # Pending recv calls as (predicate, future) pairs
+        self.receivers = []
+        # Map from xid to Waiter
+        self.waiters = {}
+        self.next_xid = 1
+        self.drain_future = None
+        # Exception that made us abort the connection, if any
+        self.error = None
+        self.closed = Future()
+
+    # asyncio protocol interface
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def get_buffer(self, sizehint):
+        return self.framer.get_buffer(sizehint)
+
+    def buffer_updated(self, nbytes):
+        self.framer.buffer_updated(nbytes)
+        try:
+            for version, msg_type, xid, data in self.framer.frames():
+                msg = parse_message(data)
+                if msg is None:
+                    continue
+                self.logger.debug("Received message %s.%s xid %d length %d",
+                                  type(msg).__module__, type(msg).__name__, xid, len(data))
+                self.deliver(msg)
+        except loxi.ProtocolError as e:
+            # The stream can not be framed any more
+            self.abort(e)
+
+    def abort(self, error):
+        """
+        Close the connection after an error
+
+        connection_lost is called with the error, failing pending
+        transactions and receives.
+        """
+        self.logger.error("Closing connection: %s", error)
+        self.error = error
+        self.transport.abort()
+
+    def eof_received(self):
+        pass
+
+    def connection_lost(self, exc):
+        if exc is None:
+            exc = self.error
+        self.logger.debug("Connection lost: %s", exc)
+        for waiter in self.waiters.values():
+            if waiter.future:
+                waiter.put(None)
+        for predicate, future in self.receivers:
+            future.set_result(None)
+        self.receivers = []
+        self.resume_writing()
+        if not self.closed.done():
+            self.closed.set_result(exc)
+
+    def pause_writing(self):
+        if self.drain_future is None:
+            self.drain_future = Future()
+
+    def resume_writing(self):
+        if self.drain_future is not None:
+            future, self.drain_future = self.drain_future, None
+            future.set_result(None)
+
+    # Public interface
+
+    def deliver(self, msg):
+        """
+        Pass a received message to the transaction waiting for its xid, a
+        pending recv, the handler or the RX queue
+        """
+        waiter = self.waiters.get(msg.xid)
+        if waiter:
+            waiter.put(msg)
+            return
+        for i, (predicate, future) in enumerate(self.receivers):
+            if predicate(msg):
+                del self.receivers[i]
+                future.set_result(msg)
+                return
+        if self.handler:
+            self.handler(self, msg)
+        else:
+            self.rx.append(msg)
+
+    def send(self, msg):
+        """
+        Send a message
+
+        Returns a Future that is done when the transport is ready for more
+        data, so waiting for it applies backpressure to the sender.
+        """
+        if msg.xid is None:
+            msg.xid = self._gen_xid()
+        buf = msg.pack()
+        self.logger.debug("Sending message %s.%s xid %d length %d",
+                          type(msg).__module__, type(msg).__name__, msg.xid, len(buf))
+        self.transport.write(buf)
+        return self.drain()
+
+    def drain(self):
+        """
+        Return a Future that is done when the transport is ready for more data
+        """
+        if self.drain_future is not None:
+            return self.drain_future
+        future = Future()
+        future.set_result(None)
+        return future
+
+    def recv(self, predicate, timeout=DEFAULT_TIMEOUT):
+        """
+        Return a Future for the first message in the RX queue for which
+        'predicate' returns true, or None on timeout
+        """
+        future = Future()
+        for i, msg in enumerate(self.rx):
+            if predicate(msg):
+                del self.rx[i]
+                future.set_result(msg)
+                return future
+        receiver = (predicate, future)
+        self.receivers.append(receiver)
+        def expire():
+            if receiver in self.receivers:
+                self.receivers.remove(receiver)
+                future.set_result(None)
+        timer = self.loop.call_later(timeout, expire)
+        future.add_done_callback(lambda f: timer.cancel())
+        return future
+
+    def recv_any(self, timeout=DEFAULT_TIMEOUT):
+        """
+        Return a Future for the first message in the RX queue
+        """
+        return self.recv(lambda msg: True, timeout)
+
+    def recv_xid(self, xid, timeout=DEFAULT_TIMEOUT):
+        """
+        Return a Future for the first message with XID 'xid'
+        """
+        waiter = self.waiters.get(xid)
+        if waiter:
+            return self._wait(waiter, timeout)
+        return self.recv(lambda msg: msg.xid == xid, timeout)
+
+    def recv_class(self, klass, timeout=DEFAULT_TIMEOUT):
+        """
+        Return a Future for the first message in the RX queue which is an
+        instance of 'klass'
+        """
+        return self.recv(lambda msg: isinstance(msg, klass), timeout)
+
+    @coroutine
+    def transact(self, msg, timeout=DEFAULT_TIMEOUT):
+        """
+        Send a message and return a Future for the reply
+        """
+        waiter = self._add_waiter(msg)
+        try:
+            yield self.send(msg)
+            reply = yield self._wait(waiter, timeout)
+        finally:
+            self._remove_waiter(msg.xid)
+        if reply is None:
+            raise TransactionError("no reply for %s" % type(msg).__name__, None)
+        elif isinstance(reply, loxi.protocol(reply.version).message.error_msg):
+            raise TransactionError("received %s in response to %s" % (type(reply).__name__, type(msg).__name__), reply)
+        raise Return(reply)
+
+    def transact_multipart_replies(self, msg, timeout=DEFAULT_TIMEOUT):
+        """
+        Send a multipart request and return a MultipartReplies iterator
+        """
+        return MultipartReplies(self, msg, timeout)
+
+    @coroutine
+    def transact_multipart(self, msg, timeout=DEFAULT_TIMEOUT):
+        """
+        Send a multipart request and return a Future for all entries from
+        the replies
+        """
+        replies = self.transact_multipart_replies(msg, timeout)
+        entries = []
+        while True:
+            reply_entries = yield replies.next()
+            if reply_entries is None:
+                break
+            entries.extend(reply_entries)
+        raise Return(entries)
+
+    def close(self):
+        """
+        Close the connection once queued data has been sent
+
+        Returns a Future that is done when the connection is closed.
+        """
+        self.transport.close()
+        return self.closed
+
+    def _add_waiter(self, msg):
+        """
+        Assign an xid to msg if needed and route replies to a new waiter
+        """
+        new_xid = msg.xid is None
+        if new_xid:
+            msg.xid = self._gen_xid()
+        waiter = self.waiters[msg.xid] = Waiter()
+        if not new_xid:
+            for rx_msg in [x for x in self.rx if x.xid == msg.xid]:
+                self.rx.remove(rx_msg)
+                waiter.msgs.append(rx_msg)
+        return waiter
+
+    def _remove_waiter(self, xid):
+        """
+        Stop routing replies for xid, returning unread ones to the RX queue
+        """
+        waiter = self.waiters.pop(xid, None)
+        if waiter:
+            for msg in waiter.msgs:
+                self.deliver(msg)
+
+    def _wait(self, waiter, timeout):
+        """
+        Return a Future for the next message for a waiter, or None on timeout
+        """
+        if self.closed.done():
+            future = Future()
+            future.set_result(waiter.msgs.popleft() if waiter.msgs else None)
+            return future
+        future = waiter.get()
+        if not future.done():
+            def expire():
+                if waiter.future is future:
+                    waiter.future = None
+                    future.set_result(None)
+            timer = self.loop.call_later(timeout, expire)
+            future.add_done_callback(lambda f: timer.cancel())
+        return future
+
+    def _gen_xid(self):
+        xid = self.next_xid
+        self.next_xid += 1
+        return xid
+
+@coroutine
+def connect(loop, ip, port=6653, ofp=loxi.of14, handler=None, sock=None,
+            protocol_factory=None):
+    """
+    Actively connect to a switch and exchange HELLOs
+
+    Returns a Future for the Connection. If sock is given it is used
+    instead of connecting to ip and port. protocol_factory can create a
+    subclass of Connection instead.
+    """
+    if protocol_factory is None:
+        protocol_factory = lambda: Connection(loop, handler)
+    transport, cxn = yield loop.create_connection(protocol_factory, ip, port, sock=sock)
+    yield cxn.send(ofp.message.hello())
+    hello = yield cxn.recv(lambda msg: msg.type == ofp.OFPT_HELLO)
+    if not hello:
+        cxn.close()
+        raise Exception("Did not receive HELLO")
+    raise Return(cxn)
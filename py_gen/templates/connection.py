@@ -34,16 +34,22 @@ This class creates a thread which continually parses OpenFlow messages off the
 supplied socket and places them in a queue. The class has methods for reading messages
 from the RX queue, sending messages, and higher level operations like request-response
 and multipart transactions.
+
+Replies to a transaction in progress are routed by xid directly to the
+transaction and never enter the RX queue, which holds the unsolicited
+messages such as packet-ins and port status.
 """
 
 import loxi
 import loxi.of14
+import loxi.framer
 import logging
 import time
 import socket
 import errno
 import os
 import select
+from collections import deque
 from threading import Condition, Lock, Thread
 
 DEFAULT_TIMEOUT = 1
@@ -56,18 +62,31 @@ class TransactionError(Exception):
     def msg(self):
         return self.args[1]
 
+class Waiter(object):
+    """
+    Replies received for an outstanding transaction
+    """
+    def __init__(self, lock):
+        self.cv = Condition(lock)
+        self.msgs = deque()
+
 class Connection(Thread):
     def __init__(self, sock):
         Thread.__init__(self)
         self.sock = sock
         self.logger = logging.getLogger("connection")
         self.rx = []
-        self.rx_cv = Condition()
+        self.rx_lock = Lock()
+        self.rx_cv = Condition(self.rx_lock)
+        # Map from xid to Waiter, protected by rx_lock
+        self.waiters = {}
         self.tx_lock = Lock()
         self.next_xid = 1
         self.wakeup_rd, self.wakeup_wr = os.pipe()
         self.finished = False
-        self.read_buffer = None
+        # Exception that closed the connection, if any
+        self.error = None
+        self.framer = loxi.framer.Framer()
 
     def run(self):
         while not self.finished:
@@ -79,53 +98,59 @@ class Connection(Thread):
         self.logger.debug("Exited event loop")
 
     def process_read(self):
-        recvd = self.sock.recv(4096)
+        recvd = self.framer.recv_into(self.sock)
 
-        self.logger.debug("Received %d bytes", len(recvd))
+        self.logger.debug("Received %d bytes", recvd)
 
-        buf = self.read_buffer
-        if buf:
-            buf += recvd
-        else:
-            buf = recvd
+        try:
+            for hdr_version, hdr_type, hdr_xid, rawmsg in self.framer.frames():
+                # Use loxi to resolve ofp of matching version
+                ofp = loxi.protocol(hdr_version)
 
-        offset = 0
-        while offset < len(buf):
-            if offset + 8 > len(buf):
-                # Not enough data for the OpenFlow header
-                break
+                msg = ofp.message.parse_message(rawmsg)
+                if not msg:
+                    self.logger.warn("Could not parse message")
+                    continue
 
-            # Parse the header to get type
-            hdr_version, hdr_type, hdr_msglen, hdr_xid = loxi.of14.message.parse_header(buf[offset:])
+                self.logger.debug("Received message %s.%s xid %d length %d",
+                                  type(msg).__module__, type(msg).__name__, hdr_xid, len(rawmsg))
 
-            # Use loxi to resolve ofp of matching version
-            ofp = loxi.protocol(hdr_version)
+                self.deliver(msg)
+        except loxi.ProtocolError as e:
+            # The stream can not be framed any more
+            self.abort(e)
+            return
 
-            # Extract the raw message bytes
-            if (offset + hdr_msglen) > len(buf):
-                # Not enough data for the body
-                break
-            rawmsg = buf[offset : offset + hdr_msglen]
-            offset += hdr_msglen
+        if self.framer.pending():
+            self.logger.debug("%d bytes remaining", self.framer.pending())
 
-            msg = ofp.message.parse_message(rawmsg)
-            if not msg:
-                self.logger.warn("Could not parse message")
-                continue
-
-            self.logger.debug("Received message %s.%s xid %d length %d",
-                              type(msg).__module__, type(msg).__name__, hdr_xid, hdr_msglen)
+    def abort(self, error):
+        """
+        Close the connection after an error, waking up all blocked callers
+        """
+        self.logger.error("Closing connection: %s", error)
+        with self.rx_lock:
+            self.error = error
+            self.finished = True
+            self.rx_cv.notify_all()
+            for waiter in self.waiters.values():
+                waiter.cv.notify_all()
+        self.sock.close()
 
-            with self.rx_cv:
+    def deliver(self, msg):
+        """
+        Pass a received message to the transaction waiting for its xid, or
+        append it to the RX queue
+        """
+        with self.rx_lock:
+            waiter = self.waiters.get(msg.xid)
+            if waiter:
+                waiter.msgs.append(msg)
+                waiter.cv.notify()
+            else:
                 self.rx.append(msg)
                 self.rx_cv.notify_all()
 
-        if offset == len(buf):
-            self.read_buffer = None
-        else:
-            self.read_buffer = buf[offset:]
-            self.logger.debug("%d bytes remaining", len(self.read_buffer))
-
     def recv(self, predicate, timeout=DEFAULT_TIMEOUT):
         """
         Remove and return the first message in the RX queue for
@@ -141,7 +166,7 @@ class Connection(Thread):
                         return self.rx.pop(i)
 
                 now = time.time()
-                if now > deadline:
+                if now > deadline or self.finished:
                     return None
                 else:
                     self.rx_cv.wait(deadline - now)
@@ -154,8 +179,15 @@ class Connection(Thread):
 
     def recv_xid(self, xid, timeout=DEFAULT_TIMEOUT):
         """
-        Return the first message in the RX queue with XID 'xid'
+        Return the first message with XID 'xid'
+
+        Replies to a transaction in progress are returned from its waiter,
+        other messages from the RX queue.
         """
+        with self.rx_lock:
+            waiter = self.waiters.get(xid)
+        if waiter:
+            return self._wait(waiter, timeout)
         return self.recv(lambda msg: msg.xid == xid, timeout)
 
     def recv_class(self, klass, timeout=DEFAULT_TIMEOUT):
@@ -193,8 +225,12 @@ class Connection(Thread):
         """
         Send a message and return the reply
         """
-        self.send(msg)
-        reply = self.recv_xid(msg.xid, timeout)
+        waiter = self._add_waiter(msg)
+        try:
+            self.send(msg)
+            reply = self._wait(waiter, timeout)
+        finally:
+            self._remove_waiter(msg.xid)
         if reply is None:
             raise TransactionError("no reply for %s" % type(msg).__name__, None)
         elif isinstance(reply, loxi.protocol(reply.version).message.error_msg):
@@ -205,17 +241,21 @@ class Connection(Thread):
         """
         Send a multipart request and yield each entry from the replies
         """
-        self.send(msg)
-        finished = False
-        while not finished:
-            reply = self.recv_xid(msg.xid, timeout)
-            if reply is None:
-                raise TransactionError("no reply for %s" % type(msg).__name__, None)
-            elif not isinstance(reply, loxi.protocol(reply.version).message.stats_reply):
-                raise TransactionError("received %s in response to %s" % (type(reply).__name__, type(msg).__name__), reply)
-            for entry in reply.entries:
-                yield entry
-            finished = reply.flags & loxi.protocol(reply.version).OFPSF_REPLY_MORE == 0
+        waiter = self._add_waiter(msg)
+        try:
+            self.send(msg)
+            finished = False
+            while not finished:
+                reply = self._wait(waiter, timeout)
+                if reply is None:
+                    raise TransactionError("no reply for %s" % type(msg).__name__, None)
+                elif not isinstance(reply, loxi.protocol(reply.version).message.stats_reply):
+                    raise TransactionError("received %s in response to %s" % (type(reply).__name__, type(msg).__name__), reply)
+                for entry in reply.entries:
+                    yield entry
+                finished = reply.flags & loxi.protocol(reply.version).OFPSF_REPLY_MORE == 0
+        finally:
+            self._remove_waiter(msg.xid)
 
     def transact_multipart(self, msg, timeout=DEFAULT_TIMEOUT):
         """
@@ -230,7 +270,7 @@ class Connection(Thread):
         """
         Signal the thread to exit and wait for it
         """
-        assert not self.finished
+        assert not self.finished or self.error is not None
         self.logger.debug("Stopping connection")
         self.finished = True
         os.write(self.wakeup_wr, "x")
@@ -240,6 +280,46 @@ class Connection(Thread):
         os.close(self.wakeup_wr)
         self.logger.debug("Stopped connection")
 
+    def _add_waiter(self, msg):
+        """
+        Assign an xid to msg if needed and route replies to a new waiter
+
+        If the caller chose the xid, messages with that xid already in the RX
+        queue are moved to the waiter.
+        """
+        new_xid = msg.xid is None
+        if new_xid:
+            msg.xid = self._gen_xid()
+        with self.rx_lock:
+            waiter = self.waiters[msg.xid] = Waiter(self.rx_lock)
+            if not new_xid:
+                waiter.msgs.extend([x for x in self.rx if x.xid == msg.xid])
+                self.rx = [x for x in self.rx if x.xid != msg.xid]
+        return waiter
+
+    def _remove_waiter(self, xid):
+        """
+        Stop routing replies for xid, returning unread ones to the RX queue
+        """
+        with self.rx_lock:
+            waiter = self.waiters.pop(xid, None)
+            if waiter and waiter.msgs:
+                self.rx.extend(waiter.msgs)
+                self.rx_cv.notify_all()
+
+    def _wait(self, waiter, timeout):
+        """
+        Remove and return the first message for a waiter, or None on timeout
+        """
+        deadline = time.time() + timeout
+        with self.rx_lock:
+            while not waiter.msgs:
+                now = time.time()
+                if now > deadline or self.finished:
+                    return None
+                waiter.cv.wait(deadline - now)
+            return waiter.msgs.popleft()
+
     def _gen_xid(self):
         xid = self.next_xid
         self.next_xid += 1
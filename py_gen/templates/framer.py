@@ -0,0 +1,164 @@
+:: # Copyright 2013, Big Switch Networks, Inc.
+:: #
+:: # LoxiGen is licensed under the Eclipse Public License, version 1.0 (EPL), with
+:: # the following special exception:
+:: #
+:: # LOXI Exception
+:: #
+:: # As a special exception to the terms of the EPL, you may distribute libraries
+:: # generated by LoxiGen (LoxiGen Libraries) under the terms of your choice, provided
+:: # that copyright and licensing notices generated by LoxiGen are not altered or removed
+:: # from the LoxiGen Libraries and the notice provided below is (i) included in
+:: # the LoxiGen Libraries, if distributed in source code form and (ii) included in any
+:: # documentation for the LoxiGen Libraries, if distributed in binary form.
+:: #
+:: # Notice: "Copyright 2013, Big Switch Networks, Inc. This library was generated by the LoxiGen Compiler."
+:: #
+:: # You may not use this file except in compliance with the EPL or LOXI Exception. You may obtain
+:: # a copy of the EPL at:
+:: #
+:: # http://www.eclipse.org/legal/epl-v10.html
+:: #
+:: # Unless required by applicable law or agreed to in writing, software
+:: # distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+:: # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+:: # EPL for the specific language governing permissions and limitations
+:: # under the EPL.
+::
+:: include('_copyright.py')
+"""
+Splitting a stream of bytes into OpenFlow messages
+"""
+
+:: include('_autogen.py')
+
+import struct
+import loxi
+
+header_struct = struct.Struct("!BBHL")
+
+class Framer(object):
+    """
+    Buffer that splits a byte stream into OpenFlow messages
+
+    Data is appended to a growable bytearray, either read directly from a
+    socket with recv_into or fed from another source such as a capture file.
+    frames() yields the complete messages in the buffer as (version, type,
+    xid, data) tuples, where data is a memoryview of the message.
+
+    The space used by consumed messages is reclaimed lazily, when more room
+    is needed at the end of the buffer. The memoryviews returned by frames()
+    are therefore only valid until the next call to recv_into or feed. Parse
+    them or copy them with tobytes() before reading more data.
+
+    Framers for many idle connections can share one bytearray, passed as
+    'shared', to receive into. A framer then only allocates a buffer of
+    its own to keep an incomplete message. Call frames() after every
+    recv_into or feed, before another framer uses the shared buffer.
+
+    buf: buffer holding the data
+    start: offset of the first byte not yet framed
+    end: offset after the last byte of data
+    """
+    def __init__(self, size=65536, shared=None):
+        self.shared = shared
+        if shared is not None:
+            self.buf = shared
+        else:
+            self.buf = bytearray(size)
+        self.start = 0
+        self.end = 0
+        # Total length of an incomplete message at start, if known
+        self.needed = 0
+
+    def pending(self):
+        """
+        Return the number of bytes buffered that are not part of a frame yet
+        """
+        return self.end - self.start
+
+    def reserve(self, length):
+        """
+        Make room for at least 'length' more bytes at the end of the buffer
+        """
+        if self.end + length <= len(self.buf):
+            return
+        pending = self.end - self.start
+        if pending + length <= len(self.buf):
+            # Move the incomplete message to the front
+            self.buf[0:pending] = self.buf[self.start:self.end]
+        else:
+            # Copy into a new buffer, leaving memoryviews of the old one valid
+            buf = bytearray(max(len(self.buf) * 2, pending + length))
+            buf[0:pending] = self.buf[self.start:self.end]
+            self.buf = buf
+        self.start = 0
+        self.end = pending
+
+    def recv_into(self, sock, length=4096):
+        """
+        Receive data from a socket into the buffer
+
+        Room is made for at least 'length' bytes, or for the rest of an
+        incomplete message if that is larger. Returns the number of bytes
+        received, 0 at end of file.
+        """
+        count = sock.recv_into(self.get_buffer(length))
+        self.buffer_updated(count)
+        return count
+
+    def get_buffer(self, length=4096):
+        """
+        Return a writable memoryview of the free space at the end of the
+        buffer, at least 'length' bytes long or enough for the rest of an
+        incomplete message. Call buffer_updated once data has been written
+        to it.
+        """
+        length = max(length, self.needed - self.pending())
+        self.reserve(length)
+        return memoryview(self.buf)[self.end:]
+
+    def buffer_updated(self, count):
+        """
+        Add 'count' bytes written to the buffer returned by get_buffer
+        """
+        self.end += count
+
+    def feed(self, data):
+        """
+        Append a string or buffer to the data to be framed
+        """
+        self.reserve(len(data))
+        self.buf[self.end:self.end+len(data)] = data
+        self.end += len(data)
+
+    def frames(self):
+        """
+        Yield (version, type, xid, data) for each complete message buffered
+
+        Raises loxi.ProtocolError if a message header has an invalid length.
+        """
+        while self.end - self.start >= 8:
+            version, msg_type, length, xid = header_struct.unpack_from(self.buf, self.start)
+            if length < 8:
+                raise loxi.ProtocolError("invalid message length %d" % length)
+            if self.start + length > self.end:
+                self.needed = length
+                break
+            data = memoryview(self.buf)[self.start:self.start+length]
+            self.start += length
+            yield version, msg_type, xid, data
+        else:
+            self.needed = 0
+        if self.start == self.end:
+            self.start = self.end = 0
+            if self.shared is not None:
+                self.buf = self.shared
+        elif self.buf is self.shared:
+            # Keep the incomplete message in a buffer of our own
+            pending = self.end - self.start
+            buf = bytearray(max(pending + 4096, self.needed))
+            buf[0:pending] = self.buf[self.start:self.end]
+            self.buf = buf
+            self.start = 0
+            self.end = pending
@@ -38,6 +38,38 @@ import struct
 def pack_list(values):
     return "".join([x.pack() for x in values])
 
+def pack_list_into(values, buf, offset):
+    """
+    Pack each object into buf starting at offset and return the number of
+    bytes written.
+    """
+    pos = offset
+    for x in values:
+        pos += x.pack_into(buf, pos)
+    return pos - offset
+
+def octets_str(data):
+    """
+    Return an of_octets_t value as a string. Values unpacked in zero-copy
+    mode are memoryviews.
+    """
+    if type(data) == memoryview:
+        return data.tobytes()
+    return data
+
+def write_into(buf, offset, data):
+    """
+    Copy the string or memoryview data into buf at offset and return its
+    length.
+
+    Raises struct.error if buf is too short, like struct.pack_into.
+    """
+    end = offset + len(data)
+    if end > len(buf):
+        raise struct.error("pack_into requires a buffer of at least %d bytes" % end)
+    buf[offset:end] = data
+    return len(data)
+
 def unpack_list(reader, deserializer):
     """
     The deserializer function should take an OFReader and return the new object.
@@ -47,6 +79,76 @@ def unpack_list(reader, deserializer):
         entries.append(deserializer(reader))
     return entries
 
+def dispatch(reader, table):
+    """
+    Return the class to unpack the object at the reader's position with, or
+    None if it is an instance of the inheritance root itself.
+
+    table is the flattened dispatch table of the inheritance root. It maps
+    tuples of discriminator values to a class, or to a (struct, offset,
+    default) tuple when more discriminators must be peeked to find the class.
+    An unknown discriminator value selects the deepest class known from the
+    values read before it.
+    """
+    key = ()
+    entry = table[key]
+    while type(entry) == tuple:
+        st, offset, default = entry
+        offset += reader.offset
+        if offset + st.size > reader.length:
+            raise loxi.ProtocolError("Buffer too short")
+        base = len(key)
+        key += st.unpack_from(reader.buf, reader.start + offset)
+        entry = table.get(key)
+        if entry is None:
+            for n in xrange(len(key) - 1, base, -1):
+                entry = table.get(key[:n])
+                if entry is not None:
+                    return entry
+            return default
+    return entry
+
+def view_at(buf, pos, cls, views):
+    """
+    Return a view of the object at pos in buf
+
+    If the view class cls has a dispatch_table the view is of the class
+    found in it for the object. views maps classes to their view classes.
+    """
+    if cls.dispatch_table is not None:
+        subclass = dispatch(OFReader(buf, pos, len(buf) - pos), cls.dispatch_table)
+        cls = views.get(subclass, cls)
+    return cls(buf, pos)
+
+def view_list(buf, pos, end, cls, views):
+    """
+    Iterate over views of the objects in buf from pos to end
+
+    The view classes are found like in view_at. A single view of each class
+    is moved from object to object, so a view yielded is only valid until
+    the iteration continues.
+    """
+    if end > len(buf):
+        raise loxi.ProtocolError("list extends past the end of the buffer")
+    table = cls.dispatch_table
+    if table is not None:
+        reader = OFReader(buf, 0, end)
+        reused = {}
+    view = cls(buf, pos)
+    while pos < end:
+        if table is not None:
+            reader.offset = pos
+            klass = views.get(dispatch(reader, table), cls)
+            view = reused.get(klass)
+            if view is None:
+                view = reused[klass] = klass(buf, pos)
+        view.off = pos
+        length = view._length()
+        if length <= 0 or pos + length > end:
+            raise loxi.ProtocolError("invalid length %d in list" % length)
+        yield view
+        pos += length
+
 def pad_to(alignment, length):
     """
     Return a string of zero bytes that will pad a string of length 'length' to
@@ -54,6 +156,18 @@ def pad_to(alignment, length):
     """
     return "\x00" * ((length + alignment - 1)/alignment*alignment - length)
 
+# Cache of compiled struct.Struct objects by format
+structs = {}
+
+def get_struct(fmt):
+    """
+    Return a compiled struct.Struct for a format string
+    """
+    st = structs.get(fmt)
+    if st is None:
+        st = structs[fmt] = struct.Struct(fmt)
+    return st
+
 class OFReader(object):
     """
     Cursor over a read-only buffer
@@ -64,13 +178,22 @@ class OFReader(object):
     fields sequentially and is intended to be used recursively by the
     parsers of child objects which will implicitly update the offset.
 
+    In zero-copy mode the buffer is accessed through a memoryview and
+    of_octets_t fields are returned as memoryviews of it instead of copies.
+    These keep the whole buffer alive; use tobytes() to get a string that
+    does not.
+
     buf: buffer object
     start: initial position in the buffer
     length: number of bytes after start
     offset: distance from start
+    zero_copy: whether octets are returned as memoryviews
     """
-    def __init__(self, buf, start=0, length=None):
+    def __init__(self, buf, start=0, length=None, zero_copy=False):
+        if zero_copy and type(buf) != memoryview:
+            buf = memoryview(buf)
         self.buf = buf
+        self.zero_copy = zero_copy
         self.start = start
         if length is None:
             self.length = len(buf) - start
@@ -79,7 +202,12 @@ class OFReader(object):
         self.offset = 0
 
     def read(self, fmt):
-        st = struct.Struct(fmt)
+        return self.read_struct(get_struct(fmt))
+
+    def read_struct(self, st):
+        """
+        Unpack the next st.size bytes with a struct.Struct
+        """
         if self.offset + st.size > self.length:
             raise loxi.ProtocolError("Buffer too short")
         result = st.unpack_from(self.buf, self.start+self.offset)
@@ -92,8 +220,20 @@ class OFReader(object):
         self.offset = self.length
         return s
 
+    def read_octets(self):
+        """
+        Read the rest of the buffer as an of_octets_t value, which is a
+        memoryview in zero-copy mode and a string otherwise
+        """
+        s = self.read_all()
+        if self.zero_copy:
+            return s
+        elif type(s) == memoryview:
+            return s.tobytes()
+        return str(s)
+
     def peek(self, fmt, offset=0):
-        st = struct.Struct(fmt)
+        st = get_struct(fmt)
         if self.offset + offset + st.size > self.length:
             raise loxi.ProtocolError("Buffer too short")
         result = st.unpack_from(self.buf, self.start + self.offset + offset)
@@ -117,7 +257,7 @@ class OFReader(object):
     def slice(self, length, rewind=0):
         if self.offset + length - rewind > self.length:
             raise loxi.ProtocolError("Buffer too short")
-        reader = OFReader(self.buf, self.start + self.offset - rewind, length)
+        reader = OFReader(self.buf, self.start + self.offset - rewind, length, self.zero_copy)
         reader.skip(rewind)
         self.offset += length - rewind
         return reader
@@ -0,0 +1,281 @@
+:: # Copyright 2013, Big Switch Networks, Inc.
+:: #
+:: # LoxiGen is licensed under the Eclipse Public License, version 1.0 (EPL), with
+:: # the following special exception:
+:: #
+:: # LOXI Exception
+:: #
+:: # As a special exception to the terms of the EPL, you may distribute libraries
+:: # generated by LoxiGen (LoxiGen Libraries) under the terms of your choice, provided
+:: # that copyright and licensing notices generated by LoxiGen are not altered or removed
+:: # from the LoxiGen Libraries and the notice provided below is (i) included in
+:: # the LoxiGen Libraries, if distributed in source code form and (ii) included in any
+:: # documentation for the LoxiGen Libraries, if distributed in binary form.
+:: #
+:: # Notice: "Copyright 2013, Big Switch Networks, Inc. This library was generated by the LoxiGen Compiler."
+:: #
+:: # You may not use this file except in compliance with the EPL or LOXI Exception. You may obtain
+:: # a copy of the EPL at:
+:: #
+:: # http://www.eclipse.org/legal/epl-v10.html
+:: #
+:: # Unless required by applicable law or agreed to in writing, software
+:: # distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+:: # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+:: # EPL for the specific language governing permissions and limitations
+:: # under the EPL.
+::
+:: include('_copyright.py')
+"""
+Many OpenFlow connections on a single reactor thread
+
+A ConnectionManager runs a loxi.aio event loop in one thread and
+multiplexes all of its switch connections over it. This avoids a thread and
+a wakeup pipe per switch. The connections share one receive buffer and
+only keep a buffer of their own for an incomplete message. Parsed messages
+are routed by xid to transactions. Other messages are queued per
+connection, or passed to a handler called on the reactor thread.
+
+Messages can optionally be decoded by a pool of worker processes, which
+helps when a few busy switches send large multipart replies.
+
+The ManagedConnection objects returned by connect() have the same blocking
+interface as loxi.connection.Connection and can be used from any thread
+other than the reactor.
+"""
+
+:: include('_autogen.py')
+
+import multiprocessing
+import threading
+from collections import deque
+
+import loxi
+import loxi.aio
+import loxi.framer
+import loxi.of14
+from loxi.connection import DEFAULT_TIMEOUT
+
+class ManagerStopped(Exception):
+    """
+    Raised by calls to a ConnectionManager that has been stopped
+    """
+    pass
+
+def decode_messages(bufs):
+    """
+    Parse a list of raw messages in a worker process
+    """
+    return [loxi.aio.parse_message(buf) for buf in bufs]
+
+class ManagedProtocol(loxi.aio.Connection):
+    """
+    aio Connection that receives into the manager's shared buffer and
+    optionally decodes in its worker pool
+    """
+    def __init__(self, manager, handler):
+        loxi.aio.Connection.__init__(self, manager.loop, handler)
+        self.manager = manager
+        self.framer = loxi.framer.Framer(shared=manager.read_buffer)
+        # Batches sent to the worker pool, in the order they arrived. Each is
+        # a list that the decoded messages are appended to.
+        self.decoding = deque()
+
+    def connection_made(self, transport):
+        loxi.aio.Connection.connection_made(self, transport)
+        self.manager.protocols.add(self)
+
+    def connection_lost(self, exc):
+        self.manager.protocols.discard(self)
+        loxi.aio.Connection.connection_lost(self, exc)
+
+    def buffer_updated(self, nbytes):
+        if self.manager.pool is None:
+            loxi.aio.Connection.buffer_updated(self, nbytes)
+            return
+        self.framer.buffer_updated(nbytes)
+        try:
+            bufs = [data.tobytes() for version, msg_type, xid, data in self.framer.frames()]
+        except loxi.ProtocolError as e:
+            # The stream can not be framed any more
+            self.abort(e)
+            return
+        if bufs:
+            batch = []
+            def decoded(msgs):
+                # Called on a thread of the pool
+                batch.append(msgs)
+                self.loop.call_soon_threadsafe(self._deliver_decoded)
+            self.decoding.append(batch)
+            self.manager.pool.apply_async(decode_messages, (bufs,), callback=decoded)
+
+    def _deliver_decoded(self):
+        while self.decoding and self.decoding[0]:
+            for msg in self.decoding.popleft()[0]:
+                if msg is not None:
+                    self.deliver(msg)
+
+class ManagedConnection(object):
+    """
+    Blocking interface to a connection run by a ConnectionManager
+
+    See loxi.connection.Connection for the methods. The aio Connection is
+    available as 'protocol' for use on the reactor thread.
+    """
+    def __init__(self, manager, protocol):
+        self.manager = manager
+        self.protocol = protocol
+
+    def send(self, msg):
+        """
+        Send a message
+
+        Blocks while the connection's send buffer is full. On the reactor
+        thread, for example in a handler, the message is queued instead.
+        """
+        if threading.current_thread() is self.manager:
+            self.protocol.send(msg)
+        else:
+            self.manager.call(lambda: self.protocol.send(msg))
+
+    def recv(self, predicate, timeout=DEFAULT_TIMEOUT):
+        return self.manager.call(lambda: self.protocol.recv(predicate, timeout))
+
+    def recv_any(self, timeout=DEFAULT_TIMEOUT):
+        return self.manager.call(lambda: self.protocol.recv_any(timeout))
+
+    def recv_xid(self, xid, timeout=DEFAULT_TIMEOUT):
+        return self.manager.call(lambda: self.protocol.recv_xid(xid, timeout))
+
+    def recv_class(self, klass, timeout=DEFAULT_TIMEOUT):
+        return self.manager.call(lambda: self.protocol.recv_class(klass, timeout))
+
+    def transact(self, msg, timeout=DEFAULT_TIMEOUT):
+        return self.manager.call(lambda: self.protocol.transact(msg, timeout))
+
+    def transact_multipart_generator(self, msg, timeout=DEFAULT_TIMEOUT):
+        replies = self.manager.call(lambda: self.protocol.transact_multipart_replies(msg, timeout))
+        try:
+            while True:
+                entries = self.manager.call(replies.next)
+                if entries is None:
+                    break
+                for entry in entries:
+                    yield entry
+        finally:
+            self.manager.call(replies.close)
+
+    def transact_multipart(self, msg, timeout=DEFAULT_TIMEOUT):
+        return self.manager.call(lambda: self.protocol.transact_multipart(msg, timeout))
+
+    def close(self):
+        """
+        Close the connection and wait until it is closed
+        """
+        self.manager.call(self.protocol.close)
+
+class ConnectionManager(threading.Thread):
+    """
+    Thread running an event loop for many OpenFlow connections
+
+    decode_workers: number of worker processes for decoding messages, or 0
+                    to decode on the reactor thread
+    """
+    def __init__(self, decode_workers=0, read_buffer_size=256*1024):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.loop = loxi.aio.EventLoop()
+        self.read_buffer = bytearray(read_buffer_size)
+        self.protocols = set()
+        self.finished = False
+        # Completion callbacks of calls waiting for the reactor thread,
+        # protected by lock along with finished
+        self.calls = set()
+        self.lock = threading.Lock()
+        if decode_workers:
+            # Fork the workers before any other thread is started
+            self.pool = multiprocessing.Pool(decode_workers)
+        else:
+            self.pool = None
+
+    def run(self):
+        self.loop.run_forever()
+
+    def call(self, fn):
+        """
+        Call fn on the reactor thread and wait for the Future it returns
+
+        Returns the result of the Future or raises its exception. A result
+        that is not a Future is returned directly. Raises ManagerStopped if
+        the manager is stopped before the Future is done.
+        """
+        assert threading.current_thread() is not self, "would block the reactor thread"
+        done = threading.Event()
+        results = []
+        def finished(future):
+            with self.lock:
+                if done.is_set():
+                    return
+                self.calls.discard(finished)
+                results.append(future)
+                done.set()
+        def start():
+            try:
+                future = fn()
+            except Exception as e:
+                future = loxi.aio.Future()
+                future.set_exception(e)
+            if not isinstance(future, loxi.aio.Future):
+                result, future = future, loxi.aio.Future()
+                future.set_result(result)
+            future.add_done_callback(finished)
+        with self.lock:
+            if self.finished:
+                raise ManagerStopped("connection manager stopped")
+            self.calls.add(finished)
+            self.loop.call_soon_threadsafe(start)
+        # Waiting with a timeout lets KeyboardInterrupt through
+        while not done.wait(3600):
+            pass
+        return results[0].result()
+
+    def connect(self, ip, port=6653, ofp=loxi.of14, handler=None, sock=None):
+        """
+        Connect to a switch, or use the connected socket sock, and exchange
+        HELLOs
+
+        handler(cxn, msg), if given, is called on the reactor thread with
+        the ManagedConnection for each message that is not a reply to a
+        transaction or a recv. Otherwise these messages are queued for recv.
+        """
+        cxn = ManagedConnection(self, None)
+        if handler:
+            protocol_handler = lambda protocol, msg: handler(cxn, msg)
+        else:
+            protocol_handler = None
+        cxn.protocol = self.call(lambda: loxi.aio.connect(
+            self.loop, ip, port, ofp=ofp, sock=sock,
+            protocol_factory=lambda: ManagedProtocol(self, protocol_handler)))
+        return cxn
+
+    def stop(self):
+        """
+        Close all connections and wait for the thread to exit
+        """
+        with self.lock:
+            assert not self.finished
+            self.finished = True
+        def close_all():
+            for protocol in list(self.protocols):
+                protocol.transport.abort()
+            self.loop.stop()
+        self.loop.call_soon_threadsafe(close_all)
+        self.join()
+        self.loop.close()
+        # Fail the calls that the loop did not complete before it stopped
+        error = loxi.aio.Future()
+        error.set_exception(ManagerStopped("connection manager stopped"))
+        for finished in list(self.calls):
+            finished(error)
+        if self.pool:
+            self.pool.terminate()
@@ -26,6 +26,7 @@
 :: # under the EPL.
 ::
 :: from loxi_globals import OFVersions
+:: import py_gen.codegen
 :: import py_gen.oftype
 :: include('_copyright.py')
 
@@ -42,6 +43,22 @@ ofp = sys.modules['loxi.${subdir}']
 :: for ofclass in ofclasses:
 :: include('_ofclass.py', ofclass=ofclass)
 
+:: #endfor
+:: for ofclass in ofclasses:
+::     if ofclass.virtual and not ofclass.superclass:
+${ofclass.pyname}.dispatch_table = {
+::         for key, entry in py_gen.codegen.dispatch_table(ofclass, ofclasses):
+::             if type(entry) == tuple:
+::                 fmt, offset, default = entry
+::                 entry = "(struct.Struct(%r), %d, %s)" % (fmt, offset, default.pyname if default else None)
+::             else:
+::                 entry = entry.pyname
+::             #endif
+    (${', '.join(str(v) for v in key)}${',' if len(key) == 1 else ''}): ${entry},
+::         #endfor
+}
+
+::     #endif
 :: #endfor
 
 :: if 'extra_template' in locals():
@@ -0,0 +1,600 @@
+:: # Copyright 2013, Big Switch Networks, Inc.
+:: #
+:: # LoxiGen is licensed under the Eclipse Public License, version 1.0 (EPL), with
+:: # the following special exception:
+:: #
+:: # LOXI Exception
+:: #
+:: # As a special exception to the terms of the EPL, you may distribute libraries
+:: # generated by LoxiGen (LoxiGen Libraries) under the terms of your choice, provided
+:: # that copyright and licensing notices generated by LoxiGen are not altered or removed
+:: # from the LoxiGen Libraries and the notice provided below is (i) included in
+:: # the LoxiGen Libraries, if distributed in source code form and (ii) included in any
+:: # documentation for the LoxiGen Libraries, if distributed in binary form.
+:: #
+:: # Notice: "Copyright 2013, Big Switch Networks, Inc. This library was generated by the LoxiGen Compiler."
+:: #
+:: # You may not use this file except in compliance with the EPL or LOXI Exception. You may obtain
+:: # a copy of the EPL at:
+:: #
+:: # http://www.eclipse.org/legal/epl-v10.html
+:: #
+:: # Unless required by applicable law or agreed to in writing, software
+:: # distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+:: # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+:: # EPL for the specific language governing permissions and limitations
+:: # under the EPL.
+::
+:: include('_copyright.py')
+"""
+Decoding OpenFlow messages from packet captures
+
+Reads a pcap or pcapng file, reassembles the TCP streams to and from the
+OpenFlow ports and decodes the messages in them, printing a summary line or
+a JSON object for each message in order of time:
+
+    python -m loxi.tools.pcapdecode [--json] [-p PORT] [-j JOBS] FILE
+
+The capture is mapped into memory rather than read. The main process only
+keeps the positions of the TCP payloads of each stream in it. The streams
+are decoded by a pool of worker processes, which map the file themselves
+and frame each stream as its segments are added, so they only buffer an
+incomplete message. Each worker writes the lines of a stream to a temporary
+file, already in order of time, and the files are merged by time.
+
+The time of a message is that of the packet that completed it. A stream
+that does not start with an OpenFlow header, as when the capture starts in
+the middle of a message, is reported as a single error. So is the data
+after a segment missing from the capture.
+"""
+
+:: include('_autogen.py')
+
+import heapq
+import json
+import mmap
+import multiprocessing
+import os
+import shutil
+import socket
+import struct
+import sys
+import tempfile
+from optparse import OptionParser
+
+import loxi
+
+DEFAULT_PORTS = (6633, 6653)
+
+class CaptureError(Exception):
+    """
+    Raised when a capture file cannot be read
+    """
+    pass
+
+pcap_record_structs = {
+    '<': struct.Struct('<LLLL'),
+    '>': struct.Struct('>LLLL'),
+}
+
+def read_pcap(data, endian, resolution):
+    """
+    Yield (timestamp, link type, offset, length) for each packet of a pcap
+    file
+    """
+    if len(data) < 24:
+        raise CaptureError("truncated pcap header")
+    linktype = struct.unpack_from(endian + 'L', data, 20)[0] & 0xffff
+    record_struct = pcap_record_structs[endian]
+    pos = 24
+    while pos + 16 <= len(data):
+        sec, frac, caplen, origlen = record_struct.unpack_from(data, pos)
+        pos += 16
+        if pos + caplen > len(data):
+            # Truncated capture
+            break
+        yield sec + frac * resolution, linktype, pos, caplen
+        pos += caplen
+
+def pcapng_resolution(data, pos, end, endian):
+    """
+    Return the timestamp resolution in the options of an interface
+    description block
+    """
+    while pos + 4 <= end:
+        code, length = struct.unpack_from(endian + 'HH', data, pos)
+        if code == 0:
+            break
+        if code == 9 and length >= 1:
+            value = ord(data[pos+4])
+            if value & 0x80:
+                return 2.0 ** -(value & 0x7f)
+            return 10.0 ** -value
+        pos += 4 + (length + 3) // 4 * 4
+    return 1e-6
+
+def read_pcapng(data):
+    """
+    Yield (timestamp, link type, offset, length) for each packet of a pcapng
+    file
+
+    Simple packet blocks have no timestamp and get that of the packet before
+    them.
+    """
+    endian = '<'
+    interfaces = []
+    timestamp = 0.0
+    pos = 0
+    while pos + 12 <= len(data):
+        if data[pos:pos+4] == '\x0a\x0d\x0d\x0a':
+            # Section header block, which sets the byte order
+            if data[pos+8:pos+12] == '\x1a\x2b\x3c\x4d':
+                endian = '>'
+            else:
+                endian = '<'
+            interfaces = []
+        block_type, block_len = struct.unpack_from(endian + 'LL', data, pos)
+        if block_len < 12 or pos + block_len > len(data):
+            # Truncated capture
+            break
+        body = pos + 8
+        try:
+            if block_type == 1:
+                # Interface description block
+                linktype, snaplen = struct.unpack_from(endian + 'HxxL', data, body)
+                resolution = pcapng_resolution(data, body + 8, pos + block_len - 4, endian)
+                interfaces.append((linktype, resolution, snaplen))
+            elif block_type == 6:
+                # Enhanced packet block
+                iface, ts_high, ts_low, caplen = struct.unpack_from(endian + 'LLLL', data, body)
+                linktype, resolution, snaplen = interfaces[iface]
+                timestamp = ((ts_high << 32) | ts_low) * resolution
+                yield timestamp, linktype, body + 20, min(caplen, block_len - 32)
+            elif block_type == 3:
+                # Simple packet block
+                origlen, = struct.unpack_from(endian + 'L', data, body)
+                linktype, resolution, snaplen = interfaces[0]
+                caplen = min(origlen, block_len - 16)
+                if snaplen:
+                    caplen = min(caplen, snaplen)
+                yield timestamp, linktype, body + 4, caplen
+        except IndexError:
+            raise CaptureError("packet block at offset %d for an unknown interface" % pos)
+        pos += block_len
+
+def read_packets(data):
+    """
+    Yield (timestamp, link type, offset, length) for each packet of a pcap
+    or pcapng file
+    """
+    magic = data[0:4]
+    if magic == '\xd4\xc3\xb2\xa1':
+        return read_pcap(data, '<', 1e-6)
+    elif magic == '\xa1\xb2\xc3\xd4':
+        return read_pcap(data, '>', 1e-6)
+    elif magic == '\x4d\x3c\xb2\xa1':
+        return read_pcap(data, '<', 1e-9)
+    elif magic == '\xa1\xb2\x3c\x4d':
+        return read_pcap(data, '>', 1e-9)
+    elif magic == '\x0a\x0d\x0d\x0a':
+        return read_pcapng(data)
+    raise CaptureError("not a pcap or pcapng file")
+
+def ip_offset(data, linktype, pos, end):
+    """
+    Return the offset of the IP header of a packet, or None if it is not an
+    IP packet
+    """
+    if linktype == 1:
+        # Ethernet, possibly with VLAN tags
+        if end - pos < 14:
+            return None
+        ethertype, = struct.unpack_from('!H', data, pos + 12)
+        pos += 14
+        while ethertype in (0x8100, 0x88a8) and end - pos >= 4:
+            ethertype, = struct.unpack_from('!H', data, pos + 2)
+            pos += 4
+    elif linktype == 113:
+        # Linux cooked capture
+        if end - pos < 16:
+            return None
+        ethertype, = struct.unpack_from('!H', data, pos + 14)
+        pos += 16
+    elif linktype == 276:
+        # Linux cooked capture v2
+        if end - pos < 20:
+            return None
+        ethertype, = struct.unpack_from('!H', data, pos)
+        pos += 20
+    elif linktype in (0, 108):
+        # BSD loopback, the IP version tells the address family
+        return pos + 4
+    elif linktype in (12, 14, 101, 228, 229):
+        # Raw IP
+        return pos
+    else:
+        return None
+    if ethertype not in (0x0800, 0x86dd):
+        return None
+    return pos
+
+def parse_tcp(data, pos, end):
+    """
+    Parse the IP and TCP headers of a packet
+
+    Returns (family, source address, source port, destination address,
+    destination port, sequence number, flags, payload offset, payload end),
+    or None if it is not an unfragmented TCP packet.
+    """
+    if end - pos < 20:
+        return None
+    version = ord(data[pos]) >> 4
+    if version == 4:
+        version_ihl, total_len, frag, proto = struct.unpack_from('!BxHxxHxB', data, pos)
+        if proto != 6 or frag & 0x3fff:
+            return None
+        family = socket.AF_INET
+        src = data[pos+12:pos+16]
+        dst = data[pos+16:pos+20]
+        end = min(end, pos + total_len)
+        pos += (version_ihl & 0xf) * 4
+    elif version == 6:
+        if end - pos < 40:
+            return None
+        payload_len, next_header = struct.unpack_from('!HB', data, pos + 4)
+        if next_header != 6:
+            return None
+        family = socket.AF_INET6
+        src = data[pos+8:pos+24]
+        dst = data[pos+24:pos+40]
+        end = min(end, pos + 40 + payload_len)
+        pos += 40
+    else:
+        return None
+    if end - pos < 20:
+        return None
+    sport, dport, seq, offset_flags = struct.unpack_from('!HHLxxxxH', data, pos)
+    header_len = (offset_flags >> 12) * 4
+    if header_len < 20 or pos + header_len > end:
+        return None
+    return family, src, sport, dst, dport, seq, offset_flags & 0x1ff, pos + header_len, end
+
+TCP_SYN = 0x02
+
+def seq_diff(a, b):
+    """
+    Return a - b for TCP sequence numbers
+    """
+    diff = (a - b) & 0xffffffff
+    if diff >= 0x80000000:
+        diff -= 0x100000000
+    return diff
+
+class Stream(object):
+    """
+    The payload of one direction of a TCP connection
+
+    segments: in order (timestamp, offset, length) of the payload in the file
+    pending: segments received ahead of a missing one, by sequence number
+    syn: whether the stream starts with a SYN
+    """
+    def __init__(self, src, dst):
+        self.src = src
+        self.dst = dst
+        self.next_seq = None
+        self.segments = []
+        self.pending = {}
+        self.syn = False
+
+    def add(self, timestamp, seq, flags, offset, length):
+        if flags & TCP_SYN:
+            seq = (seq + 1) & 0xffffffff
+            if self.next_seq is None:
+                self.next_seq = seq
+                self.syn = True
+        if length == 0:
+            return
+        if self.next_seq is None:
+            # The capture started after the handshake
+            self.next_seq = seq
+        if seq_diff(seq, self.next_seq) > 0:
+            self.pending.setdefault(seq, (timestamp, offset, length))
+            return
+        self.append(timestamp, seq, offset, length)
+        while self.pending:
+            ready = [seq for seq in self.pending if seq_diff(seq, self.next_seq) <= 0]
+            if not ready:
+                break
+            for seq in sorted(ready, key=lambda seq: seq_diff(seq, self.next_seq)):
+                timestamp, offset, length = self.pending.pop(seq)
+                self.append(timestamp, seq, offset, length)
+
+    def append(self, timestamp, seq, offset, length):
+        # Skip data already received, as in retransmissions
+        overlap = seq_diff(self.next_seq, seq)
+        if overlap >= length:
+            return
+        self.segments.append((timestamp, offset + overlap, length - overlap))
+        self.next_seq = (self.next_seq + length - overlap) & 0xffffffff
+
+def format_address(family, addr, port):
+    if family == socket.AF_INET6:
+        return "[%s]:%d" % (socket.inet_ntop(family, addr), port)
+    return "%s:%d" % (socket.inet_ntop(family, addr), port)
+
+def find_streams(data, ports=DEFAULT_PORTS):
+    """
+    Reassemble the TCP streams to and from the given ports in a capture
+
+    Returns a list of Stream objects in the order their first packet was
+    captured.
+    """
+    ports = set(ports)
+    streams = []
+    current = {}
+    for timestamp, linktype, pos, length in read_packets(data):
+        end = pos + length
+        pos = ip_offset(data, linktype, pos, end)
+        if pos is None:
+            continue
+        tcp = parse_tcp(data, pos, end)
+        if tcp is None:
+            continue
+        family, src, sport, dst, dport, seq, flags, payload, end = tcp
+        if sport not in ports and dport not in ports:
+            continue
+        key = (src, sport, dst, dport)
+        stream = current.get(key)
+        if stream is None or (flags & TCP_SYN and stream.segments):
+            # New connection, possibly reusing the addresses of an old one
+            stream = Stream(format_address(family, src, sport),
+                            format_address(family, dst, dport))
+            current[key] = stream
+            streams.append(stream)
+        stream.add(timestamp, seq, flags, payload, end - payload)
+    return streams
+
+def to_json(value):
+    """
+    Convert a member value to something JSON can encode
+
+    Strings are kept if they are printable and written in hex otherwise.
+    """
+    if isinstance(value, loxi.OFObject):
+        result = { 'class': type(value).__name__ }
+        for name in value._member_slots():
+            if hasattr(value, name):
+                result[name] = to_json(getattr(value, name))
+        return result
+    elif isinstance(value, (list, tuple)):
+        return [to_json(x) for x in value]
+    elif isinstance(value, (set, frozenset)):
+        return sorted(value)
+    elif isinstance(value, (str, bytearray, memoryview)):
+        value = str(value)
+        if all(' ' <= c <= '~' for c in value):
+            return value
+        return value.encode('hex')
+    return value
+
+header_struct = struct.Struct("!BBHL")
+
+def format_message(timestamp, src, dst, header, msg, error, as_json):
+    version, msg_type, length, xid = header
+    if as_json:
+        record = {
+            'time': timestamp,
+            'src': src,
+            'dst': dst,
+            'version': loxi.version_names.get(version, version),
+            'length': length,
+            'xid': xid,
+        }
+        if msg is not None:
+            record['type'] = type(msg).__name__
+            record['message'] = to_json(msg)
+        else:
+            record['error'] = error
+        return json.dumps(record, sort_keys=True)
+    if msg is not None:
+        return "%.6f %s > %s %s xid=%d len=%d" % (timestamp, src, dst, type(msg).__name__, xid, length)
+    return "%.6f %s > %s error: %s" % (timestamp, src, dst, error.replace("\n", " "))
+
+def format_error(timestamp, src, dst, error, as_json):
+    if as_json:
+        return json.dumps({ 'time': timestamp, 'src': src, 'dst': dst, 'error': error }, sort_keys=True)
+    return "%.6f %s > %s error: %s" % (timestamp, src, dst, error.replace("\n", " "))
+
+def decode_segments(data, src, dst, segments, pending, syn, as_json):
+    """
+    Yield (timestamp, line) for each message in a stream, in order of time
+
+    The segments are framed as they are added to a buffer, which only keeps
+    the start of an incomplete message between them.
+    """
+    total = sum(length for timestamp, offset, length in segments)
+    # Bytes of the stream before buf
+    consumed = 0
+    buf = ''
+    timestamp = None
+    for segment_timestamp, offset, length in segments:
+        if timestamp is None or segment_timestamp > timestamp:
+            timestamp = segment_timestamp
+        buf += data[offset:offset+length]
+        if consumed == 0 and len(buf) >= 8:
+            # Check that the stream starts with an OpenFlow header
+            version, msg_type, msg_len, xid = header_struct.unpack_from(buf)
+            if version not in loxi.version_names or msg_len < 8:
+                if syn:
+                    error = "not an OpenFlow stream, %d bytes not decoded" % total
+                else:
+                    error = "capture starts in the middle of a message, %d bytes not decoded" % total
+                yield timestamp, format_error(timestamp, src, dst, error, as_json)
+                return
+
+        pos = 0
+        msgs = loxi.iter_stream(buf, pos)
+        while True:
+            try:
+                msg, end = next(msgs)
+            except StopIteration:
+                break
+            except Exception as e:
+                # iter_stream only fails on an invalid length or on a
+                # complete message that cannot be parsed, which is skipped
+                header = header_struct.unpack_from(buf, pos)
+                if header[2] < 8:
+                    error = "invalid message length, %d bytes not decoded" % (total - consumed - pos)
+                    yield timestamp, format_error(timestamp, src, dst, error, as_json)
+                    return
+                if isinstance(e, loxi.ProtocolError):
+                    error = str(e)
+                else:
+                    error = "%s: %s" % (type(e).__name__, e)
+                yield timestamp, format_message(timestamp, src, dst, header, None, error, as_json)
+                pos += header[2]
+                msgs = loxi.iter_stream(buf, pos)
+                continue
+            header = (msg.version, msg.type, end - pos, msg.xid)
+            yield timestamp, format_message(timestamp, src, dst, header, msg, None, as_json)
+            pos = end
+        consumed += pos
+        buf = buf[pos:]
+
+    if buf:
+        error = "incomplete message, %d bytes not decoded" % len(buf)
+        yield timestamp, format_error(timestamp, src, dst, error, as_json)
+    if pending:
+        times = [segment[0] for segment in pending]
+        if timestamp is not None:
+            times.append(timestamp)
+        timestamp = max(times)
+        error = "missing data, %d bytes not decoded" % sum(segment[2] for segment in pending)
+        yield timestamp, format_error(timestamp, src, dst, error, as_json)
+
+record_format = "%r %d %d %s\n"
+
+def read_records(filename):
+    """
+    Yield the (timestamp, stream index, line number, line) records of a file
+    written by decode_stream or merge_records
+    """
+    with open(filename) as f:
+        for record in f:
+            timestamp, index, number, line = record[:-1].split(' ', 3)
+            yield float(timestamp), int(index), int(number), line
+
+def decode_stream(task):
+    """
+    Decode the messages of a stream to a file of records, in a worker
+    process
+    """
+    filename, index, src, dst, segments, pending, syn, as_json, output = task
+    with open(filename, 'rb') as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        with open(output, 'w') as out:
+            lines = decode_segments(data, src, dst, segments, pending, syn, as_json)
+            for number, (timestamp, line) in enumerate(lines):
+                out.write(record_format % (timestamp, index, number, line))
+    finally:
+        data.close()
+
+# Most files merged at once, to stay below the limit on open files
+MAX_MERGE_FILES = 256
+
+def merge_records(filenames, tmpdir):
+    """
+    Yield the records of files sorted by time, in order of time
+
+    Records at the same time are ordered by stream, then by line number.
+    """
+    count = 0
+    while len(filenames) > MAX_MERGE_FILES:
+        merged = []
+        for i in range(0, len(filenames), MAX_MERGE_FILES):
+            group = filenames[i:i+MAX_MERGE_FILES]
+            name = os.path.join(tmpdir, "merge%d" % count)
+            count += 1
+            with open(name, 'w') as out:
+                for record in heapq.merge(*[read_records(x) for x in group]):
+                    out.write(record_format % record)
+            for x in group:
+                os.remove(x)
+            merged.append(name)
+        filenames = merged
+    return heapq.merge(*[read_records(x) for x in filenames])
+
+def decode_file(filename, ports=DEFAULT_PORTS, jobs=None, as_json=False):
+    """
+    Decode the OpenFlow messages in a capture file
+
+    Yields a line for each message, in order of time. The streams are
+    decoded by 'jobs' worker processes, by default one per CPU, or in this
+    process if jobs is 1.
+    """
+    with open(filename, 'rb') as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise CaptureError("empty file")
+    try:
+        streams = find_streams(data, ports)
+    finally:
+        data.close()
+
+    tmpdir = tempfile.mkdtemp(prefix="pcapdecode")
+    try:
+        outputs = [os.path.join(tmpdir, "stream%d" % i) for i in range(len(streams))]
+        tasks = [(filename, i, stream.src, stream.dst, stream.segments,
+                  sorted(stream.pending.values()), stream.syn, as_json, outputs[i])
+                 for i, stream in enumerate(streams)]
+        if jobs is None:
+            jobs = multiprocessing.cpu_count()
+        if jobs > 1 and len(tasks) > 1:
+            pool = multiprocessing.Pool(min(jobs, len(tasks)))
+            try:
+                for _ in pool.imap_unordered(decode_stream, tasks):
+                    pass
+            finally:
+                pool.terminate()
+        else:
+            for task in tasks:
+                decode_stream(task)
+
+        for timestamp, index, number, line in merge_records(outputs, tmpdir):
+            yield line
+    finally:
+        shutil.rmtree(tmpdir)
+
+def main(args=None):
+    parser = OptionParser(usage="%prog [options] FILE",
+                          description="Decode the OpenFlow messages in a pcap or pcapng file.")
+    parser.add_option("-p", "--port", type="int", action="append", dest="ports",
+                      help="OpenFlow TCP port, may be repeated (default %s)" %
+                           ", ".join(str(port) for port in DEFAULT_PORTS))
+    parser.add_option("-j", "--jobs", type="int",
+                      help="number of worker processes (default one per CPU)")
+    parser.add_option("--json", action="store_true", default=False,
+                      help="write a JSON object per message")
+    parser.add_option("-o", "--output",
+                      help="write to this file instead of standard output")
+    options, args = parser.parse_args(args)
+    if len(args) != 1:
+        parser.error("expected a capture file")
+    if options.jobs is not None and options.jobs < 1:
+        parser.error("--jobs must be at least 1")
+
+    out = options.output and open(options.output, 'w') or sys.stdout
+    try:
+        for line in decode_file(args[0], options.ports or DEFAULT_PORTS,
+                                options.jobs, options.json):
+            out.write(line + "\n")
+    except (CaptureError, IOError) as e:
+        sys.exit("%s: %s" % (parser.get_prog_name(), e))
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+if __name__ == '__main__':
+    main()
@@ -77,9 +77,13 @@ def pretty_print_dict(pp, obj):
         pp.breakable()
         pp.text('}')
 
+def pretty_print_memoryview(pp, obj):
+    pp.text(repr(obj.tobytes()))
+
 pretty_printers = {
     list: pretty_print_list,
     dict: pretty_print_dict,
+    memoryview: pretty_print_memoryview,
 }
 
 
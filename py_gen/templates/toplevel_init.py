@@ -29,6 +29,8 @@
 :: import loxi_globals
 :: include('_autogen.py')
 
+import struct
+
 version_names = {
 :: for v in loxi_globals.OFVersions.all_supported:
     ${v.wire_version}: "${v.version}",
@@ -62,10 +64,71 @@ class Unimplemented(Exception):
 def unimplemented(msg):
     raise Unimplemented(msg)
 
+_header_struct = struct.Struct("!BBH")
+
+def iter_stream(buf, offset=0, zero_copy=False):
+    """
+    Parse the complete messages in buf, starting at offset
+
+    Yields (message, end) for each message, where end is the offset after
+    it in buf. Each message is parsed by the module of the version in its
+    header. An incomplete message at the end of buf is not parsed.
+
+    With zero_copy, buf must not be modified while the messages are in use,
+    see parse_message.
+    """
+    view = memoryview(buf)
+    modules = {}
+    while len(buf) - offset >= 8:
+        version, msg_type, length = _header_struct.unpack_from(buf, offset)
+        if length < 8:
+            raise ProtocolError("invalid message length %d" % length)
+        end = offset + length
+        if end > len(buf):
+            break
+        ofp = modules.get(version)
+        if ofp is None:
+            try:
+                ofp = modules[version] = protocol(version)
+            except ValueError:
+                raise ProtocolError("unsupported OpenFlow version %d" % version)
+        yield ofp.message.parse_message(view[offset:end], zero_copy=zero_copy), end
+        offset = end
+
+def parse_stream(buf, offset=0, zero_copy=False):
+    """
+    Parse the complete messages in buf, starting at offset
+
+    Returns a list of the messages and the number of bytes they used. Any
+    data after them is the start of an incomplete message, to be parsed
+    again once the rest of it has been received.
+    """
+    msgs = []
+    end = offset
+    for msg, end in iter_stream(buf, offset, zero_copy):
+        msgs.append(msg)
+    return msgs, end - offset
+
+def parse_messages(buf, zero_copy=False):
+    """
+    Parse a list of messages from buf, which must contain whole messages
+    """
+    msgs, length = parse_stream(buf, 0, zero_copy)
+    if length != len(buf):
+        raise ProtocolError("incomplete message at offset %d" % length)
+    return msgs
+
 class OFObject(object):
     """
     Superclass of all OpenFlow classes
     """
+    # _lazy holds the reader of an object unpacked lazily, see __getattr__
+    __slots__ = ('_lazy',)
+
+    # Members decoded on their own from a lazily unpacked object, mapping
+    # names to (struct format, offset, conversion function)
+    lazy_members = {}
+
     def __init__(self, *args):
         raise NotImplementedError("cannot instantiate abstract class")
 
@@ -75,3 +138,74 @@ class OFObject(object):
     def show(self):
         import loxi.pp
         return loxi.pp.pp(self)
+
+    def __getattr__(self, name):
+        # Only called for attributes that are not set. Objects returned by
+        # parse_message(buf, lazy=True) decode their members here on first
+        # access: fixed offset members on their own, anything else by
+        # unpacking the whole object.
+        if name == '_lazy':
+            raise AttributeError(name)
+        try:
+            reader = self._lazy
+        except AttributeError:
+            raise AttributeError("%r object has no attribute %r" % (type(self).__name__, name))
+
+        cls = type(self)
+        member = cls.lazy_members.get(name)
+        if member:
+            fmt, offset, convert = member
+            value, = reader.peek(fmt, offset)
+            if convert:
+                value = convert(value)
+            setattr(self, name, value)
+            return value
+
+        slots = self._member_slots()
+        if name not in slots:
+            raise AttributeError("%r object has no attribute %r" % (cls.__name__, name))
+
+        # Keep the members already decoded or set by the user
+        import loxi.generic_util
+        obj = cls.unpack(loxi.generic_util.OFReader(reader.buf, reader.start, reader.length, reader.zero_copy))
+        del self._lazy
+        for slot in slots:
+            if not hasattr(self, slot) and hasattr(obj, slot):
+                setattr(self, slot, getattr(obj, slot))
+        return getattr(self, name)
+
+    def _member_slots(self):
+        # Slots holding members, skipping those hidden by a class attribute
+        # of a subclass
+        cls = type(self)
+        return [name for klass in cls.__mro__
+                     for name in klass.__dict__.get('__slots__', ())
+                     if name != '_lazy' and getattr(cls, name) is klass.__dict__[name]]
+
+    def __getstate__(self):
+        # Needed to pickle objects with __slots__ using protocols 0 and 1.
+        state = {}
+        for name in self._member_slots():
+            if hasattr(self, name):
+                state[name] = getattr(self, name)
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+class OFView(object):
+    """
+    Superclass of the read-only views in the view module of each version
+
+    A view reads the members of the object at offset 'off' in 'buf' directly
+    from the buffer on each access instead of unpacking the whole object.
+    """
+    __slots__ = ('buf', 'off')
+
+    # Table used to find the view class of an object, for virtual classes
+    dispatch_table = None
+
+    def __init__(self, buf, off=0):
+        self.buf = buf
+        self.off = off
@@ -0,0 +1,125 @@
+:: # Copyright 2013, Big Switch Networks, Inc.
+:: #
+:: # LoxiGen is licensed under the Eclipse Public License, version 1.0 (EPL), with
+:: # the following special exception:
+:: #
+:: # LOXI Exception
+:: #
+:: # As a special exception to the terms of the EPL, you may distribute libraries
+:: # generated by LoxiGen (LoxiGen Libraries) under the terms of your choice, provided
+:: # that copyright and licensing notices generated by LoxiGen are not altered or removed
+:: # from the LoxiGen Libraries and the notice provided below is (i) included in
+:: # the LoxiGen Libraries, if distributed in source code form and (ii) included in any
+:: # documentation for the LoxiGen Libraries, if distributed in binary form.
+:: #
+:: # Notice: "Copyright 2013, Big Switch Networks, Inc. This library was generated by the LoxiGen Compiler."
+:: #
+:: # You may not use this file except in compliance with the EPL or LOXI Exception. You may obtain
+:: # a copy of the EPL at:
+:: #
+:: # http://www.eclipse.org/legal/epl-v10.html
+:: #
+:: # Unless required by applicable law or agreed to in writing, software
+:: # distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+:: # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+:: # EPL for the specific language governing permissions and limitations
+:: # under the EPL.
+::
+::
+:: from loxi_ir import *
+:: import py_gen.codegen
+:: import py_gen.oftype
+:: include('_copyright.py')
+
+:: include('_autogen.py')
+
+"""
+Read-only views of the OpenFlow ${version.version} classes
+
+A view class, named like the data class it reads, decodes each member from
+the buffer when it is accessed. List members are iterators reusing a single
+view per class, so scanning large messages allocates almost nothing. The
+unpack method of a view returns the data object.
+
+This module is not imported with its package: use 'import loxi.${subdir}.view'.
+"""
+
+import struct
+import loxi
+import util
+import loxi.generic_util
+
+import sys
+ofp = sys.modules['loxi.${subdir}']
+
+:: for fmt in py_gen.codegen.view_struct_formats(ofclasses, version):
+${py_gen.codegen.view_struct_name(fmt)} = struct.Struct(${repr(fmt)})
+:: #endfor
+
+:: for ofclass in ofclasses:
+::     module_name, pyname = py_gen.codegen.generate_pyname(ofclass)
+::     length_expr = py_gen.codegen.view_length_expr(ofclass, 'off')
+class ${py_gen.codegen.view_name(ofclass)}(loxi.OFView):
+    __slots__ = ()
+::     for m in ofclass.members:
+::         if type(m) == OFTypeMember:
+    ${m.name} = ${m.value}
+::         #endif
+::     #endfor
+::     if ofclass.virtual:
+    dispatch_table = ofp.${'.'.join(py_gen.codegen.generate_pyname(py_gen.codegen.root_class(ofclass)))}.dispatch_table
+::     #endif
+
+    def _length(self):
+::     if length_expr:
+        buf = self.buf
+        off = self.off
+        return ${length_expr}
+::     else:
+        reader = loxi.generic_util.OFReader(self.buf, self.off, len(self.buf) - self.off)
+        ofp.${module_name}.${pyname}.unpack(reader)
+        return reader.offset
+::     #endif
+
+    def unpack(self):
+::     if length_expr:
+        reader = loxi.generic_util.OFReader(self.buf, self.off, self._length())
+::     else:
+        reader = loxi.generic_util.OFReader(self.buf, self.off, len(self.buf) - self.off)
+::     #endif
+        return ofp.${module_name}.${pyname}.unpack(reader)
+::     for vm in py_gen.codegen.view_members(ofclass, version):
+
+    @property
+    def ${vm.member.name}(self):
+        buf = self.buf
+        off = self.off
+::         if vm.kind == 'struct':
+::             expr = '%s.unpack_from(buf, %s)[0]' % (py_gen.codegen.view_struct_name(vm.fmt), vm.start)
+::             convert = py_gen.oftype.lookup_struct_format(vm.member.oftype, version).unpack
+        return ${convert % expr if convert else expr}
+::         elif vm.kind == 'list':
+        return loxi.generic_util.view_list(buf, ${vm.start}, ${vm.end}, ${py_gen.codegen.view_name(vm.ofclass)}, _views)
+::         elif vm.kind == 'object':
+        return loxi.generic_util.view_at(buf, ${vm.start}, ${py_gen.codegen.view_name(vm.ofclass)}, _views)
+::         else:
+        start = ${vm.start}
+        reader = loxi.generic_util.OFReader(buf, start, ${vm.end} - start)
+        return ${py_gen.oftype.gen_unpack_expr(vm.member.oftype, 'reader', version)}
+::         #endif
+::     #endfor
+
+:: #endfor
+_views = {
+:: for ofclass in ofclasses:
+    ofp.${'.'.join(py_gen.codegen.generate_pyname(ofclass))}: ${py_gen.codegen.view_name(ofclass)},
+:: #endfor
+}
+
+def parse_message(buf, off=0):
+    """
+    Return a view of the message at offset off in buf
+
+    The view is of the most specific message class known.
+    """
+    return loxi.generic_util.view_at(buf, off, header, _views)
@@ -0,0 +1,251 @@
+#!/usr/bin/env python
+# Copyright 2013, Big Switch Networks, Inc.
+#
+# LoxiGen is licensed under the Eclipse Public License, version 1.0 (EPL), with
+# the following special exception:
+#
+# LOXI Exception
+#
+# As a special exception to the terms of the EPL, you may distribute libraries
+# generated by LoxiGen (LoxiGen Libraries) under the terms of your choice, provided
+# that copyright and licensing notices generated by LoxiGen are not altered or removed
+# from the LoxiGen Libraries and the notice provided below is (i) included in
+# the LoxiGen Libraries, if distributed in source code form and (ii) included in any
+# documentation for the LoxiGen Libraries, if distributed in binary form.
+#
+# Notice: "Copyright 2013, Big Switch Networks, Inc. This library was generated by the LoxiGen Compiler."
+#
+# You may not use this file except in compliance with the EPL or LOXI Exception. You may obtain
+# a copy of the EPL at:
+#
+# http://www.eclipse.org/legal/epl-v10.html
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# EPL for the specific language governing permissions and limitations
+# under the EPL.
+import socket
+import unittest
+
+try:
+    import loxi
+    import loxi.aio
+    from loxi.aio import coroutine, Return
+    import loxi.of13 as ofp
+except ImportError:
+    exit("loxi package not found. Try setting PYTHONPATH.")
+
+def mock_switch(cxn, msg):
+    """
+    Handler for the switch side of a connection
+    """
+    if isinstance(msg, ofp.message.hello):
+        cxn.send(ofp.message.hello(xid=msg.xid))
+    elif isinstance(msg, ofp.message.echo_request):
+        cxn.send(ofp.message.echo_reply(xid=msg.xid, data=msg.data))
+    elif isinstance(msg, ofp.message.port_stats_request):
+        for port_no in range(3):
+            flags = ofp.OFPSF_REPLY_MORE if port_no < 2 else 0
+            cxn.send(ofp.message.port_stats_reply(xid=msg.xid, flags=flags,
+                entries=[ofp.port_stats_entry(port_no=port_no)]))
+    elif isinstance(msg, ofp.message.barrier_request):
+        cxn.send(ofp.message.bad_request_error_msg(xid=msg.xid))
+
+class TestAio(unittest.TestCase):
+    def setUp(self):
+        self.loop = loxi.aio.EventLoop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def connect(self, handler=mock_switch):
+        """
+        Return a Future for a controller connection to a mock switch
+        """
+        sock, switch_sock = socket.socketpair()
+        if handler:
+            self.loop.create_connection(lambda: loxi.aio.Connection(self.loop, handler),
+                                        sock=switch_sock)
+            self.switch_sock = None
+        else:
+            self.switch_sock = switch_sock
+        return loxi.aio.connect(self.loop, None, ofp=ofp, sock=sock)
+
+    def test_future(self):
+        future = loxi.aio.Future()
+        results = []
+        future.add_done_callback(lambda f: results.append(f.result()))
+        self.assertFalse(future.done())
+        future.set_result(1)
+        future.add_done_callback(lambda f: results.append(f.result() + 1))
+        self.assertEquals(results, [1, 2])
+
+    def test_coroutine(self):
+        @coroutine
+        def fn(future):
+            x = yield future
+            try:
+                yield failed
+            except ValueError:
+                pass
+            raise Return(x + 1)
+        failed = loxi.aio.Future()
+        failed.set_exception(ValueError())
+        future = loxi.aio.Future()
+        self.loop.call_later(0.01, future.set_result, 1)
+        self.assertEquals(self.loop.run_until_complete(fn(future)), 2)
+
+    def test_transact(self):
+        @coroutine
+        def run():
+            cxn = yield self.connect()
+            reply = yield cxn.transact(ofp.message.echo_request(data="abc"))
+            self.assertEquals(reply.data, "abc")
+            try:
+                yield cxn.transact(ofp.message.barrier_request())
+                self.fail("expected TransactionError")
+            except loxi.connection.TransactionError as e:
+                self.assertIsInstance(e.msg, ofp.message.bad_request_error_msg)
+            self.assertEquals(cxn.waiters, {})
+            yield cxn.close()
+        self.loop.run_until_complete(run())
+
+    def test_many_connections(self):
+        @coroutine
+        def run(i):
+            cxn = yield self.connect()
+            reply = yield cxn.transact(ofp.message.echo_request(data=str(i)))
+            yield cxn.close()
+            raise Return(reply.data)
+        tasks = [run(i) for i in range(100)]
+        self.assertEquals([self.loop.run_until_complete(x) for x in tasks],
+                          [str(i) for i in range(100)])
+
+    def test_multipart(self):
+        @coroutine
+        def run():
+            cxn = yield self.connect()
+            replies = cxn.transact_multipart_replies(ofp.message.port_stats_request())
+            port_nos = []
+            while True:
+                entries = yield replies.next()
+                if entries is None:
+                    break
+                port_nos.append([x.port_no for x in entries])
+            self.assertEquals(port_nos, [[0], [1], [2]])
+            entries = yield cxn.transact_multipart(ofp.message.port_stats_request())
+            self.assertEquals([x.port_no for x in entries], [0, 1, 2])
+        self.loop.run_until_complete(run())
+
+    def test_unsolicited(self):
+        received = []
+        def handler(cxn, msg):
+            received.append(msg)
+            mock_switch(cxn, msg)
+        @coroutine
+        def run():
+            cxn = yield self.connect(handler=handler)
+            yield cxn.send(ofp.message.packet_out(xid=5))
+            msg = yield cxn.recv_class(ofp.message.echo_reply, timeout=0.05)
+            self.assertEquals(msg, None)
+            yield cxn.transact(ofp.message.echo_request())
+            self.assertEquals([type(x) for x in received],
+                              [ofp.message.hello, ofp.message.packet_out, ofp.message.echo_request])
+        self.loop.run_until_complete(run())
+
+    def test_timeout(self):
+        @coroutine
+        def run():
+            def handler(cxn, msg):
+                if msg.type == ofp.OFPT_HELLO:
+                    cxn.send(msg)
+            cxn = yield self.connect(handler=handler)
+            try:
+                yield cxn.transact(ofp.message.echo_request(), timeout=0.05)
+                self.fail("expected TransactionError")
+            except loxi.connection.TransactionError as e:
+                self.assertEquals(str(e), "no reply for echo_request")
+        self.loop.run_until_complete(run())
+
+    def test_backpressure(self):
+        @coroutine
+        def run():
+            sock, switch_sock = socket.socketpair()
+            transport, cxn = yield self.loop.create_connection(
+                lambda: loxi.aio.Connection(self.loop), sock=sock)
+            transport.high_water = 4096
+            transport.low_water = 1024
+            msg = ofp.message.echo_request(data="x" * 1000)
+            while True:
+                drained = cxn.send(msg)
+                if not drained.done():
+                    break
+            self.assertTrue(transport.get_write_buffer_size() > transport.high_water)
+            # Sending resumes once the peer reads the data
+            switch_sock.setblocking(False)
+            while not drained.done():
+                try:
+                    switch_sock.recv(65536)
+                except socket.error:
+                    pass
+                yield self.sleep(0.001)
+            self.assertTrue(transport.get_write_buffer_size() <= transport.low_water)
+            yield cxn.close()
+            switch_sock.close()
+        self.loop.run_until_complete(run())
+
+    def sleep(self, delay):
+        future = loxi.aio.Future()
+        self.loop.call_later(delay, future.set_result, None)
+        return future
+
+    def test_connection_lost(self):
+        @coroutine
+        def run():
+            def handler(cxn, msg):
+                if msg.type == ofp.OFPT_HELLO:
+                    cxn.send(msg)
+                else:
+                    cxn.close()
+            cxn = yield self.connect(handler=handler)
+            start = self.loop.time()
+            try:
+                yield cxn.transact(ofp.message.echo_request(), timeout=10)
+                self.fail("expected TransactionError")
+            except loxi.connection.TransactionError:
+                pass
+            self.assertTrue(self.loop.time() - start < 1)
+            yield cxn.closed
+        self.loop.run_until_complete(run())
+
+    def test_invalid_length(self):
+        # A header with an invalid length closes the connection and fails a
+        # pending transaction
+        future = self.connect(handler=None)
+        self.switch_sock.sendall(ofp.message.hello(xid=1).pack())
+        @coroutine
+        def run():
+            cxn = yield future
+            self.loop.call_later(0.05, self.switch_sock.sendall, "\x04\x00\x00\x00\x00\x00\x00\x01")
+            start = self.loop.time()
+            try:
+                yield cxn.transact(ofp.message.echo_request(), timeout=10)
+                self.fail("expected TransactionError")
+            except loxi.connection.TransactionError:
+                pass
+            self.assertTrue(self.loop.time() - start < 1)
+            exc = yield cxn.closed
+            self.assertTrue(isinstance(exc, loxi.ProtocolError))
+            self.assertTrue(cxn.transport.closed)
+        self.loop.run_until_complete(run())
+        self.switch_sock.close()
+
+    def test_no_hello(self):
+        future = self.connect(handler=None)
+        self.switch_sock.close()
+        with self.assertRaisesRegexp(Exception, "Did not receive HELLO"):
+            self.loop.run_until_complete(future)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# Copyright 2013, Big Switch Networks, Inc.
+#
+# LoxiGen is licensed under the Eclipse Public License, version 1.0 (EPL), with
+# the following special exception:
+#
+# LOXI Exception
+#
+# As a special exception to the terms of the EPL, you may distribute libraries
+# generated by LoxiGen (LoxiGen Libraries) under the terms of your choice, provided
+# that copyright and licensing notices generated by LoxiGen are not altered or removed
+# from the LoxiGen Libraries and the notice provided below is (i) included in
+# the LoxiGen Libraries, if distributed in source code form and (ii) included in any
+# documentation for the LoxiGen Libraries, if distributed in binary form.
+#
+# Notice: "Copyright 2013, Big Switch Networks, Inc. This library was generated by the LoxiGen Compiler."
+#
+# You may not use this file except in compliance with the EPL or LOXI Exception. You may obtain
+# a copy of the EPL at:
+#
+# http://www.eclipse.org/legal/epl-v10.html
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# EPL for the specific language governing permissions and limitations
+# under the EPL.
+import socket
+import threading
+import time
+import unittest
+
+try:
+    import loxi
+    import loxi.connection
+    import loxi.framer
+    import loxi.of13 as ofp
+except ImportError:
+    exit("loxi package not found. Try setting PYTHONPATH.")
+
+class TestConnection(unittest.TestCase):
+    def setUp(self):
+        self.switch, sock = socket.socketpair()
+        self.cxn = loxi.connection.Connection(sock)
+        self.cxn.daemon = True
+        self.cxn.start()
+
+    def tearDown(self):
+        self.cxn.stop()
+        self.switch.close()
+
+    def switch_recv(self):
+        """
+        Receive one message on the switch side of the connection
+        """
+        framer = loxi.framer.Framer()
+        while True:
+            framer.recv_into(self.switch)
+            for version, msg_type, xid, data in framer.frames():
+                return ofp.message.parse_message(data)
+
+    def test_transact(self):
+        self.switch.sendall(ofp.message.packet_in(xid=0, data="abc").pack())
+        self.switch.sendall(ofp.message.echo_reply(xid=100).pack())
+        def reply():
+            request = self.switch_recv()
+            self.switch.sendall(ofp.message.echo_reply(xid=request.xid + 1).pack())
+            self.switch.sendall(ofp.message.echo_reply(xid=request.xid, data="x").pack())
+        thread = threading.Thread(target=reply)
+        thread.start()
+        reply = self.cxn.transact(ofp.message.echo_request(data="x"))
+        thread.join()
+        self.assertEquals(reply.data, "x")
+        self.assertEquals(self.cxn.waiters, {})
+        # Unsolicited messages and replies to no transaction stay queued
+        self.assertEquals(self.cxn.recv_class(ofp.message.packet_in).data, "abc")
+        self.assertEquals(self.cxn.recv_xid(100).xid, 100)
+        self.assertEquals(self.cxn.recv_xid(reply.xid + 1).xid, reply.xid + 1)
+
+    def test_transact_queued_reply(self):
+        self.switch.sendall(ofp.message.echo_reply(xid=6, data="z").pack())
+        while not self.cxn.rx:
+            time.sleep(0.01)
+        # A caller chosen xid picks up a reply that arrived first
+        reply = self.cxn.transact(ofp.message.echo_request(xid=6))
+        self.assertEquals(reply.data, "z")
+
+    def test_transact_timeout(self):
+        with self.assertRaisesRegexp(loxi.connection.TransactionError, "no reply"):
+            self.cxn.transact(ofp.message.echo_request(), timeout=0.1)
+        request = self.switch_recv()
+        self.switch.sendall(ofp.message.echo_reply(xid=request.xid).pack())
+        # A late reply goes to the RX queue
+        self.assertEquals(self.cxn.recv_xid(request.xid).xid, request.xid)
+
+    def test_invalid_length(self):
+        # A header with an invalid length closes the connection and wakes up
+        # a pending transaction
+        def reply():
+            self.switch_recv()
+            self.switch.sendall("\x04\x00\x00\x00\x00\x00\x00\x01")
+        thread = threading.Thread(target=reply)
+        thread.start()
+        start = time.time()
+        with self.assertRaisesRegexp(loxi.connection.TransactionError, "no reply"):
+            self.cxn.transact(ofp.message.echo_request(), timeout=10)
+        thread.join()
+        self.assertLess(time.time() - start, 5)
+        self.assertTrue(isinstance(self.cxn.error, loxi.ProtocolError))
+        self.cxn.join(5)
+        self.assertFalse(self.cxn.is_alive())
+        self.assertEquals(self.switch.recv(1), "")
+
+    def test_transact_multipart(self):
+        def reply():
+            request = self.switch_recv()
+            for flags in (ofp.OFPSF_REPLY_MORE, 0):
+                self.switch.sendall(ofp.message.port_stats_reply(
+                    xid=request.xid, flags=flags,
+                    entries=[ofp.port_stats_entry(port_no=flags + 1)]).pack())
+        thread = threading.Thread(target=reply)
+        thread.start()
+        entries = self.cxn.transact_multipart(ofp.message.port_stats_request())
+        thread.join()
+        self.assertEquals([x.port_no for x in entries], [ofp.OFPSF_REPLY_MORE + 1, 1])
+        self.assertEquals(self.cxn.waiters, {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# Copyright 2013, Big Switch Networks, Inc.
+#
+# LoxiGen is licensed under the Eclipse Public License, version 1.0 (EPL), with
+# the following special exception:
+#
+# LOXI Exception
+#
+# As a special exception to the terms of the EPL, you may distribute libraries
+# generated by LoxiGen (LoxiGen Libraries) under the terms of your choice, provided
+# that copyright and licensing notices generated by LoxiGen are not altered or removed
+# from the LoxiGen Libraries and the notice provided below is (i) included in
+# the LoxiGen Libraries, if distributed in source code form and (ii) included in any
+# documentation for the LoxiGen Libraries, if distributed in binary form.
+#
+# Notice: "Copyright 2013, Big Switch Networks, Inc. This library was generated by the LoxiGen Compiler."
+#
+# You may not use this file except in compliance with the EPL or LOXI Exception. You may obtain
+# a copy of the EPL at:
+#
+# http://www.eclipse.org/legal/epl-v10.html
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# EPL for the specific language governing permissions and limitations
+# under the EPL.
+import socket
+import unittest
+
+try:
+    import loxi
+    import loxi.framer
+    import loxi.of13 as ofp
+except ImportError:
+    exit("loxi package not found. Try setting PYTHONPATH.")
+
+class TestFramer(unittest.TestCase):
+    def frames(self, framer):
+        return [(version, msg_type, xid, data.tobytes())
+                for version, msg_type, xid, data in framer.frames()]
+
+    def test_feed(self):
+        msgs = [ofp.message.echo_request(xid=1, data="abc").pack(),
+                ofp.message.hello(xid=2).pack()]
+        framer = loxi.framer.Framer()
+        framer.feed(msgs[0] + msgs[1][:3])
+        self.assertEquals(self.frames(framer), [(4, 2, 1, msgs[0])])
+        self.assertEquals(framer.pending(), 3)
+        framer.feed(msgs[1][3:])
+        self.assertEquals(self.frames(framer), [(4, 0, 2, msgs[1])])
+        self.assertEquals(framer.pending(), 0)
+        self.assertEquals(self.frames(framer), [])
+
+    def test_byte_at_a_time(self):
+        msgs = [ofp.message.echo_request(xid=i, data="x" * i).pack() for i in range(10)]
+        framer = loxi.framer.Framer(size=16)
+        frames = []
+        for c in "".join(msgs):
+            framer.feed(c)
+            frames.extend(self.frames(framer))
+        self.assertEquals([data for version, msg_type, xid, data in frames], msgs)
+        self.assertEquals([xid for version, msg_type, xid, data in frames], range(10))
+
+    def test_grow(self):
+        msg = ofp.message.echo_request(xid=1, data="x" * 1000).pack()
+        framer = loxi.framer.Framer(size=16)
+        framer.feed(msg[:10])
+        self.assertEquals(self.frames(framer), [])
+        framer.feed(msg[10:] + msg)
+        self.assertEquals(self.frames(framer), [(4, 2, 1, msg)] * 2)
+
+    def test_shared(self):
+        msgs = [ofp.message.echo_request(xid=i, data="x" * 100).pack() for i in range(4)]
+        shared = bytearray(1024)
+        framers = [loxi.framer.Framer(shared=shared) for i in range(2)]
+        framers[0].feed(msgs[0] + msgs[1][:50])
+        self.assertEquals(self.frames(framers[0]), [(4, 2, 0, msgs[0])])
+        # The incomplete message is moved out of the shared buffer
+        self.assertFalse(framers[0].buf is shared)
+        framers[1].feed(msgs[2])
+        self.assertEquals(self.frames(framers[1]), [(4, 2, 2, msgs[2])])
+        self.assertTrue(framers[1].buf is shared)
+        framers[0].feed(msgs[1][50:] + msgs[3])
+        self.assertEquals(self.frames(framers[0]), [(4, 2, 1, msgs[1]), (4, 2, 3, msgs[3])])
+        self.assertTrue(framers[0].buf is shared)
+
+    def test_invalid_length(self):
+        framer = loxi.framer.Framer()
+        framer.feed("\x04\x00\x00\x04\x00\x00\x00\x01")
+        with self.assertRaisesRegexp(loxi.ProtocolError, "invalid message length 4"):
+            list(framer.frames())
+
+    def test_recv_into(self):
+        msg = ofp.message.echo_request(xid=1, data="x" * 10000).pack()
+        a, b = socket.socketpair()
+        try:
+            a.sendall(msg)
+            a.close()
+            framer = loxi.framer.Framer(size=64)
+            frames = []
+            while framer.recv_into(b):
+                frames.extend(self.frames(framer))
+            self.assertEquals(frames, [(4, 2, 1, msg)])
+        finally:
+            b.close()
+
+if __name__ == '__main__':
+    unittest.main()
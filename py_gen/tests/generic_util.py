@@ -25,6 +25,7 @@
 # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 # EPL for the specific language governing permissions and limitations
 # under the EPL.
+import struct
 import unittest
 
 try:
@@ -43,6 +44,25 @@ class TestUnpackList(unittest.TestCase):
         a = loxi.generic_util.unpack_list(reader, deserializer)
         self.assertEquals(['\x04abc', '\x03de', '\x02f', '\x01'], a)
 
+class TestPackInto(unittest.TestCase):
+    def test_write_into(self):
+        buf = bytearray(6)
+        self.assertEquals(loxi.generic_util.write_into(buf, 1, "abc"), 3)
+        self.assertEquals(buf, "\x00abc\x00\x00")
+        with self.assertRaises(struct.error):
+            loxi.generic_util.write_into(buf, 4, "abc")
+
+    def test_pack_list_into(self):
+        class Obj(object):
+            def __init__(self, data):
+                self.data = data
+            def pack_into(self, buf, offset):
+                return loxi.generic_util.write_into(buf, offset, self.data)
+        buf = bytearray(8)
+        objs = [Obj("ab"), Obj(""), Obj("cde")]
+        self.assertEquals(loxi.generic_util.pack_list_into(objs, buf, 2), 5)
+        self.assertEquals(buf, "\x00\x00abcde\x00")
+
 class TestOFReader(unittest.TestCase):
     def test_simple(self):
         reader = OFReader("abcdefg")
@@ -52,6 +72,14 @@ class TestOFReader(unittest.TestCase):
         with self.assertRaisesRegexp(loxi.ProtocolError, "Buffer too short"):
             reader.read('s')
 
+    def test_read_struct(self):
+        st = struct.Struct("!H1xB")
+        reader = OFReader("\x01\x02\x00\x03\x04")
+        self.assertEquals(reader.read_struct(st), (0x0102, 3))
+        with self.assertRaisesRegexp(loxi.ProtocolError, "Buffer too short"):
+            reader.read_struct(st)
+        self.assertEquals(reader.read('B')[0], 4)
+
     def test_skip(self):
         reader = OFReader("abcdefg")
         reader.skip(4)
@@ -94,6 +122,25 @@ class TestOFReader(unittest.TestCase):
         self.assertEquals(reader.read_all(), "cdefg")
         self.assertEquals(reader.read_all(), "")
 
+    def test_read_octets(self):
+        reader = OFReader(bytearray("abcdefg"))
+        reader.skip(2)
+        octets = reader.read_octets()
+        self.assertEquals(type(octets), str)
+        self.assertEquals(octets, "cdefg")
+
+    def test_zero_copy(self):
+        buf = bytearray("abcdefg")
+        reader = OFReader(buf, zero_copy=True)
+        self.assertEquals(reader.read('2s')[0], "ab")
+        octets = reader.slice(3).read_octets()
+        self.assertEquals(type(octets), memoryview)
+        self.assertEquals(octets, "cde")
+        buf[2] = "x"
+        self.assertEquals(octets.tobytes(), "xde")
+        self.assertEquals(reader.read_octets(), "fg")
+        self.assertEquals(loxi.generic_util.octets_str(octets), "xde")
+
     def test_slice(self):
         reader = OFReader("abcdefg")
         reader.skip(2)
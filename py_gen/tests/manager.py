@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# Copyright 2013, Big Switch Networks, Inc.
+#
+# LoxiGen is licensed under the Eclipse Public License, version 1.0 (EPL), with
+# the following special exception:
+#
+# LOXI Exception
+#
+# As a special exception to the terms of the EPL, you may distribute libraries
+# generated by LoxiGen (LoxiGen Libraries) under the terms of your choice, provided
+# that copyright and licensing notices generated by LoxiGen are not altered or removed
+# from the LoxiGen Libraries and the notice provided below is (i) included in
+# the LoxiGen Libraries, if distributed in source code form and (ii) included in any
+# documentation for the LoxiGen Libraries, if distributed in binary form.
+#
+# Notice: "Copyright 2013, Big Switch Networks, Inc. This library was generated by the LoxiGen Compiler."
+#
+# You may not use this file except in compliance with the EPL or LOXI Exception. You may obtain
+# a copy of the EPL at:
+#
+# http://www.eclipse.org/legal/epl-v10.html
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# EPL for the specific language governing permissions and limitations
+# under the EPL.
+import socket
+import threading
+import time
+import unittest
+
+try:
+    import loxi
+    import loxi.aio
+    import loxi.manager
+    import loxi.of13 as ofp
+except ImportError:
+    exit("loxi package not found. Try setting PYTHONPATH.")
+
+def mock_switch(cxn, msg):
+    """
+    Handler for the switch side of a connection
+    """
+    if isinstance(msg, ofp.message.hello):
+        cxn.send(ofp.message.hello(xid=msg.xid))
+    elif isinstance(msg, ofp.message.echo_request):
+        cxn.send(ofp.message.echo_reply(xid=msg.xid, data=msg.data))
+    elif isinstance(msg, ofp.message.port_stats_request):
+        for port_no in range(3):
+            flags = ofp.OFPSF_REPLY_MORE if port_no < 2 else 0
+            cxn.send(ofp.message.port_stats_reply(xid=msg.xid, flags=flags,
+                entries=[ofp.port_stats_entry(port_no=port_no + i) for i in range(100)]))
+    elif isinstance(msg, ofp.message.packet_out):
+        cxn.send(ofp.message.packet_in(xid=0, data=msg.data))
+
+class TestConnectionManager(unittest.TestCase):
+    decode_workers = 0
+
+    def setUp(self):
+        self.manager = loxi.manager.ConnectionManager(decode_workers=self.decode_workers)
+        self.manager.start()
+
+    def tearDown(self):
+        self.manager.stop()
+
+    def connect(self, handler=None):
+        """
+        Return a ManagedConnection to a mock switch run by the same manager
+        """
+        sock, switch_sock = socket.socketpair()
+        loop = self.manager.loop
+        self.manager.call(lambda: loop.create_connection(
+            lambda: loxi.aio.Connection(loop, mock_switch), sock=switch_sock))
+        return self.manager.connect(None, ofp=ofp, sock=sock, handler=handler)
+
+    def test_transact(self):
+        cxn = self.connect()
+        self.assertEquals(cxn.transact(ofp.message.echo_request(data="abc")).data, "abc")
+        entries = cxn.transact_multipart(ofp.message.port_stats_request())
+        self.assertEquals([x.port_no for x in entries], [i + j for i in range(3) for j in range(100)])
+        entries = list(cxn.transact_multipart_generator(ofp.message.port_stats_request()))
+        self.assertEquals(len(entries), 300)
+        self.assertEquals(cxn.protocol.waiters, {})
+
+    def test_unsolicited(self):
+        cxn = self.connect()
+        cxn.send(ofp.message.packet_out(data="abc"))
+        self.assertEquals(cxn.recv_class(ofp.message.packet_in).data, "abc")
+        self.assertEquals(cxn.recv_any(timeout=0.05), None)
+
+    def test_handler(self):
+        received = []
+        done = threading.Event()
+        def handler(cxn, msg):
+            received.append(msg)
+            if len(received) < 3:
+                cxn.send(ofp.message.packet_out(data=str(len(received))))
+            else:
+                done.set()
+        cxn = self.connect(handler=handler)
+        cxn.send(ofp.message.packet_out(data="0"))
+        done.wait(5)
+        self.assertEquals([x.data for x in received], ["0", "1", "2"])
+
+    def test_threads(self):
+        cxns = [self.connect() for i in range(20)]
+        errors = []
+        def run(cxn):
+            try:
+                for i in range(10):
+                    reply = cxn.transact(ofp.message.echo_request(data=str(i)))
+                    assert reply.data == str(i)
+                assert len(cxn.transact_multipart(ofp.message.port_stats_request())) == 300
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=run, args=(cxn,)) for cxn in cxns]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEquals(errors, [])
+        # Idle connections receive into the shared buffer
+        for cxn in cxns:
+            self.assertTrue(cxn.protocol.framer.buf is self.manager.read_buffer)
+
+    def test_close(self):
+        cxn = self.connect()
+        cxn.close()
+        self.assertEquals(self.manager.protocols, set())
+        with self.assertRaisesRegexp(loxi.connection.TransactionError, "no reply"):
+            cxn.transact(ofp.message.echo_request())
+
+    def test_invalid_length(self):
+        # A header with an invalid length closes only that connection
+        sock, switch_sock = socket.socketpair()
+        switch_sock.sendall(ofp.message.hello(xid=1).pack())
+        cxn = self.manager.connect(None, ofp=ofp, sock=sock)
+        timer = threading.Timer(0.05, switch_sock.sendall, ["\x04\x00\x00\x00\x00\x00\x00\x01"])
+        timer.start()
+        start = time.time()
+        with self.assertRaisesRegexp(loxi.connection.TransactionError, "no reply"):
+            cxn.transact(ofp.message.echo_request(), timeout=10)
+        self.assertTrue(time.time() - start < 5)
+        timer.join()
+        self.assertTrue(isinstance(cxn.protocol.error, loxi.ProtocolError))
+        self.assertEquals(self.manager.protocols, set())
+        # The switch reads the HELLO and echo request, then end of file
+        switch_sock.settimeout(5)
+        while switch_sock.recv(4096):
+            pass
+        switch_sock.close()
+        # Other connections keep working
+        cxn = self.connect()
+        self.assertEquals(cxn.transact(ofp.message.echo_request(data="abc")).data, "abc")
+
+class TestConnectionManagerWorkers(TestConnectionManager):
+    decode_workers = 2
+
+class TestStop(unittest.TestCase):
+    def test_pending_call(self):
+        # Calls that are waiting, or made after stop, raise ManagerStopped
+        manager = loxi.manager.ConnectionManager()
+        manager.start()
+        errors = []
+        def run():
+            try:
+                manager.call(loxi.aio.Future)
+            except loxi.manager.ManagerStopped as e:
+                errors.append(e)
+        thread = threading.Thread(target=run)
+        thread.start()
+        while not manager.calls:
+            time.sleep(0.01)
+        manager.stop()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertEquals(len(errors), 1)
+        with self.assertRaises(loxi.manager.ManagerStopped):
+            manager.call(lambda: None)
+
+if __name__ == '__main__':
+    unittest.main()
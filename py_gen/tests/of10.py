@@ -25,9 +25,11 @@
 # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 # EPL for the specific language governing permissions and limitations
 # under the EPL.
+import pickle
 import unittest
 import test_data
 from testutil import add_datafiles_tests
+from testutil import test_pack_into
 
 try:
     import loxi
@@ -251,11 +253,43 @@ class TestAll(unittest.TestCase):
                 buf = obj.pack()
                 obj2 = klass.unpack(OFReader(buf))
                 self.assertEquals(obj, obj2)
+                test_pack_into(obj, buf)
             if klass in expected_failures:
                 self.assertRaises(Exception, fn)
             else:
                 fn()
 
+    def test_dispatch(self):
+        # Find every concrete subclass of an inheritance root from its root
+        expected_failures = []
+        mods = [ofp.action,ofp.message,ofp.common]
+        klasses = [klass for mod in mods
+                         for klass in mod.__dict__.values()
+                         if isinstance(klass, type) and
+                            issubclass(klass, loxi.OFObject) and
+                            'subtypes' not in klass.__dict__]
+        for klass in klasses:
+            roots = [x for x in klass.__mro__ if 'dispatch_table' in x.__dict__]
+            if not roots:
+                continue
+            def fn():
+                obj = klass()
+                if hasattr(obj, "xid"): obj.xid = 42
+                reader = OFReader(obj.pack())
+                subclass = loxi.generic_util.dispatch(reader, roots[0].dispatch_table)
+                self.assertEquals(subclass, klass)
+            if klass in expected_failures:
+                self.assertRaises(Exception, fn)
+            else:
+                fn()
+
+    def test_slots(self):
+        for klass in self.klasses:
+            obj = klass()
+            self.assertFalse(hasattr(obj, '__dict__'))
+            if hasattr(obj, "xid"): obj.xid = 42
+            self.assertEquals(pickle.loads(pickle.dumps(obj)), obj)
+
     def test_parse_message(self):
         expected_failures = []
         for klass in self.klasses:
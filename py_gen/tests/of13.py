@@ -25,13 +25,18 @@
 # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 # EPL for the specific language governing permissions and limitations
 # under the EPL.
+import pickle
+import struct
+import types
 import unittest
 from testutil import test_serialization
 from testutil import add_datafiles_tests
+from testutil import test_pack_into
 
 try:
     import loxi
     import loxi.of13 as ofp
+    import loxi.of13.view
     from loxi.generic_util import OFReader
 except ImportError:
     exit("loxi package not found. Try setting PYTHONPATH.")
@@ -93,11 +98,63 @@ class TestAllOF13(unittest.TestCase):
                 buf = obj.pack()
                 obj2 = klass.unpack(OFReader(buf))
                 self.assertEquals(obj, obj2)
+                test_pack_into(obj, buf)
             if klass in expected_failures:
                 self.assertRaises(Exception, fn)
             else:
                 fn()
 
+    def test_dispatch(self):
+        # Find every concrete subclass of an inheritance root from its root
+        expected_failures = [
+            ofp.action.set_field, # field defaults to None
+            ofp.oxm.conn_tracking_label,
+            ofp.oxm.conn_tracking_label_masked,
+        ]
+        mods = [ofp.action,ofp.message,ofp.common,ofp.oxm,ofp.bsn_tlv]
+        klasses = [klass for mod in mods
+                         for klass in mod.__dict__.values()
+                         if isinstance(klass, type) and
+                            issubclass(klass, loxi.OFObject) and
+                            'subtypes' not in klass.__dict__]
+        for klass in klasses:
+            roots = [x for x in klass.__mro__ if 'dispatch_table' in x.__dict__]
+            if not roots:
+                continue
+            def fn():
+                obj = klass()
+                if hasattr(obj, "xid"): obj.xid = 42
+                reader = OFReader(obj.pack())
+                subclass = loxi.generic_util.dispatch(reader, roots[0].dispatch_table)
+                self.assertEquals(subclass, klass)
+            if klass in expected_failures:
+                self.assertRaises(Exception, fn)
+            else:
+                fn()
+
+    def test_dispatch_unknown_subtype(self):
+        # Unknown subtypes unpack as the deepest known virtual class
+        objs = [
+            (ofp.message.message, ofp.message.bsn_header(xid=1, subtype=999)),
+            (ofp.message.message, ofp.message.experimenter(xid=1, experimenter=0x1234, subtype=1, data="abc")),
+            (ofp.message.message, ofp.message.experimenter_stats_reply(xid=1, experimenter=0x1234)),
+            (ofp.message.message, ofp.message.bsn_stats_reply(xid=1, subtype=999)),
+            (ofp.message.message, ofp.message.stats_reply(xid=1, stats_type=999)),
+            (ofp.action.action, ofp.action.bsn(subtype=999)),
+            (ofp.action.action, ofp.action.experimenter(experimenter=0x1234)),
+        ]
+        for root, obj in objs:
+            obj2 = root.unpack(OFReader(obj.pack()))
+            self.assertEquals(type(obj2), type(obj))
+            self.assertEquals(obj2, obj)
+
+    def test_slots(self):
+        for klass in self.klasses:
+            obj = klass()
+            self.assertFalse(hasattr(obj, '__dict__'))
+            if hasattr(obj, "xid"): obj.xid = 42
+            self.assertEquals(pickle.loads(pickle.dumps(obj)), obj)
+
     def test_parse_message(self):
         expected_failures = [
         ]
@@ -114,6 +171,147 @@ class TestAllOF13(unittest.TestCase):
             else:
                 fn()
 
+    def test_parse_message_zero_copy(self):
+        obj = ofp.message.packet_in(xid=42, buffer_id=1, total_len=4, reason=1,
+                                    match=ofp.match([ofp.oxm.in_port(3)]),
+                                    data="\x01\x02\x03\x04")
+        buf = bytearray(obj.pack())
+        obj2 = ofp.message.parse_message(buf, zero_copy=True)
+        self.assertEquals(obj, obj2)
+        self.assertEquals(type(obj2.data), memoryview)
+        self.assertEquals(obj2.pack(), obj.pack())
+        self.assertEquals(obj2.show(), obj.show())
+        test_pack_into(obj2, str(buf))
+
+    def test_parse_message_lazy(self):
+        klasses = [klass for klass in ofp.message.__dict__.values()
+                         if isinstance(klass, type) and
+                            'lazy_members' in klass.__dict__]
+        self.assertTrue(ofp.message.flow_removed in klasses)
+        expected_failures = [
+            ofp.message.bsn_virtual_port_create_request, # vport defaults to bsn_vport()
+        ]
+        for klass in klasses:
+            def fn():
+                obj = klass(xid=42)
+                obj2 = ofp.message.parse_message(obj.pack(), lazy=True)
+                self.assertEquals(type(obj2), klass)
+                self.assertEquals(obj2.xid, 42)
+                self.assertEquals(obj2, obj)
+            if klass in expected_failures:
+                self.assertRaises(Exception, fn)
+            else:
+                fn()
+
+    def test_parse_message_lazy_members(self):
+        obj = ofp.message.flow_removed(xid=42, cookie=0x1234, table_id=3, reason=2,
+                                       match=ofp.match([ofp.oxm.in_port(3)]))
+        obj2 = ofp.message.parse_message(obj.pack(), lazy=True)
+        self.assertEquals(obj2.table_id, 3)
+        self.assertEquals(obj2.cookie, 0x1234)
+        self.assertTrue(hasattr(obj2, '_lazy'))
+        obj2.reason = 1
+        self.assertEquals(obj2.match, obj.match)
+        self.assertFalse(hasattr(obj2, '_lazy'))
+        self.assertEquals(obj2.reason, 1)
+        obj2.reason = 2
+        self.assertEquals(obj2, obj)
+        self.assertRaises(AttributeError, getattr, obj2, 'foo')
+
+        obj2 = ofp.message.parse_message(obj.pack(), lazy=True)
+        self.assertEquals(pickle.loads(pickle.dumps(obj2)), obj)
+
+        obj = ofp.message.bsn_arp_idle(xid=42, vlan_vid=5, ipv4_addr=0x0a000001)
+        obj2 = ofp.message.parse_message(obj.pack(), lazy=True)
+        self.assertEquals(obj2.vlan_vid, 5)
+        self.assertEquals(obj2.pack(), obj.pack())
+
+    def test_view(self):
+        # Views read the same members as unpack
+        klasses = [klass for klass in ofp.view._views
+                         if 'subtypes' not in klass.__dict__ and
+                            'dispatch_table' not in klass.__dict__]
+        self.assertTrue(ofp.common.flow_stats_entry in klasses)
+        expected_failures = [
+            ofp.action.set_field, # field defaults to None
+            ofp.oxm.conn_tracking_label,
+            ofp.oxm.conn_tracking_label_masked,
+            ofp.message.bsn_virtual_port_create_request, # vport defaults to bsn_vport()
+            ofp.common.bsn_vport, # virtual class without subtypes
+        ]
+        def value(x):
+            if isinstance(x, loxi.OFView):
+                return x.unpack()
+            elif type(x) == types.GeneratorType:
+                return [value(y) for y in x]
+            return x
+        for klass in klasses:
+            def fn():
+                obj = klass()
+                if hasattr(obj, "xid"): obj.xid = 42
+                buf = obj.pack()
+                view = ofp.view._views[klass](buf)
+                self.assertEquals(view._length(), len(buf))
+                self.assertEquals(view.unpack(), obj)
+                for name in klass.__slots__:
+                    self.assertEquals(value(getattr(view, name)), getattr(obj, name))
+            if klass in expected_failures:
+                self.assertRaises(Exception, fn)
+            else:
+                fn()
+
+    def test_view_parse_message(self):
+        match = ofp.match([ofp.oxm.in_port(3), ofp.oxm.eth_type(0x800)])
+        instructions = [ofp.instruction.apply_actions([ofp.action.output(port=1)]),
+                        ofp.instruction.goto_table(2)]
+        entries = [ofp.flow_stats_entry(table_id=1, cookie=i, match=match,
+                                        instructions=instructions)
+                   for i in range(3)]
+        obj = ofp.message.flow_stats_reply(xid=42, entries=entries)
+        buf = "\x00" * 8 + obj.pack()
+        view = ofp.view.parse_message(buf, 8)
+        self.assertEquals(type(view), ofp.view.flow_stats_reply)
+        self.assertEquals(view.xid, 42)
+        self.assertEquals(view.unpack(), obj)
+        self.assertEquals([e.cookie for e in view.entries], [0, 1, 2])
+        views = list(view.entries)
+        self.assertTrue(views[0] is views[2])
+        for entry in view.entries:
+            self.assertEquals(entry.unpack(), entries[entry.cookie])
+            self.assertEquals(type(entry.match), ofp.view.match_v3)
+            self.assertEquals([oxm.value for oxm in entry.match.oxm_list], [3, 0x800])
+            self.assertEquals([type(x) for x in entry.instructions],
+                              [ofp.view.instruction_apply_actions,
+                               ofp.view.instruction_goto_table])
+
+        obj = ofp.message.packet_out(xid=42, buffer_id=5, in_port=2,
+                                     actions=[ofp.action.output(port=1)],
+                                     data="abcdef")
+        view = ofp.view.parse_message(obj.pack())
+        self.assertEquals([a.port for a in view.actions], [1])
+        self.assertEquals(view.data, "abcdef")
+
+        view = ofp.view.parse_message(buf[:-3], 8)
+        self.assertRaises(loxi.ProtocolError, list, view.entries)
+
+    def test_view_unknown_oxm(self):
+        # The length of an unknown OXM comes from its type_len
+        unknown = "\x00\x01\xfe\x03abc"
+        buf = ofp.oxm.in_port(3).pack() + unknown + ofp.oxm.eth_type(0x800).pack()
+        match = "\x00\x01" + struct.pack("!H", 4 + len(buf)) + buf
+        match += "\x00" * (-len(match) % 8)
+        view = ofp.view.match_v3(match)
+        self.assertEquals([type(oxm) for oxm in view.oxm_list],
+                          [ofp.view.oxm_in_port, ofp.view.oxm, ofp.view.oxm_eth_type])
+        self.assertEquals([oxm._length() for oxm in view.oxm_list], [8, 7, 6])
+
+    def test_parse_message_lazy_truncated(self):
+        # Truncated messages fail like in an eager parse
+        buf = ofp.message.port_mod(xid=42).pack()
+        buf = buf[:2] + "\x00\x1c" + buf[4:28]
+        self.assertRaises(loxi.ProtocolError, ofp.message.parse_message, buf)
+        self.assertRaises(loxi.ProtocolError, ofp.message.parse_message, buf, lazy=True)
+
     def test_show(self):
         expected_failures = []
         for klass in self.klasses:
@@ -126,6 +324,49 @@ class TestAllOF13(unittest.TestCase):
             else:
                 fn()
 
+class TestParseStream(unittest.TestCase):
+    def setUp(self):
+        import loxi.of10
+        self.msgs = [
+            ofp.message.hello(xid=1),
+            loxi.of10.message.echo_request(xid=2, data="abc"),
+            ofp.message.packet_in(xid=3, buffer_id=1, total_len=4, reason=1,
+                                  match=ofp.match([ofp.oxm.in_port(3)]),
+                                  data="\x01\x02\x03\x04"),
+        ]
+        self.buf = ''.join(msg.pack() for msg in self.msgs)
+
+    def test_parse_messages(self):
+        msgs = loxi.parse_messages(self.buf)
+        self.assertEquals(msgs, self.msgs)
+        self.assertEquals(type(msgs[1].data), str)
+        self.assertEquals(loxi.parse_messages(""), [])
+        self.assertRaises(loxi.ProtocolError, loxi.parse_messages, self.buf[:-1])
+        self.assertRaises(loxi.ProtocolError, loxi.parse_messages, self.buf + "\x04")
+
+    def test_parse_stream(self):
+        length = len(self.msgs[0].pack()) + len(self.msgs[1].pack())
+        for i in range(length, len(self.buf)):
+            self.assertEquals(loxi.parse_stream(self.buf[:i]), (self.msgs[:2], length))
+        self.assertEquals(loxi.parse_stream(self.buf), (self.msgs, len(self.buf)))
+        self.assertEquals(loxi.parse_stream(self.buf, 8), (self.msgs[1:], len(self.buf) - 8))
+        self.assertEquals(loxi.parse_stream(self.buf, len(self.buf)), ([], 0))
+
+        buf = bytearray(self.buf)
+        msgs, length = loxi.parse_stream(buf, zero_copy=True)
+        self.assertEquals(msgs, self.msgs)
+        self.assertEquals(type(msgs[2].data), memoryview)
+
+    def test_iter_stream(self):
+        it = loxi.iter_stream(self.buf + "\x04\x00\x00")
+        self.assertEquals(next(it), (self.msgs[0], 8))
+        self.assertEquals([end for msg, end in it], [19, len(self.buf)])
+
+    def test_invalid(self):
+        self.assertRaises(loxi.ProtocolError, loxi.parse_stream, "\x04\x00\x00\x07" + "\x00" * 4)
+        self.assertRaises(loxi.ProtocolError, loxi.parse_stream, "\x63\x00\x00\x08" + "\x00" * 4)
+        self.assertRaises(loxi.ProtocolError, loxi.parse_stream, "\x04\x00\x00\x09" + "\x00" * 5)
+
 class TestUtils(unittest.TestCase):
     def check_bitmap_512(self, value, data):
         self.assertEquals(data, ofp.util.pack_bitmap_512(set(value)))
@@ -25,13 +25,16 @@
 # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 # EPL for the specific language governing permissions and limitations
 # under the EPL.
+import pickle
 import unittest
 from testutil import test_serialization
 from testutil import add_datafiles_tests
+from testutil import test_pack_into
 
 try:
     import loxi
     import loxi.of15 as ofp
+    import loxi.of15.view
     from loxi.generic_util import OFReader
 except ImportError:
     exit("loxi package not found. Try setting PYTHONPATH.")
@@ -93,11 +96,52 @@ class TestAllof15(unittest.TestCase):
                 buf = obj.pack()
                 obj2 = klass.unpack(OFReader(buf))
                 self.assertEquals(obj, obj2)
+                test_pack_into(obj, buf)
             if klass in expected_failures:
                 self.assertRaises(Exception, fn)
             else:
                 fn()
 
+    def test_dispatch(self):
+        # Find every concrete subclass of an inheritance root from its root
+        expected_failures = [
+            ofp.action.set_field, # field defaults to None
+            ofp.oxm.conn_tracking_label,
+            ofp.oxm.conn_tracking_label_masked,
+            ofp.common._controller_status_prop_uri,
+            ofp.common.bundle_features_prop_time,
+            ofp.message.bundle_add_msg,
+            ofp.message.controller_status,
+            ofp.message.requestforward,
+        ]
+        mods = [ofp.action,ofp.message,ofp.common,ofp.oxm,ofp.bsn_tlv]
+        klasses = [klass for mod in mods
+                         for klass in mod.__dict__.values()
+                         if isinstance(klass, type) and
+                            issubclass(klass, loxi.OFObject) and
+                            'subtypes' not in klass.__dict__]
+        for klass in klasses:
+            roots = [x for x in klass.__mro__ if 'dispatch_table' in x.__dict__]
+            if not roots:
+                continue
+            def fn():
+                obj = klass()
+                if hasattr(obj, "xid"): obj.xid = 42
+                reader = OFReader(obj.pack())
+                subclass = loxi.generic_util.dispatch(reader, roots[0].dispatch_table)
+                self.assertEquals(subclass, klass)
+            if klass in expected_failures:
+                self.assertRaises(Exception, fn)
+            else:
+                fn()
+
+    def test_slots(self):
+        for klass in self.klasses:
+            obj = klass()
+            self.assertFalse(hasattr(obj, '__dict__'))
+            if hasattr(obj, "xid"): obj.xid = 42
+            self.assertEquals(pickle.loads(pickle.dumps(obj)), obj)
+
     def test_parse_message(self):
         expected_failures = [
         ]
@@ -114,6 +158,19 @@ class TestAllof15(unittest.TestCase):
             else:
                 fn()
 
+    def test_view_flow_monitor_request(self):
+        # flow_monitor_entry has no length member, its length comes from
+        # the match it ends with
+        entries = [ofp.flow_monitor_entry(monitor_id=i, table_id=1,
+                                          match=ofp.match([ofp.oxm.in_port(i)] * i))
+                   for i in range(3)]
+        obj = ofp.message.flow_monitor_request(xid=42, entries=entries)
+        view = ofp.view.parse_message(obj.pack())
+        self.assertEquals(type(view), ofp.view.flow_monitor_request)
+        self.assertEquals([entry.monitor_id for entry in view.entries], [0, 1, 2])
+        self.assertEquals([entry.unpack() for entry in view.entries], entries)
+        self.assertEquals(view.unpack(), obj)
+
     def test_show(self):
         expected_failures = []
         for klass in self.klasses:
@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+# Copyright 2013, Big Switch Networks, Inc.
+#
+# LoxiGen is licensed under the Eclipse Public License, version 1.0 (EPL), with
+# the following special exception:
+#
+# LOXI Exception
+#
+# As a special exception to the terms of the EPL, you may distribute libraries
+# generated by LoxiGen (LoxiGen Libraries) under the terms of your choice, provided
+# that copyright and licensing notices generated by LoxiGen are not altered or removed
+# from the LoxiGen Libraries and the notice provided below is (i) included in
+# the LoxiGen Libraries, if distributed in source code form and (ii) included in any
+# documentation for the LoxiGen Libraries, if distributed in binary form.
+#
+# Notice: "Copyright 2013, Big Switch Networks, Inc. This library was generated by the LoxiGen Compiler."
+#
+# You may not use this file except in compliance with the EPL or LOXI Exception. You may obtain
+# a copy of the EPL at:
+#
+# http://www.eclipse.org/legal/epl-v10.html
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# EPL for the specific language governing permissions and limitations
+# under the EPL.
+import json
+import os
+import shutil
+import socket
+import struct
+import tempfile
+import unittest
+
+try:
+    import loxi
+    import loxi.of10
+    import loxi.of13 as ofp
+    import loxi.tools.pcapdecode as pcapdecode
+except ImportError:
+    exit("loxi package not found. Try setting PYTHONPATH.")
+
+SWITCH = "10.0.0.2"
+CONTROLLER = "10.0.0.1"
+
+def tcp_packet(src, sport, dst, dport, seq, payload="", flags=0x18):
+    tcp = struct.pack("!HHLLBBHHH", sport, dport, seq & 0xffffffff, 0, 5 << 4, flags, 0xffff, 0, 0)
+    ip = struct.pack("!BBHHHBBH4s4s", 0x45, 0, 20 + len(tcp) + len(payload), 0, 0x4000,
+                     64, 6, 0, socket.inet_aton(src), socket.inet_aton(dst))
+    eth = "\x00\x00\x00\x00\x00\x01" + "\x00\x00\x00\x00\x00\x02" + "\x08\x00"
+    return eth + ip + tcp + payload
+
+def tcp6_packet(src, sport, dst, dport, seq, payload="", flags=0x18):
+    tcp = struct.pack("!HHLLBBHHH", sport, dport, seq & 0xffffffff, 0, 5 << 4, flags, 0xffff, 0, 0)
+    ip = struct.pack("!LHBB16s16s", 6 << 28, len(tcp) + len(payload), 6, 64,
+                     socket.inet_pton(socket.AF_INET6, src),
+                     socket.inet_pton(socket.AF_INET6, dst))
+    return ip + tcp + payload
+
+def pcap(packets):
+    out = [struct.pack("<LHHlLLL", 0xa1b2c3d4, 2, 4, 0, 0, 65535, 1)]
+    for timestamp, packet in packets:
+        out.append(struct.pack("<LLLL", int(timestamp), int(round(timestamp % 1 * 1e6)),
+                               len(packet), len(packet)))
+        out.append(packet)
+    return "".join(out)
+
+def pcapng_block(block_type, body):
+    body += "\x00" * (-len(body) % 4)
+    return struct.pack(">LL", block_type, len(body) + 12) + body + struct.pack(">L", len(body) + 12)
+
+def pcapng(packets, linktype):
+    # Big endian, nanosecond timestamps
+    out = [pcapng_block(0x0a0d0d0a, struct.pack(">LHHq", 0x1a2b3c4d, 1, 0, -1)),
+           pcapng_block(1, struct.pack(">HHL", linktype, 0, 0) +
+                           struct.pack(">HHB3x", 9, 1, 9) + struct.pack(">HH", 0, 0))]
+    for timestamp, packet in packets:
+        ts = int(round(timestamp * 1e9))
+        out.append(pcapng_block(6, struct.pack(">LLLLL", 0, ts >> 32, ts & 0xffffffff,
+                                               len(packet), len(packet)) + packet))
+    return "".join(out)
+
+class TestPcapDecode(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.msgs = [
+            ofp.message.hello(xid=1),
+            ofp.message.echo_request(xid=2, data="abc"),
+            ofp.message.packet_in(xid=3, buffer_id=1, total_len=4, reason=1,
+                                  match=ofp.match([ofp.oxm.in_port(3)]),
+                                  data="\x01\x02\x03\x04"),
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, data):
+        filename = os.path.join(self.dir, "capture")
+        with open(filename, "wb") as f:
+            f.write(data)
+        return filename
+
+    def decode(self, data, **kwargs):
+        filename = self.write(data)
+        return [json.loads(line) for line in
+                pcapdecode.decode_file(filename, as_json=True, **kwargs)]
+
+    def switch_packets(self, seq=1000):
+        data = "".join(msg.pack() for msg in self.msgs)
+        return [
+            (1.0, tcp_packet(SWITCH, 40000, CONTROLLER, 6653, seq - 1, flags=0x02)),
+            (1.1, tcp_packet(SWITCH, 40000, CONTROLLER, 6653, seq, data[:5])),
+            (1.2, tcp_packet(SWITCH, 40000, CONTROLLER, 6653, seq + 5, data[5:30])),
+            # Retransmission
+            (1.3, tcp_packet(SWITCH, 40000, CONTROLLER, 6653, seq, data[:20])),
+            # Out of order
+            (1.5, tcp_packet(SWITCH, 40000, CONTROLLER, 6653, seq + 40, data[40:])),
+            (1.6, tcp_packet(SWITCH, 40000, CONTROLLER, 6653, seq + 30, data[30:40])),
+        ]
+
+    def check_switch_records(self, records, src="10.0.0.2:40000", dst="10.0.0.1:6653"):
+        self.assertEquals([r['type'] for r in records], ["hello", "echo_request", "packet_in"])
+        self.assertEquals([r['xid'] for r in records], [1, 2, 3])
+        self.assertEquals([round(r['time'], 6) for r in records], [1.2, 1.2, 1.6])
+        self.assertEquals(records[0]['src'], src)
+        self.assertEquals(records[0]['dst'], dst)
+        self.assertEquals(records[0]['version'], "1.3")
+        self.assertEquals(records[1]['message']['data'], "abc")
+        self.assertEquals(records[2]['message']['data'], "01020304")
+        self.assertEquals(records[2]['message']['match']['oxm_list'],
+                          [{ 'class': 'in_port', 'value': 3 }])
+
+    def test_pcap(self):
+        self.check_switch_records(self.decode(pcap(self.switch_packets()), jobs=1))
+
+    def test_sequence_wraparound(self):
+        self.check_switch_records(self.decode(pcap(self.switch_packets(seq=0xffffffe0)), jobs=1))
+
+    def test_pcapng(self):
+        packets = [(timestamp, tcp6_packet("2001:db8::2", 40000, "2001:db8::1", 6653, seq, payload, flags))
+                   for timestamp, packet in self.switch_packets()
+                   for seq, payload, flags in [self.tcp_fields(packet)]]
+        records = self.decode(pcapng(packets, 101), jobs=1)
+        self.check_switch_records(records, src="[2001:db8::2]:40000", dst="[2001:db8::1]:6653")
+
+    def tcp_fields(self, packet):
+        seq, flags = struct.unpack_from("!LxxxxxB", packet, 34 + 4)
+        return seq, packet[54:], flags
+
+    def test_order(self):
+        # Messages of several streams are merged in order of time
+        reply = ofp.message.hello(xid=5).pack() + loxi.of10.message.echo_reply(xid=2).pack()
+        packets = self.switch_packets() + [
+            (1.15, tcp_packet(CONTROLLER, 6653, SWITCH, 40000, 5000, reply[:8])),
+            (1.4, tcp_packet(CONTROLLER, 6653, SWITCH, 40000, 5008, reply[8:])),
+            # Not OpenFlow
+            (1.45, tcp_packet(SWITCH, 40000, CONTROLLER, 80, 1, reply)),
+        ]
+        packets.sort()
+        for jobs in [1, 2]:
+            records = self.decode(pcap(packets), jobs=jobs)
+            self.assertEquals([(r['type'], r['version'], round(r['time'], 6)) for r in records],
+                              [("hello", "1.3", 1.15), ("hello", "1.3", 1.2),
+                               ("echo_request", "1.3", 1.2), ("echo_reply", "1.0", 1.4),
+                               ("packet_in", "1.3", 1.6)])
+
+        records = self.decode(pcap(packets), ports=[80], jobs=1)
+        self.assertEquals([r['type'] for r in records], ["hello", "echo_reply"])
+
+    def test_errors(self):
+        data = self.msgs[0].pack() + "\x63\x00\x00\x08\x00\x00\x00\x07" + self.msgs[1].pack()
+        packets = [
+            (1.0, tcp_packet(SWITCH, 40000, CONTROLLER, 6653, 1, data)),
+            (2.0, tcp_packet(SWITCH, 40000, CONTROLLER, 6653, 1 + len(data), self.msgs[2].pack()[:10])),
+            # A segment is missing before this one
+            (3.0, tcp_packet(SWITCH, 40000, CONTROLLER, 6653, 100 + len(data), "x" * 7)),
+        ]
+        records = self.decode(pcap(packets), jobs=1)
+        self.assertEquals([r.get('type') for r in records], ["hello", None, "echo_request", None, None])
+        self.assertEquals(records[1]['error'], "unsupported OpenFlow version 99")
+        self.assertEquals(records[1]['xid'], 7)
+        self.assertEquals(records[3]['error'], "incomplete message, 10 bytes not decoded")
+        self.assertEquals(records[4]['error'], "missing data, 7 bytes not decoded")
+
+    def test_unsynchronised(self):
+        # The capture starts in the middle of a message
+        data = "".join(msg.pack() for msg in self.msgs)
+        packets = [(1.0, tcp_packet(SWITCH, 40000, CONTROLLER, 6653, 1, data[10:]))]
+        records = self.decode(pcap(packets), jobs=1)
+        self.assertEquals(records, [{
+            'time': 1.0, 'src': "10.0.0.2:40000", 'dst': "10.0.0.1:6653",
+            'error': "capture starts in the middle of a message, %d bytes not decoded" % (len(data) - 10),
+        }])
+
+        # A stream that is not OpenFlow at all
+        packets = [(1.0, tcp_packet(SWITCH, 40000, CONTROLLER, 6653, 0, flags=0x02)),
+                   (1.1, tcp_packet(SWITCH, 40000, CONTROLLER, 6653, 1, "GET / HTTP/1.0\r\n"))]
+        records = self.decode(pcap(packets), jobs=1)
+        self.assertEquals([r['error'] for r in records], ["not an OpenFlow stream, 16 bytes not decoded"])
+
+    def test_merge_groups(self):
+        # Streams are merged in several passes when there are many of them
+        packets = []
+        for i in range(5):
+            msg = ofp.message.echo_request(xid=i).pack()
+            packets.append((1.0 + i % 2, tcp_packet(SWITCH, 40000 + i, CONTROLLER, 6653, 1, msg)))
+        packets.sort()
+        max_merge_files = pcapdecode.MAX_MERGE_FILES
+        try:
+            pcapdecode.MAX_MERGE_FILES = 2
+            records = self.decode(pcap(packets), jobs=1)
+        finally:
+            pcapdecode.MAX_MERGE_FILES = max_merge_files
+        self.assertEquals([(r['time'], r['xid']) for r in records],
+                          [(1.0, 0), (1.0, 2), (1.0, 4), (2.0, 1), (2.0, 3)])
+
+    def test_summary(self):
+        filename = self.write(pcap(self.switch_packets()))
+        output = os.path.join(self.dir, "output")
+        pcapdecode.main(["-j", "1", "-o", output, filename])
+        with open(output) as f:
+            lines = f.read().splitlines()
+        self.assertEquals(lines, [
+            "1.200000 10.0.0.2:40000 > 10.0.0.1:6653 hello xid=1 len=8",
+            "1.200000 10.0.0.2:40000 > 10.0.0.1:6653 echo_request xid=2 len=11",
+            "1.600000 10.0.0.2:40000 > 10.0.0.1:6653 packet_in xid=3 len=%d" % len(self.msgs[2].pack()),
+        ])
+
+    def test_invalid_file(self):
+        filename = self.write("not a capture")
+        self.assertRaises(pcapdecode.CaptureError, list, pcapdecode.decode_file(filename))
+        self.assertRaises(SystemExit, pcapdecode.main, [filename])
+
+if __name__ == '__main__':
+    unittest.main()
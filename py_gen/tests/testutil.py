@@ -68,6 +68,18 @@ def test_serialization(obj, buf):
         b = format_binary(packed)
         raise AssertionError("Reserialization of %s failed\nExpected:\n%s\nActual:\n%s\nDiff:\n%s" % \
             (type(obj).__name__, a, b, diff(a, b)))
+    test_pack_into(obj, buf)
+
+# Test that pack_into writes the same bytes as pack at a nonzero offset
+def test_pack_into(obj, buf):
+    dst = bytearray('\xff' * (len(buf) + 5))
+    length = obj.pack_into(dst, 3)
+    packed = str(dst[3:3+length])
+    if length != len(buf) or packed != buf or dst[:3] != '\xff' * 3 or dst[3+length:] != '\xff' * 2:
+        a = format_binary(buf)
+        b = format_binary(str(dst))
+        raise AssertionError("pack_into of %s failed\nExpected:\n%s\nActual:\n%s\nDiff:\n%s" % \
+            (type(obj).__name__, a, b, diff(a, b)))
 
 def test_pretty(obj, expected):
     pretty = obj.show()
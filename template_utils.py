@@ -25,14 +25,55 @@
 # EPL for the specific language governing permissions and limitations
 # under the EPL.
 
+import hashlib
+import itertools
+import json
+import logging
+import multiprocessing
 import os
+import shutil
 import sys
+from cStringIO import StringIO
 
 import tenjin
 
+import loxi_profile
+
 """ @brief utilities for rendering templates
 """
 
+##@var cache_dir
+# Directory for compiled templates, or None to only cache them in memory
+cache_dir = None
+
+# Map from (template path, prefix) to TemplateEngine
+engines = {}
+
+def set_cache_dir(path):
+    """
+    Set the directory used to store compiled templates across runs
+    """
+    global cache_dir
+    cache_dir = path
+    engines.clear()
+
+def get_engine(path, prefix=None):
+    """
+    Return the TemplateEngine for a template path and line prefix
+
+    Engines are shared by all render_template calls, so each template is
+    loaded, preprocessed and compiled once per run.
+    """
+    key = (tuple(path), prefix)
+    engine = engines.get(key)
+    if engine is None:
+        pp = [ tenjin.PrefixedLinePreprocessor(prefix=prefix) if prefix else tenjin.PrefixedLinePreprocessor() ] # support "::" syntax
+        cache = TemplateCacheStorage() if cache_dir else tenjin.MemoryCacheStorage()
+        engine = TemplateEngine(path=path, pp=pp, cache=cache)
+        engine.line_prefix = prefix
+        engines[key] = engine
+    return engine
+
 def render_template(out, name, path, context, prefix = None):
     """
     Render a template using tenjin.
@@ -42,9 +83,8 @@ def render_template(out, name, path, context, prefix = None):
     context: dictionary of variables to pass to the template
     prefix: optional prefix to use for embedding (for other languages than python)
     """
-    pp = [ tenjin.PrefixedLinePreprocessor(prefix=prefix) if prefix else tenjin.PrefixedLinePreprocessor() ] # support "::" syntax
     template_globals = { "to_str": str, "escape": str } # disable HTML escaping
-    engine = TemplateEngine(path=path, pp=pp)
+    engine = get_engine(path, prefix)
     out.write(engine.render(name, context, template_globals))
 
 def render_static(out, name, path):
@@ -61,7 +101,41 @@ def render_static(out, name, path):
     with open(template_filename) as infile:
         out.write(infile.read())
 
+class TemplateCacheStorage(tenjin.MarshalCacheStorage):
+    """
+    Stores compiled template bytecode in cache_dir
+
+    The engine discards entries whose timestamp doesn't match the template
+    file's mtime.
+    """
+    def _store(self, cachepath, dct):
+        dirpath = os.path.dirname(cachepath)
+        if not os.path.exists(dirpath):
+            try:
+                os.makedirs(dirpath)
+            except OSError:
+                # Created by a concurrent run
+                pass
+        tenjin.MarshalCacheStorage._store(self, cachepath, dct)
+
 class TemplateEngine(tenjin.Engine):
+    # Templates don't change during a run
+    timestamp_interval = 3600
+
+    line_prefix = None
+
+    def cachename(self, filepath):
+        """
+        Return the path in cache_dir for a template
+
+        The compiled template depends on the line prefix, and marshalled
+        bytecode on the Python version.
+        """
+        if not cache_dir:
+            return filepath
+        key = hashlib.sha1("\0".join([filepath, str(self.line_prefix), sys.version])).hexdigest()
+        return os.path.join(cache_dir, key + ".cache")
+
     def include(self, template_name, **kwargs):
         """
         Tenjin has an issue with nested includes that use the same local variable
@@ -76,15 +150,193 @@ class TemplateEngine(tenjin.Engine):
         template = self.get_template(template_name, context, globals)
         return template.render(context, globals, _buf=locals["_buf"])
 
+class OutputFile(object):
+    """
+    File-like object for a generated file
+
+    Output is buffered in memory and written out by write_output when the
+    file is closed. Nothing is written if an exception is raised inside a
+    'with' block.
+    """
+    def __init__(self, path, name=None):
+        self.path = path
+        self.buf = StringIO()
+        self.write = self.buf.write
+        self.phase = loxi_profile.phase("render", name or path).start()
+
+    def close(self):
+        if self.buf is not None:
+            self.phase.stop()
+            write_output(self.path, self.buf.getvalue())
+            self.buf = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+
+class OutputManifest(object):
+    """
+    Records the files generated for one language
+
+    The manifest maps each output path (relative to the install directory)
+    to the SHA-1 of its content. It is written to the install directory when
+    generation finishes, and files listed in the previous manifest that were
+    not generated this time are removed.
+
+    Use as a context manager around a language's generate function.
+    """
+    def __init__(self, install_dir, name):
+        self.install_dir = install_dir
+        self.path = os.path.join(install_dir, ".loxi_manifest.%s" % name)
+        self.entries = {}
+        self.written = 0
+        self.unchanged = 0
+
+    def add(self, path, data, written):
+        self.entries[os.path.relpath(path, self.install_dir)] = hashlib.sha1(data).hexdigest()
+        if written:
+            self.written += 1
+        else:
+            self.unchanged += 1
+
+    def load(self):
+        """
+        Return the entries of the previous manifest, or an empty dict
+        """
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return {}
+
+    def finish(self):
+        old_entries = self.load()
+        stale = sorted(set(old_entries) - set(self.entries))
+
+        if not os.path.exists(self.install_dir):
+            os.makedirs(self.install_dir)
+        with open(self.path, "w") as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True, separators=(",", ": "))
+
+        for name in stale:
+            print "Removing %s" % name
+            path = os.path.join(self.install_dir, name)
+            if os.path.exists(path):
+                os.unlink(path)
+            try:
+                os.removedirs(os.path.dirname(path))
+            except OSError:
+                # Directory not empty
+                pass
+
+        logging.info("%d files written, %d unchanged, %d removed",
+                     self.written, self.unchanged, len(stale))
+
+    def __enter__(self):
+        global manifest
+        manifest = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        global manifest
+        manifest = None
+        if exc_type is None:
+            self.finish()
+
+##@var manifest
+# The OutputManifest for the language being generated, if any
+manifest = None
+
+def write_output(path, data):
+    """
+    Write a generated file, unless it already has the given content
+
+    Leaving unchanged files alone keeps their timestamps, so downstream
+    builds only recompile what actually changed.
+
+    @returns True if the file was written
+    """
+    try:
+        with open(path, "rb") as f:
+            unchanged = os.fstat(f.fileno()).st_size == len(data) and f.read() == data
+    except IOError:
+        unchanged = False
+
+    if not unchanged:
+        dirpath = os.path.dirname(path)
+        if not os.path.exists(dirpath):
+            os.makedirs(dirpath)
+        with open(path, "wb") as f:
+            f.write(data)
+
+    if manifest is not None:
+        manifest.add(path, data, not unchanged)
+
+    return not unchanged
+
+def clean_unmanaged(path):
+    """
+    Remove an output directory that is not covered by a previous manifest
+
+    Stale files of an earlier generation are only removed when they are
+    listed in the manifest of the previous run. Without one they cannot be
+    told apart from current files, so the directory is removed once and
+    later runs clean up through the manifest.
+    """
+    if not os.path.exists(path):
+        return
+    if manifest is not None and manifest.load():
+        return
+    shutil.rmtree(path)
+
+# Outputs rendered by worker processes, set before the pool is forked
+_worker_outputs = None
+
+def _render_output(i):
+    name, fn, args = _worker_outputs[i]
+    out = StringIO()
+    fn(out, *args)
+    return out.getvalue()
+
+def render_outputs(install_dir, outputs, jobs=1):
+    """
+    Render and write a list of outputs
+
+    outputs: list of (name, fn, args). fn(out, *args) writes the content of
+        the file 'name' in install_dir to out.
+    jobs: number of processes to render with
+
+    With more than one job the outputs are rendered by forked worker
+    processes, which share the state built up by the parent. The files are
+    written by the parent in list order.
+    """
+    if jobs > 1:
+        global _worker_outputs
+        _worker_outputs = outputs
+        pool = multiprocessing.Pool(jobs)
+        try:
+            results = pool.imap(_render_output, xrange(len(outputs)))
+            for (name, _, _), data in itertools.izip(outputs, results):
+                print "Writing %s" % name
+                write_output(os.path.join(install_dir, name), data)
+        finally:
+            pool.close()
+            pool.join()
+            _worker_outputs = None
+    else:
+        for name, fn, args in outputs:
+            with open_output(install_dir, name) as out:
+                fn(out, *args)
+
 def open_output(install_dir, name):
     """
     Open an output file for writing
 
     'name' may include slashes. Subdirectories will be automatically created.
+    The file is written when it is closed, and only if its content changed.
     """
     print "Writing %s" % name
-    path = os.path.join(install_dir, name)
-    dirpath = os.path.dirname(path)
-    if not os.path.exists(dirpath):
-        os.makedirs(dirpath)
-    return open(path, "w")
+    return OutputFile(os.path.join(install_dir, name), name)
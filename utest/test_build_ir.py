@@ -29,6 +29,7 @@
 import sys
 import os
 import unittest
+import cPickle as pickle
 
 from nose.tools import eq_, ok_, raises
 
@@ -228,5 +229,131 @@ class BuildIRTest(unittest.TestCase):
         eq_(ir.OFEnumEntry(name="OFPQT_NONE", value=0x00, params={}), e.entries[0])
         eq_(ir.OFEnumEntry(name="OFPQT_MIN_RATE", value=0x01, params={}), e.entries[1])
 
+    def test_pickle(self):
+        version = ir.OFVersion("1.0", 1)
+        input = fe.OFInput(filename="test.dat",
+                    wire_versions=(1,),
+                    classes=(
+                      fe.OFClass(name="OFMessage",
+                                 superclass=None,
+                                 members=(
+                                     fe.OFDataMember(name='version', oftype='uint32_t'),
+                                 ),
+                                 virtual=True,
+                                 params={}
+                      ),
+                      fe.OFClass(name="OFHello",
+                                 superclass="OFMessage",
+                                 members=(
+                                     fe.OFDataMember(name='version', oftype='uint32_t'),
+                                     fe.OFPadMember(length=4),
+                                 ),
+                                 virtual=False,
+                                 params={}
+                      ),
+                    ),
+                    enums=(
+                        fe.OFEnum(name='ofp_queue_properties',
+                                  entries=(fe.OFEnumEntry(name="OFPQT_NONE", value=0x00, params={}),),
+                                  params = dict(wire_type="uint32_t")
+                                 ),
+                    )
+                )
+        p = ir.build_protocol(version, [ input ])
+        p2 = pickle.loads(pickle.dumps(p, pickle.HIGHEST_PROTOCOL))
+        eq_(p, p2)
+
+        c, c2 = p2.classes
+        eq_(p2, c.protocol)
+        eq_(c, c2.superclass)
+        ok_(c2.superclass is c)
+        ok_(c2.protocol is p2)
+        for m in c2.members:
+            ok_(m.of_class is c2)
+        e = p2.enums[0]
+        ok_(e.protocol is p2)
+        ok_(e.entries[0].enum is e)
+        ok_(p2.class_by_name("OFHello") is c2)
+        ok_(c2.member_by_name("version") is c2.members[0])
+
+    def test_index(self):
+        version = ir.OFVersion("1.3", 4)
+        input = fe.OFInput(filename="test.dat",
+                    wire_versions=(4,),
+                    classes=(
+                      fe.OFClass(name="OFMessage",
+                                 superclass=None,
+                                 members=(
+                                     fe.OFDataMember(name='version', oftype='uint8_t'),
+                                     fe.OFDiscriminatorMember(name='type', oftype='uint8_t'),
+                                 ),
+                                 virtual=True,
+                                 params={}
+                      ),
+                      fe.OFClass(name="OFHello",
+                                 superclass="OFMessage",
+                                 members=(
+                                     fe.OFDataMember(name='version', oftype='uint8_t'),
+                                     fe.OFTypeMember(name='type', oftype='uint8_t', value=0),
+                                 ),
+                                 virtual=False,
+                                 params={}
+                      ),
+                      fe.OFClass(name="OFEchoRequest",
+                                 superclass="OFMessage",
+                                 members=(
+                                     fe.OFDataMember(name='version', oftype='uint8_t'),
+                                     fe.OFTypeMember(name='type', oftype='uint8_t', value=2),
+                                 ),
+                                 virtual=False,
+                                 params={}
+                      ),
+                    ),
+                    enums=(
+                        fe.OFEnum(name='ofp_type',
+                                  entries=(fe.OFEnumEntry(name="OFPT_HELLO", value=0, params={}),),
+                                  params={}
+                                 ),
+                    )
+                )
+        p = ir.build_protocol(version, [ input ])
+        msg = p.class_by_name("OFMessage")
+        hello = p.class_by_name("OFHello")
+        echo = p.class_by_name("OFEchoRequest")
+        eq_(None, p.class_by_name("OFFoo"))
+        eq_("ofp_type", p.enum_by_name("ofp_type").name)
+        eq_(None, p.enum_by_name("ofp_foo"))
+
+        ok_(msg.member_by_name("type") is msg.discriminator)
+        ok_(hello.member_by_name("type") is hello.members[1])
+        eq_(None, hello.member_by_name("foo"))
+        eq_(None, hello.discriminator)
+
+        eq_(frozenset(["OFMessage", "OFHello"]), hello.ancestors)
+        ok_(hello.is_instanceof("OFMessage"))
+        ok_(hello.is_subclassof("OFMessage"))
+        ok_(not msg.is_subclassof("OFMessage"))
+        ok_(not hello.is_instanceof("OFEchoRequest"))
+        eq_([echo, hello], msg.subclasses)
+        eq_([], hello.subclasses)
+
+    def test_node(self):
+        m = ir.OFDataMember(name='version', oftype='uint8_t',
+                            is_fixed_length=True, base_length=1, offset=0)
+        ok_(not hasattr(m, '__dict__'))
+        eq_(None, m.of_class)
+        eq_(('version', 'uint8_t', True, 1, 0), tuple(m))
+        eq_(m, ir.OFDataMember('version', 'uint8_t', True, 1, 0))
+        eq_(hash(m), hash(ir.OFDataMember('version', 'uint8_t', True, 1, 0)))
+        ok_(m != ir.OFDataMember('type', 'uint8_t', True, 1, 0))
+        eq_('uint8_t', m[1])
+        eq_(['name', 'oftype', 'is_fixed_length', 'base_length', 'offset'], m._asdict().keys())
+        eq_("OFDataMember(name='version', oftype='uint8_t', is_fixed_length=True, base_length=1, offset=0)", repr(m))
+
+        with self.assertRaises(AttributeError):
+            m.foo = 1
+        with self.assertRaises(TypeError):
+            ir.OFDataMember(name='version')
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# Copyright 2013, Big Switch Networks, Inc.
+#
+# LoxiGen is licensed under the Eclipse Public License, version 1.0 (EPL), with
+# the following special exception:
+#
+# LOXI Exception
+#
+# As a special exception to the terms of the EPL, you may distribute libraries
+# generated by LoxiGen (LoxiGen Libraries) under the terms of your choice, provided
+# that copyright and licensing notices generated by LoxiGen are not altered or removed
+# from the LoxiGen Libraries and the notice provided below is (i) included in
+# the LoxiGen Libraries, if distributed in source code form and (ii) included in any
+# documentation for the LoxiGen Libraries, if distributed in binary form.
+#
+# Notice: "Copyright 2013, Big Switch Networks, Inc. This library was generated by the LoxiGen Compiler."
+#
+# You may not use this file except in compliance with the EPL or LOXI Exception. You may obtain
+# a copy of the EPL at:
+#
+# http://www.eclipse.org/legal/epl-v10.html
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# EPL for the specific language governing permissions and limitations
+# under the EPL.
+
+import sys
+import os
+import glob
+import unittest
+
+root_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..')
+sys.path.insert(0, root_dir)
+
+import pyparsing
+import loxi_front_end.parser as parser
+import loxi_front_end.fast_parser as fast_parser
+import test_parser
+
+class FastParserMixin(object):
+    """
+    Run the test_parser cases against the fast parser
+    """
+    def setUp(self):
+        test_parser.parser = fast_parser
+
+    def tearDown(self):
+        test_parser.parser = parser
+
+class StructTests(FastParserMixin, test_parser.StructTests):
+    pass
+
+class EnumTests(FastParserMixin, test_parser.EnumTests):
+    pass
+
+class TestMetadata(FastParserMixin, test_parser.TestMetadata):
+    pass
+
+class TestToplevel(FastParserMixin, test_parser.TestToplevel):
+    pass
+
+class TestErrors(FastParserMixin, test_parser.TestErrors):
+    pass
+
+class EquivalenceTests(unittest.TestCase):
+    def parse_both(self, src):
+        results = []
+        for p in [parser, fast_parser]:
+            try:
+                results.append(p.parse(src))
+            except pyparsing.ParseBaseException as e:
+                results.append((type(e), str(e)))
+        return results
+
+    def test_input_files(self):
+        filenames = sorted(glob.glob(os.path.join(root_dir, "openflow_input", "*")))
+        self.assertTrue(filenames)
+        for filename in filenames:
+            with open(filename) as f:
+                src = f.read()
+            self.assertEquals(parser.parse(src), fast_parser.parse(src),
+                              "AST differs for %s" % filename)
+
+    def test_syntax(self):
+        src = """
+// comment
+/* multi-line
+   comment */
+#version 4
+enum foo(wire_type=uint8_t, bitmask=True,) {
+    FOO_A = 0x10, // comment
+    FOO_B(virtual=True) = 2,
+};
+struct bar(align=8, length_includes_align=False) : baz {
+    uint8_t[4] a;
+    list(of_action_t) b;
+    enum foo c;
+    uint16_t d == ?;
+    uint16_t e == 0xffff;
+    uint16_t f == length(b);
+    pad(3);
+};
+"""
+        pyparsing_ast, fast_ast = self.parse_both(src)
+        self.assertEquals(pyparsing_ast, fast_ast)
+
+    def test_errors(self):
+        for src in ['foo',
+                    '#foo 1',
+                    'struct foo { pad(x); };',
+                    'struct foo(bar=1) {};',
+                    'struct foo(align 1) {};',
+                    'struct foo : ;',
+                    'struct foo { enum ; };',
+                    'struct foo { list(;',
+                    'struct foo { uint8_t[; };',
+                    'struct foo { uint8_t x == 0xzz; };',
+                    'struct foo { uint8_t x == length(y; };',
+                    'enum foo(x=1) {};',
+                    'enum foo { a(x=1) = 1 };',
+                    'enum foo { a = x };',
+                    'enum foo { a, b };']:
+            pyparsing_result, fast_result = self.parse_both(src)
+            self.assertEquals(pyparsing_result, fast_result, src)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# Copyright 2013, Big Switch Networks, Inc.
+#
+# LoxiGen is licensed under the Eclipse Public License, version 1.0 (EPL), with
+# the following special exception:
+#
+# LOXI Exception
+#
+# As a special exception to the terms of the EPL, you may distribute libraries
+# generated by LoxiGen (LoxiGen Libraries) under the terms of your choice, provided
+# that copyright and licensing notices generated by LoxiGen are not altered or removed
+# from the LoxiGen Libraries and the notice provided below is (i) included in
+# the LoxiGen Libraries, if distributed in source code form and (ii) included in any
+# documentation for the LoxiGen Libraries, if distributed in binary form.
+#
+# Notice: "Copyright 2013, Big Switch Networks, Inc. This library was generated by the LoxiGen Compiler."
+#
+# You may not use this file except in compliance with the EPL or LOXI Exception. You may obtain
+# a copy of the EPL at:
+#
+# http://www.eclipse.org/legal/epl-v10.html
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# EPL for the specific language governing permissions and limitations
+# under the EPL.
+
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+root_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..')
+sys.path.insert(0, root_dir)
+
+import loxi_front_end.parser as parser
+import loxi_front_end.frontend as frontend
+from loxi_front_end.cache import InputCache
+
+src = """\
+#version 1
+
+struct of_foo {
+    uint32_t bar;
+};
+"""
+
+class InputCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = InputCache(os.path.join(self.cache_dir, "input"))
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def store(self, filename, src):
+        ast = parser.parse(src)
+        ofinput = frontend.create_ofinput(filename, ast)
+        self.cache.put(filename, src, ast, ofinput)
+        return ast, ofinput
+
+    def test_miss(self):
+        self.assertEquals(self.cache.get("foo", src), None)
+        self.assertEquals(self.cache.misses, 1)
+
+    def test_hit(self):
+        ast, ofinput = self.store("foo", src)
+        self.assertEquals(self.cache.get("foo", src), (ast, ofinput))
+        self.assertEquals(self.cache.hits, 1)
+
+    def test_shared(self):
+        entry = self.store("foo", src)
+        cache = InputCache(self.cache.cache_dir)
+        self.assertEquals(cache.get("foo", src), entry)
+
+    def test_content_changed(self):
+        self.store("foo", src)
+        self.assertEquals(self.cache.get("foo", src.replace("bar", "baz")), None)
+
+    def test_filename_changed(self):
+        self.store("foo", src)
+        self.assertEquals(self.cache.get("bar", src), None)
+
+    def test_fingerprint_changed(self):
+        self.store("foo", src)
+        self.cache.fingerprint = "0" * 40
+        self.assertEquals(self.cache.get("foo", src), None)
+
+    def test_corrupt_entry(self):
+        self.store("foo", src)
+        with open(self.cache.path(self.cache.key("foo", src)), "w") as f:
+            f.write("garbage")
+        self.assertEquals(self.cache.get("foo", src), None)
+
+    def test_clear(self):
+        self.store("foo", src)
+        self.cache.clear()
+        self.assertEquals(self.cache.get("foo", src), None)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# Copyright 2013, Big Switch Networks, Inc.
+#
+# LoxiGen is licensed under the Eclipse Public License, version 1.0 (EPL), with
+# the following special exception:
+#
+# LOXI Exception
+#
+# As a special exception to the terms of the EPL, you may distribute libraries
+# generated by LoxiGen (LoxiGen Libraries) under the terms of your choice, provided
+# that copyright and licensing notices generated by LoxiGen are not altered or removed
+# from the LoxiGen Libraries and the notice provided below is (i) included in
+# the LoxiGen Libraries, if distributed in source code form and (ii) included in any
+# documentation for the LoxiGen Libraries, if distributed in binary form.
+#
+# Notice: "Copyright 2013, Big Switch Networks, Inc. This library was generated by the LoxiGen Compiler."
+#
+# You may not use this file except in compliance with the EPL or LOXI Exception. You may obtain
+# a copy of the EPL at:
+#
+# http://www.eclipse.org/legal/epl-v10.html
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# EPL for the specific language governing permissions and limitations
+# under the EPL.
+
+import sys
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from StringIO import StringIO
+
+root_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..')
+sys.path.insert(0, root_dir)
+
+import loxi_profile
+
+class ProfileTests(unittest.TestCase):
+    def setUp(self):
+        loxi_profile.reset()
+        loxi_profile.enabled = True
+
+    def tearDown(self):
+        loxi_profile.reset()
+        loxi_profile.enabled = False
+
+    def test_disabled(self):
+        loxi_profile.enabled = False
+        with loxi_profile.phase("parse", "foo"):
+            pass
+        self.assertEquals([], loxi_profile.records)
+
+    def test_phases(self):
+        with loxi_profile.phase("parse", "foo"):
+            pass
+        phase = loxi_profile.phase("render", "bar").start()
+        phase.stop()
+        phase.stop()
+        self.assertEquals([("parse", "foo"), ("render", "bar")],
+                          [(r.category, r.name) for r in loxi_profile.records])
+        self.assertTrue(loxi_profile.records[0].peak_rss > 0)
+
+    def test_exception(self):
+        try:
+            with loxi_profile.phase("parse", "foo"):
+                raise ValueError()
+        except ValueError:
+            pass
+        self.assertEquals(1, len(loxi_profile.records))
+
+    def test_summary(self):
+        for name in ["a", "b"]:
+            with loxi_profile.phase("parse", name):
+                pass
+        with loxi_profile.phase("build_unified_ir"):
+            pass
+        summary = loxi_profile.summary()
+        self.assertEquals(2, summary["parse"]["count"])
+        self.assertEquals(1, summary["build_unified_ir"]["count"])
+
+        out = StringIO()
+        loxi_profile.report(out)
+        self.assertIn("parse a", out.getvalue())
+        self.assertIn("build_unified_ir", out.getvalue())
+
+    def test_write_json(self):
+        with loxi_profile.phase("parse", "foo"):
+            pass
+        tmpdir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tmpdir, "profile.json")
+            loxi_profile.write_json(filename)
+            with open(filename) as f:
+                data = json.load(f)
+        finally:
+            shutil.rmtree(tmpdir)
+        self.assertEquals(1, data["summary"]["parse"]["count"])
+        self.assertEquals("foo", data["phases"][0]["name"])
+
+if __name__ == '__main__':
+    unittest.main()
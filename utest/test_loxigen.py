@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+# Copyright 2013, Big Switch Networks, Inc.
+#
+# LoxiGen is licensed under the Eclipse Public License, version 1.0 (EPL), with
+# the following special exception:
+#
+# LOXI Exception
+#
+# As a special exception to the terms of the EPL, you may distribute libraries
+# generated by LoxiGen (LoxiGen Libraries) under the terms of your choice, provided
+# that copyright and licensing notices generated by LoxiGen are not altered or removed
+# from the LoxiGen Libraries and the notice provided below is (i) included in
+# the LoxiGen Libraries, if distributed in source code form and (ii) included in any
+# documentation for the LoxiGen Libraries, if distributed in binary form.
+#
+# Notice: "Copyright 2013, Big Switch Networks, Inc. This library was generated by the LoxiGen Compiler."
+#
+# You may not use this file except in compliance with the EPL or LOXI Exception. You may obtain
+# a copy of the EPL at:
+#
+# http://www.eclipse.org/legal/epl-v10.html
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# EPL for the specific language governing permissions and limitations
+# under the EPL.
+
+import sys
+import os
+import tempfile
+import unittest
+
+root_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..')
+sys.path.insert(0, root_dir)
+
+import loxigen
+import loxi_globals
+import loxi_front_end.parser as parser
+import loxi_front_end.frontend as frontend
+import lang_java
+import java_gen.codegen as java_codegen
+import java_gen.java_model as java_model
+
+input_files = [os.path.join(root_dir, 'openflow_input', name)
+               for name in ('bsn_arp_idle', 'bsn_bw', 'bsn_flow_idle')]
+
+build_ir_src = """\
+#version 1
+#version 4
+
+enum ofp_type(wire_type=uint8_t) {
+    OFPT_HELLO = 0,
+    OFPT_ECHO_REQUEST = 2,
+};
+
+struct of_header {
+    uint8_t version;
+    uint8_t type == ?;
+    uint16_t length;
+    uint32_t xid;
+};
+
+struct of_hello : of_header {
+    uint8_t version;
+    uint8_t type == 0;
+    uint16_t length;
+    uint32_t xid;
+};
+
+struct of_echo_request : of_header {
+    uint8_t version;
+    uint8_t type == 2;
+    uint16_t length;
+    uint32_t xid;
+    of_octets_t data;
+};
+"""
+
+class ReadInputTests(unittest.TestCase):
+    def test_parallel_matches_serial(self):
+        serial = [loxigen.process_input_file(filename) for filename in input_files]
+        parallel = loxigen.process_input_files(input_files, jobs=2)
+        self.assertEquals(serial, parallel)
+
+class BuildIRTests(unittest.TestCase):
+    def setUp(self):
+        loxi_globals.OFVersions.target_versions = \
+            loxi_globals.OFVersions.from_strings("1.0", "1.3")
+        ofinput = frontend.create_ofinput("test", parser.parse(build_ir_src))
+        self.inputs = { wire_version: [ofinput] for wire_version in ofinput.wire_versions }
+        self.orig_ir = loxi_globals.ir.copy()
+        self.orig_unified = loxi_globals.unified
+
+    def tearDown(self):
+        loxi_globals.ir.clear()
+        loxi_globals.ir.update(self.orig_ir)
+        loxi_globals.unified = self.orig_unified
+
+    def build(self, jobs):
+        loxi_globals.ir.clear()
+        loxigen.build_ir(self.inputs, jobs)
+        return loxi_globals.ir.copy(), loxi_globals.unified
+
+    def test_parallel_matches_serial(self):
+        serial_ir, serial_unified = self.build(jobs=1)
+        parallel_ir, parallel_unified = self.build(jobs=2)
+        self.assertEquals(serial_ir.keys(), parallel_ir.keys())
+        self.assertEquals(serial_ir, parallel_ir)
+        self.assertEquals(serial_unified, parallel_unified)
+        for version, protocol in parallel_ir.items():
+            for ofclass in protocol.classes:
+                self.assertTrue(ofclass.protocol is protocol)
+                for m in ofclass.members:
+                    self.assertTrue(m.of_class is ofclass)
+
+    def test_dump_load(self):
+        ir, unified = self.build(jobs=1)
+        fd, filename = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            loxigen.dump_ir(filename)
+            loxi_globals.ir.clear()
+            loxi_globals.unified = None
+            loxigen.load_ir(filename, loxi_globals.OFVersions.all_supported)
+        finally:
+            os.unlink(filename)
+        self.assertEquals(ir, loxi_globals.ir)
+        self.assertEquals(unified, loxi_globals.unified)
+        self.assertEquals(loxi_globals.OFVersions.target_versions,
+                          list(loxi_globals.OFVersions.from_strings("1.0", "1.3")))
+
+    def test_load_subset(self):
+        ir, unified = self.build(jobs=1)
+        fd, filename = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            loxigen.dump_ir(filename)
+            loxigen.load_ir(filename, loxi_globals.OFVersions.from_strings("1.3", "1.4"))
+        finally:
+            os.unlink(filename)
+        version = loxi_globals.OFVersions.VERSION_1_3
+        self.assertEquals([version], loxi_globals.ir.keys())
+        self.assertEquals(ir[version], loxi_globals.ir[version])
+        self.assertEquals([version], loxi_globals.unified.classes[0].version_classes.keys())
+
+if __name__ == '__main__':
+    unittest.main()
+
+class JavaRenderTests(unittest.TestCase):
+    def setUp(self):
+        loxi_globals.OFVersions.target_versions = \
+            loxi_globals.OFVersions.from_strings("1.0", "1.3")
+        ofinput = frontend.create_ofinput("test", parser.parse(build_ir_src))
+        self.orig_ir = loxi_globals.ir.copy()
+        self.orig_unified = loxi_globals.unified
+        loxi_globals.ir.clear()
+        loxigen.build_ir({ wire_version: [ofinput] for wire_version in ofinput.wire_versions }, 1)
+        self.model = java_model.JavaModel()
+
+    def tearDown(self):
+        loxi_globals.ir.clear()
+        loxi_globals.ir.update(self.orig_ir)
+        loxi_globals.unified = self.orig_unified
+
+    def render(self, jobs):
+        gen = java_codegen.JavaGenerator("/nonexistent", java_codegen.JavaGeneratorOptions(instrument=True), jobs=jobs)
+        gen.java_model = self.model
+        gen.create_of_interfaces()
+        gen.create_of_classes()
+        gen.create_of_const_enums()
+        # Unit tests need factories, which this small model does not have
+        gen.render_jobs = [job for job in gen.render_jobs if job.template != "unit_test.java"]
+        return list(gen.render_results())
+
+    def test_parallel_matches_serial(self):
+        serial = self.render(jobs=1)
+        parallel = self.render(jobs=2)
+        self.assertTrue(len(serial) > 1)
+        self.assertEquals(serial, parallel)
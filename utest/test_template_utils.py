@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+# Copyright 2013, Big Switch Networks, Inc.
+#
+# LoxiGen is licensed under the Eclipse Public License, version 1.0 (EPL), with
+# the following special exception:
+#
+# LOXI Exception
+#
+# As a special exception to the terms of the EPL, you may distribute libraries
+# generated by LoxiGen (LoxiGen Libraries) under the terms of your choice, provided
+# that copyright and licensing notices generated by LoxiGen are not altered or removed
+# from the LoxiGen Libraries and the notice provided below is (i) included in
+# the LoxiGen Libraries, if distributed in source code form and (ii) included in any
+# documentation for the LoxiGen Libraries, if distributed in binary form.
+#
+# Notice: "Copyright 2013, Big Switch Networks, Inc. This library was generated by the LoxiGen Compiler."
+#
+# You may not use this file except in compliance with the EPL or LOXI Exception. You may obtain
+# a copy of the EPL at:
+#
+# http://www.eclipse.org/legal/epl-v10.html
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# EPL for the specific language governing permissions and limitations
+# under the EPL.
+
+import sys
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from StringIO import StringIO
+
+root_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..')
+sys.path.insert(0, root_dir)
+
+import template_utils
+
+class OutputTests(unittest.TestCase):
+    def setUp(self):
+        self.install_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.install_dir)
+
+    def path(self, name):
+        return os.path.join(self.install_dir, name)
+
+    def read(self, name):
+        with open(self.path(name)) as f:
+            return f.read()
+
+    def test_write_output(self):
+        self.assertTrue(template_utils.write_output(self.path("a/b.c"), "foo"))
+        self.assertEquals("foo", self.read("a/b.c"))
+        self.assertFalse(template_utils.write_output(self.path("a/b.c"), "foo"))
+        self.assertTrue(template_utils.write_output(self.path("a/b.c"), "bar"))
+        self.assertEquals("bar", self.read("a/b.c"))
+
+    def test_unchanged_not_rewritten(self):
+        template_utils.write_output(self.path("a.c"), "foo")
+        os.utime(self.path("a.c"), (0, 0))
+        template_utils.write_output(self.path("a.c"), "foo")
+        self.assertEquals(0, os.stat(self.path("a.c")).st_mtime)
+
+    def test_open_output(self):
+        with template_utils.open_output(self.install_dir, "a/b.c") as out:
+            out.write("foo")
+            self.assertFalse(os.path.exists(self.path("a/b.c")))
+        self.assertEquals("foo", self.read("a/b.c"))
+
+    def test_open_output_exception(self):
+        try:
+            with template_utils.open_output(self.install_dir, "a.c") as out:
+                out.write("foo")
+                raise ValueError()
+        except ValueError:
+            pass
+        self.assertFalse(os.path.exists(self.path("a.c")))
+
+    def test_manifest(self):
+        with template_utils.OutputManifest(self.install_dir, "c") as manifest:
+            template_utils.write_output(self.path("a.c"), "foo")
+            template_utils.write_output(self.path("b/b.c"), "bar")
+        self.assertEquals(None, template_utils.manifest)
+        with open(self.path(".loxi_manifest.c")) as f:
+            entries = json.load(f)
+        self.assertEquals(["a.c", "b/b.c"], sorted(entries.keys()))
+        self.assertEquals(2, manifest.written)
+
+        with template_utils.OutputManifest(self.install_dir, "c") as manifest:
+            template_utils.write_output(self.path("a.c"), "foo")
+        self.assertEquals(0, manifest.written)
+        self.assertEquals(1, manifest.unchanged)
+        self.assertEquals("foo", self.read("a.c"))
+        self.assertFalse(os.path.exists(self.path("b/b.c")))
+        self.assertFalse(os.path.exists(self.path("b")))
+
+    def test_manifests_per_language(self):
+        with template_utils.OutputManifest(self.install_dir, "c"):
+            template_utils.write_output(self.path("a.c"), "foo")
+        with template_utils.OutputManifest(self.install_dir, "python"):
+            template_utils.write_output(self.path("a.py"), "foo")
+        self.assertTrue(os.path.exists(self.path("a.c")))
+
+    def test_clean_unmanaged(self):
+        # Without a previous manifest the directory is removed
+        template_utils.write_output(self.path("java/old.java"), "foo")
+        with template_utils.OutputManifest(self.install_dir, "java"):
+            template_utils.clean_unmanaged(self.path("java"))
+            self.assertFalse(os.path.exists(self.path("java")))
+            template_utils.write_output(self.path("java/new.java"), "bar")
+
+        # Later runs rely on the manifest
+        with template_utils.OutputManifest(self.install_dir, "java"):
+            template_utils.clean_unmanaged(self.path("java"))
+            self.assertEquals("bar", self.read("java/new.java"))
+            template_utils.write_output(self.path("java/new.java"), "bar")
+
+        # Outside of a manifest nothing cleans up later, so always remove
+        template_utils.clean_unmanaged(self.path("java"))
+        self.assertFalse(os.path.exists(self.path("java")))
+        template_utils.clean_unmanaged(self.path("java"))
+
+    def test_render_outputs(self):
+        def render(out, x):
+            out.write("foo %d" % x)
+        outputs = [("%d.c" % i, render, (i,)) for i in range(10)]
+        for jobs in [1, 4]:
+            with template_utils.OutputManifest(self.install_dir, "c") as manifest:
+                template_utils.render_outputs(self.install_dir, outputs, jobs)
+            for i in range(10):
+                self.assertEquals("foo %d" % i, self.read("%d.c" % i))
+        self.assertEquals(10, manifest.unchanged)
+
+class RenderTests(unittest.TestCase):
+    def setUp(self):
+        self.template_dir = tempfile.mkdtemp()
+        self.cache_dir = tempfile.mkdtemp()
+        self.write_template("foo.txt", ":: x = 1\nfoo ${x} ${y}\n")
+        template_utils.set_cache_dir(None)
+
+    def tearDown(self):
+        template_utils.set_cache_dir(None)
+        shutil.rmtree(self.template_dir)
+        shutil.rmtree(self.cache_dir)
+
+    def write_template(self, name, text, mtime=None):
+        path = os.path.join(self.template_dir, name)
+        with open(path, "w") as f:
+            f.write(text)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+
+    def render(self, name, prefix=None, **context):
+        out = StringIO()
+        template_utils.render_template(out, name, [self.template_dir], context, prefix=prefix)
+        return out.getvalue()
+
+    def test_render(self):
+        self.assertEquals("foo 1 2\n", self.render("foo.txt", y=2))
+        self.assertEquals("foo 1 3\n", self.render("foo.txt", y=3))
+
+    def test_shared_engine(self):
+        engine = template_utils.get_engine([self.template_dir])
+        self.assertTrue(engine is template_utils.get_engine([self.template_dir]))
+        self.assertFalse(engine is template_utils.get_engine([self.template_dir], prefix="//::"))
+
+    def test_prefix(self):
+        self.write_template("foo.java", "//:: x = 1\nfoo ${x}\n")
+        self.assertEquals("foo 1\n", self.render("foo.java", prefix="//::"))
+
+    def test_disk_cache(self):
+        template_utils.set_cache_dir(self.cache_dir)
+        self.assertEquals("foo 1 2\n", self.render("foo.txt", y=2))
+        self.assertEquals(1, len(os.listdir(self.cache_dir)))
+
+        # A new engine loads the compiled template from the cache
+        template_utils.set_cache_dir(self.cache_dir)
+        engine = template_utils.get_engine([self.template_dir])
+        template = engine.get_template("foo.txt")
+        self.assertTrue(template.bytecode is not None)
+        self.assertEquals("foo 1 2\n", self.render("foo.txt", y=2))
+
+    def test_disk_cache_expired(self):
+        template_utils.set_cache_dir(self.cache_dir)
+        self.write_template("foo.txt", "foo ${y}\n", mtime=1000)
+        self.assertEquals("foo 2\n", self.render("foo.txt", y=2))
+
+        template_utils.set_cache_dir(self.cache_dir)
+        self.write_template("foo.txt", "bar ${y}\n", mtime=2000)
+        self.assertEquals("bar 2\n", self.render("foo.txt", y=2))
+
+if __name__ == '__main__':
+    unittest.main()